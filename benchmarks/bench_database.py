@@ -0,0 +1,12 @@
+"""Compare UniprotDatabase.add one entry at a time with add_many and sync.
+
+Runs the database loading benchmarks of benchmarks.run, with the same options.
+
+Usage: python -m benchmarks.bench_database --records 200000
+"""
+import sys
+
+from .run import main
+
+if __name__ == '__main__':
+    main(['--only', 'database.add,database.sync', *sys.argv[1:]])
@@ -0,0 +1,12 @@
+"""Time the UniprotDatabase query methods with and without secondary indexes.
+
+Runs the database.query benchmarks of benchmarks.run, with the same options.
+
+Usage: python -m benchmarks.bench_indexes --records 2000000
+"""
+import sys
+
+from .run import main
+
+if __name__ == '__main__':
+    main(['--only', 'database.query', *sys.argv[1:]])
@@ -0,0 +1,21 @@
+"""Measure how iter_proteome_parallel scales with the number of worker processes.
+
+Runs the parse_proteome.parallel benchmark of benchmarks.run with 1, 2,
+4, ... workers up to --max_workers; other options are passed on.
+
+Usage: python -m benchmarks.bench_parallel_parser --records 2000000 --max_workers 32
+"""
+import argparse
+import os
+
+from .run import main
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--max_workers', type=int, default=os.cpu_count(),
+                        help='Largest number of worker processes to try.')
+    args, argv = parser.parse_known_args()
+    workers = 1
+    while workers <= args.max_workers:
+        main(['--only', 'parse_proteome.parallel', '--workers', str(workers), *argv])
+        workers *= 2
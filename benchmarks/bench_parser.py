@@ -0,0 +1,12 @@
+"""Compare the Biopython, streaming and parallel paths of parse_proteome.
+
+Runs the parse_proteome benchmarks of benchmarks.run, with the same options.
+
+Usage: python -m benchmarks.bench_parser --records 1000000
+"""
+import sys
+
+from .run import main
+
+if __name__ == '__main__':
+    main(['--only', 'parse_proteome', *sys.argv[1:]])
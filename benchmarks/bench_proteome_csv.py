@@ -0,0 +1,12 @@
+"""Compare ProteomeSelector.proteome_to_csv with the list-based version it replaced.
+
+Runs the proteome_to_csv benchmarks of benchmarks.run, with the same options.
+
+Usage: python -m benchmarks.bench_proteome_csv --records 200000
+"""
+import sys
+
+from .run import main
+
+if __name__ == '__main__':
+    main(['--only', 'proteome_selector.proteome_to_csv', *sys.argv[1:]])
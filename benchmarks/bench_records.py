@@ -0,0 +1,12 @@
+"""Compare the memory held by a parsed proteome as dicts, ProteinRecords and a ProteomeTable.
+
+Runs the records benchmarks of benchmarks.run, with the same options.
+
+Usage: python -m benchmarks.bench_records --records 500000
+"""
+import sys
+
+from .run import main
+
+if __name__ == '__main__':
+    main(['--only', 'records', *sys.argv[1:]])
@@ -0,0 +1,12 @@
+"""Time traverse_tree, create_taxon_tree, write_newick and write_json on a synthetic tree.
+
+Runs the taxon_tree benchmarks of benchmarks.run, with the same options.
+
+Usage: python -m benchmarks.bench_taxon_tree --taxa 1000000
+"""
+import sys
+
+from .run import main
+
+if __name__ == '__main__':
+    main(['--only', 'taxon_tree', *sys.argv[1:]])
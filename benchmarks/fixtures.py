@@ -0,0 +1,108 @@
+"""Synthetic UniProt data for the benchmarks."""
+import random
+from typing import Dict, Iterator, List
+
+AMINO_ACIDS = 'ACDEFGHIKLMNPQRSTVWY'
+SPECIES = [
+    ('Homo sapiens', 9606, 'HUMAN'),
+    ('Mus musculus', 10090, 'MOUSE'),
+    ('Escherichia coli (strain K12)', 83333, 'ECOLI'),
+    ('Saccharomyces cerevisiae (strain ATCC 204508 / S288c)', 559292, 'YEAST'),
+]
+PROTEIN_NAMES = [
+    'Dystrophin', 'Hemoglobin subunit alpha', 'Uncharacterized protein',
+    'ATP synthase subunit beta, mitochondrial', 'DNA polymerase III subunit alpha',
+]
+
+
+def synthetic_header(i: int, rng: random.Random) -> str:
+    """Build a UniProt style FASTA header for the i-th synthetic protein.
+
+    Roughly a fifth of the entries are isoforms (no PE/SV) and a tenth have
+    no gene name, as in real proteomes."""
+    species, taxon_id, mnemonic = SPECIES[i % len(SPECIES)]
+    db = 'sp' if i % 7 == 0 else 'tr'
+    accession = f'A{i:09d}'
+    gene = f'GENE{i // 5}'
+    name = PROTEIN_NAMES[i % len(PROTEIN_NAMES)]
+    kind = rng.random()
+    if kind < 0.2:
+        return f'{db}|{accession}-2|{accession}_{mnemonic} Isoform 2 of {name} OS={species} OX={taxon_id} GN={gene}'
+    if kind < 0.3:
+        return f'{db}|{accession}|{accession}_{mnemonic} {name} OS={species} OX={taxon_id} PE=4 SV=1'
+    return f'{db}|{accession}|{accession}_{mnemonic} {name} OS={species} OX={taxon_id} GN={gene} PE={1 + i % 5} SV={1 + i % 3}'
+
+
+def write_synthetic_fasta(path, n_records: int, seed: int = 0, line_length: int = 60) -> None:
+    """Write n_records synthetic UniProt proteins to a FASTA file."""
+    rng = random.Random(seed)
+    with open(path, 'w') as f:
+        for i in range(n_records):
+            length = rng.randint(50, 800)
+            sequence = ''.join(rng.choices(AMINO_ACIDS, k=length))
+            f.write(f'>{synthetic_header(i, rng)}\n')
+            for start in range(0, length, line_length):
+                f.write(sequence[start:start + line_length] + '\n')
+
+
+def write_gp_proteome(proteome_path, gp_path, fraction: float) -> None:
+    """Keep every n-th protein of the proteome as its gene priority proteome."""
+    step = max(1, round(1 / fraction))
+    with open(proteome_path) as source, open(gp_path, 'w') as f:
+        keep = False
+        record = 0
+        for line in source:
+            if line.startswith('>'):
+                keep = record % step == 0
+                record += 1
+            if keep:
+                f.write(line)
+
+
+PROTEOME_TYPES = [
+    'Reference and representative proteome',
+    'Reference proteome',
+    'Other proteome',
+    'Redundant proteome',
+    'Excluded',
+]
+
+
+def synthetic_proteome_list(taxon_id, n_proteomes: int, seed: int = 0) -> List[tuple]:
+    """Build (upid, organism ID, protein count, proteome type) rows like the UniProt proteome list.
+
+    The first proteome is representative, the rest are a mix of the other types.
+    """
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n_proteomes):
+        proteome_type = PROTEOME_TYPES[0] if i == 0 else rng.choice(PROTEOME_TYPES[1:])
+        rows.append((f'UP{int(taxon_id) * 1000 + i:09d}', int(taxon_id), rng.randint(1_000, 100_000), proteome_type))
+    return rows
+
+
+def synthetic_taxonomy(n_nodes: int, root: int = 1, seed: int = 0) -> Dict[int, List[int]]:
+    """A {parent: [children]} taxonomy with n_nodes taxa attached to random earlier taxa."""
+    rng = random.Random(seed)
+    adjacency = {}
+    for taxon_id in range(root + 1, root + n_nodes):
+        parent = rng.randint(root, taxon_id - 1)
+        adjacency.setdefault(parent, []).append(taxon_id)
+    return adjacency
+
+
+def synthetic_entries(n_records: int, seed: int = 0) -> Iterator[dict]:
+    """Yield n_records uniprot_entry rows spread over 500 taxa and n/5 genes."""
+    rng = random.Random(seed)
+    for i in range(n_records):
+        yield {
+            'protein_id': f'A{i:09d}',
+            'protein_name': 'Uncharacterized protein',
+            'species': 'Synthetic species',
+            'taxon_id': i % 500,
+            'gene': f'GENE{i // 5}',
+            'pe_level': rng.randint(1, 5),
+            'sequence_version': 1,
+            'gene_priority': i % 5 == 0,
+            'sequence': 'M' * 50,
+        }
@@ -0,0 +1,420 @@
+"""Run the benchmark suite and write the timings as JSON.
+
+Every benchmark runs on synthetic data, the ones that make requests
+against a local FakeUniprotServer with the given latency, so results are
+comparable from one commit to the next:
+
+    git checkout main && python -m benchmarks.run --output main.json
+    git checkout my-branch && python -m benchmarks.run --compare main.json
+
+The requests and bytes of a benchmark are totals over all its repeats.
+The bench_*.py scripts run a subset of these benchmarks with the same
+options.
+
+Usage: python -m benchmarks.run --records 100000 --latency 0.01 --only parse,database --output results.json
+"""
+import argparse
+import datetime
+import gc
+import io
+import itertools
+import json
+import os
+import platform
+import re
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from types import SimpleNamespace
+
+import pandas as pd
+from Bio import SeqIO
+
+from uniprotpy import rest, taxon_tree
+from uniprotpy.database import HEADER_COLUMNS, UniprotDatabase
+from uniprotpy.models import UniprotEntry
+from uniprotpy.parser import iter_proteome, iter_proteome_parallel, parse_proteome
+from uniprotpy.protein_tree import create_protein_tree
+from uniprotpy.proteome_selector import ProteomeSelector
+from uniprotpy.records import ProteomeTable, iter_records
+
+from .fixtures import (synthetic_entries, synthetic_proteome_list, synthetic_taxonomy, write_gp_proteome,
+                       write_synthetic_fasta)
+from .server import FakeUniprotServer
+
+# taxon served with a proteome list and proteome, and taxon served only through the protein search
+PROTEOME_TAXON = '9606'
+ALL_PROTEINS_TAXON = '10090'
+# database.add commits every entry, so it only loads the first ones
+ADD_RECORDS = 5_000
+
+BENCHMARKS = {}
+
+
+def benchmark(name, trace_memory=False):
+    """Register a benchmark.
+
+    The decorated function takes the run context, does any setup and
+    returns the function to time, which returns the number of items it
+    processed. With trace_memory, the peak memory allocated while timing
+    is recorded too, which slows the timed function down.
+    """
+    def register(setup):
+        setup.trace_memory = trace_memory
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+@benchmark('parse_proteome.biopython')
+def bench_parse_biopython(context):
+    return lambda: len(parse_proteome(context.fasta))
+
+
+@benchmark('parse_proteome.streaming')
+def bench_parse_streaming(context):
+    return lambda: len(parse_proteome(context.fasta, streaming=True))
+
+
+@benchmark('parse_proteome.parallel')
+def bench_parse_parallel(context):
+    return lambda: sum(1 for _ in iter_proteome_parallel(context.fasta, workers=context.workers))
+
+
+@benchmark('records.dicts', trace_memory=True)
+def bench_records_dicts(context):
+    return lambda: len(parse_proteome(context.fasta, streaming=True))
+
+
+@benchmark('records.protein_records', trace_memory=True)
+def bench_protein_records(context):
+    return lambda: len(list(iter_records(context.fasta)))
+
+
+@benchmark('records.proteome_table', trace_memory=True)
+def bench_proteome_table(context):
+    return lambda: len(ProteomeTable.from_fasta(context.fasta))
+
+
+@benchmark('database.add')
+def bench_add(context):
+    proteins = context.proteins()[:ADD_RECORDS]
+    database = UniprotDatabase(database_path=f'sqlite:///{context.new_path("add.db")}')
+
+    def add():
+        for protein in proteins:
+            database.add(protein)
+        return len(proteins)
+    return add
+
+
+@benchmark('database.add_many')
+def bench_add_many(context):
+    proteins = context.proteins()
+    database = UniprotDatabase(database_path=f'sqlite:///{context.new_path("add_many.db")}')
+    return lambda: database.add_many(proteins)
+
+
+@benchmark('database.sync')
+def bench_sync(context):
+    proteins = context.proteins()
+    database = UniprotDatabase(database_path=f'sqlite:///{context.new_path("sync.db")}')
+    database.add_many(proteins)
+
+    def sync():
+        summary = database.sync(proteins)
+        return sum(summary.values())
+    return sync
+
+
+def query_benchmark(context, indexed):
+    database = UniprotDatabase(database_path=f'sqlite:///{context.new_path("query.db")}')
+    database.add_many(synthetic_entries(context.records), batch_size=50_000)
+    if not indexed:
+        for index in UniprotEntry.__table__.indexes:
+            index.drop(database.engine)
+
+    def query():
+        return (len(database.get_gene_priority(40, columns=HEADER_COLUMNS))
+                + len(database.get_isoforms(f'GENE{context.records // 10}', columns=HEADER_COLUMNS))
+                + len(database.get_by_pe_level(1, taxon_id=40, columns=HEADER_COLUMNS)))
+    return query
+
+
+@benchmark('database.query.indexed')
+def bench_query_indexed(context):
+    return query_benchmark(context, indexed=True)
+
+
+@benchmark('database.query.full_scan')
+def bench_query_full_scan(context):
+    return query_benchmark(context, indexed=False)
+
+
+@benchmark('proteome_selector.select_best_proteome')
+def bench_select_best_proteome(context):
+    shutil.rmtree(Path('data') / PROTEOME_TAXON, ignore_errors=True)
+
+    def select():
+        ProteomeSelector(PROTEOME_TAXON).select_best_proteome(force=True)
+        return context.remote_records
+    return select
+
+
+@benchmark('proteome_selector.all_proteins')
+def bench_all_proteins(context):
+    shutil.rmtree(Path('data') / ALL_PROTEINS_TAXON, ignore_errors=True)
+
+    def select():
+        ProteomeSelector(ALL_PROTEINS_TAXON).select_best_proteome(force=True)
+        return context.remote_records
+    return select
+
+
+def local_selector(context):
+    """A ProteomeSelector for the taxon 'local', with the local proteome already downloaded."""
+    data_dir = Path('data') / 'local'
+    data_dir.mkdir(parents=True, exist_ok=True)
+    shutil.copyfile(context.fasta, data_dir / 'proteome.fasta')
+    shutil.copyfile(context.gp_fasta, data_dir / 'gp_proteome.fasta')
+    selector = ProteomeSelector.__new__(ProteomeSelector)
+    selector.taxon_id = 'local'
+    return selector
+
+
+def legacy_proteome_to_csv(taxon_id):
+    """proteome_to_csv as it was before the streaming rewrite."""
+    proteins = list(SeqIO.parse(f'data/{taxon_id}/proteome.fasta', 'fasta'))
+    gp_ids = [str(protein.id.split('|')[1]) for protein in list(SeqIO.parse(f'data/{taxon_id}/gp_proteome.fasta', 'fasta'))]
+
+    proteome_data = []
+    for protein in proteins:
+        uniprot_id = protein.id.split('|')[1]
+        gp = 1 if uniprot_id in gp_ids else 0
+        try:
+            gene = re.search('GN=(.*?) ', protein.description).group(1)
+        except AttributeError:
+            try:
+                gene = re.search('GN=(.*?)$', protein.description).group(1)
+            except AttributeError:
+                gene = ''
+        try:
+            pe_level = int(re.search('PE=(.*?) ', protein.description).group(1))
+        except AttributeError:
+            pe_level = 0
+        proteome_data.append([protein.id.split('|')[0], gene, uniprot_id, gp, pe_level, str(protein.seq)])
+
+    columns = ['Database', 'Gene Symbol', 'UniProt ID', 'Gene Priority', 'Protein Existence Level', 'Sequence']
+    pd.DataFrame(proteome_data, columns=columns).to_csv(f'data/{taxon_id}/proteome.csv', index=False)
+
+
+@benchmark('proteome_selector.proteome_to_csv')
+def bench_proteome_to_csv(context):
+    selector = local_selector(context)
+
+    def to_csv():
+        selector.proteome_to_csv()
+        return context.records
+    return to_csv
+
+
+@benchmark('proteome_selector.proteome_to_csv.legacy')
+def bench_legacy_proteome_to_csv(context):
+    local_selector(context)
+
+    def to_csv():
+        legacy_proteome_to_csv('local')
+        return context.records
+    return to_csv
+
+
+@benchmark('taxon_tree.traverse_tree')
+def bench_traverse_tree(context):
+    def traverse():
+        taxon_tree.traverse_tree(1, as_adjacency=True)
+        return context.taxa
+    return traverse
+
+
+def render_benchmark(context, render):
+    tree = {1: [taxon_tree.adjacency_to_tree(1, synthetic_taxonomy(context.taxa))]}
+
+    def run():
+        render(tree, file=io.StringIO())
+        return context.taxa
+    return run
+
+
+@benchmark('taxon_tree.create_taxon_tree')
+def bench_create_taxon_tree(context):
+    return render_benchmark(context, taxon_tree.create_taxon_tree)
+
+
+@benchmark('taxon_tree.write_newick')
+def bench_write_newick(context):
+    return render_benchmark(context, taxon_tree.write_newick)
+
+
+@benchmark('taxon_tree.write_json')
+def bench_write_json(context):
+    return render_benchmark(context, taxon_tree.write_json)
+
+
+@benchmark('protein_tree.create_protein_tree')
+def bench_create_protein_tree(context):
+    output_file = context.new_path('protein_tree.txt')
+
+    def create():
+        create_protein_tree(context.fasta, context.gp_fasta, output_file=output_file)
+        return context.records
+    return create
+
+
+def build_context(workdir, server, args):
+    """Write the local fixtures and load the server with the remote ones."""
+    context = SimpleNamespace(records=args.records, remote_records=args.remote_records, taxa=args.taxa,
+                              workers=args.workers)
+    context.fasta = os.path.join(workdir, 'proteome.fasta')
+    context.gp_fasta = os.path.join(workdir, 'gp_proteome.fasta')
+    write_synthetic_fasta(context.fasta, args.records)
+    write_gp_proteome(context.fasta, context.gp_fasta, 0.2)
+
+    parsed = []
+
+    def proteins():
+        if not parsed:
+            parsed.extend(iter_proteome(context.fasta))
+        return parsed
+    context.proteins = proteins
+
+    counter = itertools.count()
+
+    def new_path(name):
+        return os.path.join(workdir, f'{next(counter)}_{name}')
+    context.new_path = new_path
+
+    remote_fasta = os.path.join(workdir, 'remote.fasta')
+    write_synthetic_fasta(remote_fasta, args.remote_records, seed=1)
+    fasta = Path(remote_fasta).read_bytes()
+    proteome_list = synthetic_proteome_list(PROTEOME_TAXON, 10)
+    server.add_proteome_list(PROTEOME_TAXON, proteome_list)
+    server.add_proteome(proteome_list[0][0], fasta)
+    server.add_proteins(ALL_PROTEINS_TAXON, fasta)
+    server.set_taxonomy(synthetic_taxonomy(args.taxa))
+    return context
+
+
+def run_benchmark(setup, context, repeat):
+    """Time repeat runs of a benchmark, with the requests all of them make."""
+    runs = []
+    peak_memory = None
+    metrics = rest.RequestMetrics()
+    for _ in range(repeat):
+        timed = setup(context)
+        rest.add_hook(metrics.record)
+        gc.collect()
+        if setup.trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            items = timed()
+        finally:
+            runs.append(time.perf_counter() - start)
+            rest.remove_hook(metrics.record)
+            if setup.trace_memory:
+                peak_memory = max(peak_memory or 0, tracemalloc.get_traced_memory()[1])
+                tracemalloc.stop()
+
+    endpoints = metrics.as_dict().values()
+    best = min(runs)
+    return {
+        'runs': runs,
+        'min': best,
+        'median': statistics.median(runs),
+        'items': items,
+        'items_per_second': items / best if best else None,
+        'requests': sum(stats['requests'] for stats in endpoints),
+        'bytes': sum(stats['bytes'] for stats in endpoints),
+        'peak_memory': peak_memory,
+    }
+
+
+def git_revision():
+    """The checked out commit, marked -dirty with uncommitted changes, or None outside git."""
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], capture_output=True, text=True,
+                              check=True, cwd=Path(__file__).parent).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline):
+    """Print the change in best time of every benchmark found in both results."""
+    print(f'\n{"benchmark":<40} {"baseline":>10} {"current":>10} {"change":>8}')
+    for name, result in results['benchmarks'].items():
+        before = baseline['benchmarks'].get(name)
+        if before is None:
+            continue
+        change = result['min'] / before['min'] - 1
+        print(f'{name:<40} {before["min"]:>9.3f}s {result["min"]:>9.3f}s {change:>+8.1%}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--records', type=int, default=100_000, help='Number of proteins in the local proteome.')
+    parser.add_argument('-r', '--remote_records', type=int, default=20_000,
+                        help='Number of proteins served by the fake UniProt server.')
+    parser.add_argument('-t', '--taxa', type=int, default=5_000, help='Number of taxa in the served taxonomy.')
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count(),
+                        help='Number of processes parse_proteome.parallel uses.')
+    parser.add_argument('-l', '--latency', type=float, default=0.01, help='Seconds the server waits per request.')
+    parser.add_argument('--repeat', type=int, default=3, help='Number of timed runs per benchmark.')
+    parser.add_argument('--only', help='Comma separated benchmark name prefixes, e.g. "parse,database".')
+    parser.add_argument('-o', '--output', help='JSON file to write the results to.')
+    parser.add_argument('-c', '--compare', help='JSON results of an earlier run to compare with.')
+    args = parser.parse_args(argv)
+
+    prefixes = tuple(args.only.split(',')) if args.only else ('',)
+    names = [name for name in BENCHMARKS if name.startswith(prefixes)]
+    results = {
+        'revision': git_revision(),
+        'created_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'params': {key: getattr(args, key) for key in ('records', 'remote_records', 'taxa', 'workers', 'latency', 'repeat')},
+        'benchmarks': {},
+    }
+
+    cwd = os.getcwd()
+    base_urls = rest.BASE_URL, taxon_tree.BASE_URL
+    with tempfile.TemporaryDirectory() as tmp, FakeUniprotServer(latency=args.latency) as server:
+        context = build_context(tmp, server, args)
+        os.chdir(tmp)
+        rest.BASE_URL, taxon_tree.BASE_URL = server.url, f'{server.url}/taxonomy/stream'
+        try:
+            for name in names:
+                result = run_benchmark(BENCHMARKS[name], context, args.repeat)
+                results['benchmarks'][name] = result
+                memory = f' {result["peak_memory"] / 1e6:>8,.1f} MB peak' if result['peak_memory'] is not None else ''
+                print(f'{name:<40} {result["min"]:>8.3f}s min {result["median"]:>8.3f}s median '
+                      f'{result["items_per_second"] or 0:>12,.0f} items/s {result["requests"]:>6} requests{memory}')
+        finally:
+            os.chdir(cwd)
+            rest.BASE_URL, taxon_tree.BASE_URL = base_urls
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+"""A local stand-in for rest.uniprot.org serving synthetic data.
+
+It answers the requests the package makes: proteome lists, streamed
+proteome FASTA (gzip compressed or not), paginated protein searches with
+Link cursors and X-Total-Results, and taxonomy children queries. Every
+response is delayed by latency seconds, and bodies are written
+chunk_size bytes at a time like a streamed download.
+
+    with FakeUniprotServer(latency=0.05) as server:
+        server.add_proteome_list('9606', [('UP000005640', 9606, 82485, 'Reference proteome')])
+        server.add_proteome('UP000005640', fasta_bytes)
+        rest.BASE_URL = server.url
+"""
+import csv
+import gzip
+import io
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+PROTEOME_QUERY_REGEX = re.compile(r'proteome:(\w+)')
+TAXONOMY_QUERY_REGEX = re.compile(r'taxonomy_id:(\d+)')
+PARENT_QUERY_REGEX = re.compile(r'parent:(\d+)')
+RECORD_REGEX = re.compile(rb'^(?=>)', re.MULTILINE)
+
+
+class FakeUniprotHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append(self.path)
+        if server.latency:
+            time.sleep(server.latency)
+
+        response = server.routes.get(self.path)
+        if response is not None:
+            status, headers, body = response if isinstance(response, tuple) else (200, {}, response)
+        else:
+            status, headers, body = server.synthetic_response(self.path)
+        if isinstance(body, str):
+            body = body.encode()
+
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        if 'Content-Length' in headers:
+            # a canned Content-Length longer than the body truncates the response
+            self.close_connection = True
+        else:
+            self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        view = memoryview(body)
+        for start in range(0, len(body), server.chunk_size):
+            self.wfile.write(view[start:start + server.chunk_size])
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeUniprotServer(ThreadingHTTPServer):
+    """Serve synthetic proteomes, proteome lists, protein searches and a taxonomy.
+
+    Canned responses set with server.routes[path] = body or (status,
+    headers, body) take precedence over the synthetic data, and the path
+    of every request is appended to server.requests. A canned
+    Content-Length longer than the body cuts the connection short.
+
+    Args:
+        latency: seconds to wait before answering each request.
+        chunk_size: number of bytes written at a time.
+    """
+    daemon_threads = True
+
+    def __init__(self, latency: float = 0.0, chunk_size: int = 64 << 10):
+        super().__init__(('127.0.0.1', 0), FakeUniprotHandler)
+        self.latency = latency
+        self.chunk_size = chunk_size
+        self.url = f'http://127.0.0.1:{self.server_address[1]}'
+        self.lock = threading.Lock()
+        self.requests = []
+        self.routes = {}
+        self.proteome_lists = {}
+        self.proteomes = {}
+        self.proteins = {}
+        self.taxonomy = {}
+        self._thread = None
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+    def add_proteome_list(self, taxon_id, rows) -> None:
+        """List rows of (upid, organism ID, protein count, proteome type) as the proteomes of taxon_id."""
+        self.proteome_lists[str(taxon_id)] = list(rows)
+
+    def add_proteome(self, upid: str, fasta: bytes) -> None:
+        """Serve fasta for the proteome upid, compressed once up front."""
+        self.proteomes[upid] = (fasta, gzip.compress(fasta, compresslevel=1))
+
+    def add_proteins(self, taxon_id, fasta: bytes) -> None:
+        """Serve fasta, record by record, as the protein search results of taxon_id."""
+        self.proteins[str(taxon_id)] = [record for record in RECORD_REGEX.split(fasta) if record]
+
+    def set_taxonomy(self, adjacency) -> None:
+        """Serve {parent: [children]} from the taxonomy endpoint."""
+        self.taxonomy = adjacency
+
+    def synthetic_response(self, path):
+        """Answer path from the synthetic data as (status, headers, body)."""
+        url = urlsplit(path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        routes = {
+            '/proteomes/stream': self.proteome_list,
+            '/uniprotkb/stream': self.proteome_stream,
+            '/uniprotkb/search': self.protein_search,
+            '/taxonomy/stream': self.taxonomy_children,
+        }
+        route = routes.get(url.path)
+        response = route(params) if route else None
+        if response is None:
+            return 404, {}, b''
+        return (200, *response)
+
+    def proteome_list(self, params):
+        match = TAXONOMY_QUERY_REGEX.search(params.get('query', ''))
+        if match is None:
+            return None
+        rows = self.proteome_lists.get(match.group(1), [])
+        if 'proteome_type:1' in params['query']:
+            rows = [row for row in rows if 'representative' in row[3].lower() or row[3].lower().startswith('reference')]
+        return {'Content-Type': 'text/plain; charset=utf-8'}, _tsv(
+            ['Proteome Id', 'Organism Id', 'Protein count', 'Proteome type'], rows)
+
+    def proteome_stream(self, params):
+        match = PROTEOME_QUERY_REGEX.search(params.get('query', ''))
+        if match is None or match.group(1) not in self.proteomes:
+            return None
+        fasta, compressed = self.proteomes[match.group(1)]
+        if params.get('compressed') == 'true':
+            return {'Content-Type': 'application/x-gzip'}, compressed
+        return {'Content-Type': 'text/plain; charset=utf-8'}, fasta
+
+    def protein_search(self, params):
+        match = TAXONOMY_QUERY_REGEX.search(params.get('query', ''))
+        if match is None or match.group(1) not in self.proteins:
+            return None
+        records = self.proteins[match.group(1)]
+        size = int(params.get('size', 25))
+        cursor = int(params.get('cursor', 0))
+        headers = {'Content-Type': 'text/plain; charset=utf-8', 'X-Total-Results': str(len(records))}
+        if cursor + size < len(records):
+            headers['Link'] = f'<{self.url}/uniprotkb/search?format=fasta&query={params["query"]}' \
+                              f'&size={size}&cursor={cursor + size}>; rel="next"'
+        return headers, b''.join(records[cursor:cursor + size])
+
+    def taxonomy_children(self, params):
+        parents = [int(parent) for parent in PARENT_QUERY_REGEX.findall(params.get('query', ''))]
+        with_parent = 'parent' in params.get('fields', '')
+        columns = ['Taxon Id', 'Scientific name'] + (['Parent'] if with_parent else [])
+        rows = [(child, f'Taxon {child}', parent)[:len(columns)]
+                for parent in parents for child in self.taxonomy.get(parent, [])]
+        return {'Content-Type': 'text/plain; charset=utf-8'}, _tsv(columns, rows)
+
+
+def _tsv(columns, rows) -> bytes:
+    output = io.StringIO()
+    writer = csv.writer(output, delimiter='\t', lineterminator='\n')
+    writer.writerow(columns)
+    writer.writerows(rows)
+    return output.getvalue().encode()
@@ -0,0 +1,14 @@
+import pytest
+
+from benchmarks.server import FakeUniprotServer
+
+
+@pytest.fixture
+def fake_uniprot():
+    """A local stand-in for rest.uniprot.org.
+
+    Register responses with server.routes[path] = body or (status, headers, body)
+    and point requests at server.url.
+    """
+    with FakeUniprotServer() as server:
+        yield server
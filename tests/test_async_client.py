@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from uniprotpy.async_client import AsyncUniprotClient
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_iter_search_follows_cursors(fake_uniprot):
+    first = "/uniprotkb/search?format=fasta&query=gene%3ABRCA1%20AND%20organism_id%3A9606&size=1"
+    second = f"{first}&cursor=1"
+    fake_uniprot.routes[first] = (200, {"Link": f'<{fake_uniprot.url}{second}>; rel="next"'}, ">sp|P1|A\nMA\n")
+    fake_uniprot.routes[second] = ">sp|P2|B\nMC\n"
+
+    async def pages():
+        async with AsyncUniprotClient(base_url=fake_uniprot.url) as client:
+            return [page async for page in client.iter_search("gene:BRCA1 AND organism_id:9606", size=1)]
+
+    assert run(pages()) == [">sp|P1|A\nMA\n", ">sp|P2|B\nMC\n"]
+
+
+def test_retries_transient_errors(fake_uniprot):
+    path = "/uniprotkb/stream?compressed=false&format=fasta&includeIsoform=true&query=(proteome:UP1)"
+    responses = [(503, {"Retry-After": "0"}, ""), (429, {}, ""), ">sp|P1|A\nMA\n"]
+
+    class Flaky(dict):
+        def get(self, key, default=None):
+            return responses.pop(0) if key == path else default
+
+    fake_uniprot.routes = Flaky()
+
+    async def proteome():
+        async with AsyncUniprotClient(base_url=fake_uniprot.url, backoff=0.01) as client:
+            return await client.get_proteome("UP1")
+
+    assert run(proteome()) == ">sp|P1|A\nMA\n"
+    assert len(fake_uniprot.requests) == 3
+
+
+def test_retries_truncated_bodies(fake_uniprot):
+    path = "/uniprotkb/stream?compressed=false&format=fasta&includeIsoform=true&query=(proteome:UP1)"
+    responses = [(200, {"Content-Length": "100"}, ">sp|P1|A\n"), ">sp|P1|A\nMA\n"]
+
+    class Flaky(dict):
+        def get(self, key, default=None):
+            return responses.pop(0) if key == path else default
+
+    fake_uniprot.routes = Flaky()
+
+    async def proteome():
+        async with AsyncUniprotClient(base_url=fake_uniprot.url, backoff=0.01) as client:
+            return await client.get_proteome("UP1")
+
+    assert run(proteome()) == ">sp|P1|A\nMA\n"
+    assert len(fake_uniprot.requests) == 2
+
+
+def test_proteome_list_and_taxon_children(fake_uniprot):
+    fields = "upid,organism_id,protein_count,proteome_type"
+    fake_uniprot.routes[f"/proteomes/stream?format=tsv&fields={fields}&query=(proteome_type:1)AND(taxonomy_id:9606)"] = (
+        "Proteome Id\tOrganism Id\tProtein count\tProteome type\n"
+        "UP000005640\t9606\t82485\tReference and representative proteome\n"
+    )
+    fake_uniprot.routes["/taxonomy/stream?fields=id%2Cscientific_name%2Cparent&format=tsv&query=%28parent%3A9605%29"] = (
+        "Taxon Id\tScientific name\tParent\n9606\tHomo sapiens\t9605\n"
+    )
+
+    async def lookups():
+        async with AsyncUniprotClient(base_url=fake_uniprot.url) as client:
+            return await asyncio.gather(client.get_proteome_list("9606"), client.get_taxon_children(9605))
+
+    proteome_list, children = run(lookups())
+    assert proteome_list[0].upid == "UP000005640"
+    assert proteome_list[0].is_representative
+    assert children == [{"Taxon Id": 9606, "Scientific name": "Homo sapiens"}]
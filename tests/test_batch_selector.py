@@ -0,0 +1,58 @@
+from uniprotpy.batch_selector import BatchProteomeSelector
+from uniprotpy.proteome_selector import Proteome, ProteomeSelector
+
+
+proteome_lists = {
+    "9606": [
+        Proteome("UP000005640", 9606, 20000, True, True, False),
+        Proteome("UP000000001", 9606, 30000, False, True, False),
+    ],
+    "10090": [Proteome("UP000000589", 10090, 22000, False, True, False)],
+}
+
+
+def fake_selector(monkeypatch, calls):
+    def get_proteome_list(self):
+        calls.append(("list", self.taxon_id))
+        if self.taxon_id not in proteome_lists:
+            raise ValueError("no such taxon")
+        return proteome_lists[self.taxon_id]
+
+    def get_proteome_to_fasta(self, proteome_id):
+        calls.append(("download", proteome_id))
+        with open(f"data/{self.taxon_id}/proteome.fasta", "w") as f:
+            f.write(f">sp|{proteome_id}|X\nMA\n")
+
+    monkeypatch.setattr(ProteomeSelector, "_get_proteome_list", get_proteome_list)
+    monkeypatch.setattr(ProteomeSelector, "_get_proteome_to_fasta", get_proteome_to_fasta)
+
+
+def test_batch_selector_is_incremental(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    calls = []
+    fake_selector(monkeypatch, calls)
+
+    batch = BatchProteomeSelector(list_workers=2, download_workers=2)
+    summary = batch.run(["9606", 10090, "0"])
+    assert sorted(summary["selected"]) == ["10090", "9606"]
+    assert list(summary["failed"]) == ["0"]
+
+    selections = batch.selections()
+    assert selections["9606"]["proteome_id"] == "UP000005640"
+    assert selections["9606"]["proteome_type"] == "Representative"
+    assert selections["9606"]["protein_count"] == 20000
+    assert selections["10090"]["proteome_type"] == "Reference"
+
+    # a re-run only retries what is missing
+    calls.clear()
+    (tmp_path / "data" / "10090" / "proteome.fasta").unlink()
+    summary = BatchProteomeSelector().run(["9606", "10090"])
+    assert summary["skipped"] == ["9606"]
+    assert summary["selected"] == ["10090"]
+    assert calls == [("list", "10090"), ("download", "UP000000589")]
+
+    # refreshing only downloads proteomes whose selection changed
+    calls.clear()
+    summary = BatchProteomeSelector().run(["9606", "10090"], refresh=True)
+    assert sorted(summary["unchanged"]) == ["10090", "9606"]
+    assert not [call for call in calls if call[0] == "download"]
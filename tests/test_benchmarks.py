@@ -0,0 +1,35 @@
+import json
+
+from benchmarks import run
+from uniprotpy import rest
+
+
+def test_benchmark_suite_writes_json(tmp_path, capsys):
+    output = tmp_path / "results.json"
+    args = ["--records", "200", "--remote_records", "1200", "--taxa", "60", "--latency", "0", "--repeat", "1"]
+    run.main(args + ["--output", str(output)])
+
+    results = json.loads(output.read_text())
+    assert set(results["benchmarks"]) == set(run.BENCHMARKS)
+    assert results["params"]["records"] == 200
+    # 1200 proteins are 3 pages of 500, after two empty proteome lists
+    assert results["benchmarks"]["proteome_selector.all_proteins"]["requests"] == 5
+    assert results["benchmarks"]["proteome_selector.select_best_proteome"]["requests"] == 2
+    assert results["benchmarks"]["database.sync"]["items"] == 200
+
+    run.main(args + ["--only", "parse", "--compare", str(output)])
+    assert "parse_proteome.streaming" in capsys.readouterr().out.split("baseline")[-1]
+
+
+def test_run_benchmark_counts_requests_of_every_repeat(fake_uniprot):
+    fake_uniprot.routes["/ok"] = "ok"
+
+    def setup(context):
+        def timed():
+            rest.get(f"{fake_uniprot.url}/ok")
+            return 1
+        return timed
+    setup.trace_memory = False
+
+    result = run.run_benchmark(setup, None, repeat=3)
+    assert (len(result["runs"]), result["requests"], result["bytes"]) == (3, 3, 6)
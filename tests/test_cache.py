@@ -0,0 +1,57 @@
+import pytest
+
+from uniprotpy import rest
+from uniprotpy.cache import OfflineCacheMiss, ResponseCache, normalize_url
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ResponseCache(tmp_path / "cache", ttl=60)
+    rest.set_cache(cache)
+    yield cache
+    rest.set_cache(None)
+
+
+def test_normalize_url():
+    assert normalize_url("HTTPS://Rest.UniProt.org/a?size=5&format=tsv") == \
+        normalize_url("https://rest.uniprot.org/a?format=tsv&size=5")
+
+
+def test_cache_hit_and_miss(fake_uniprot, cache):
+    fake_uniprot.routes["/taxonomy?a=1&b=2"] = (200, {"ETag": '"v1"'}, "Taxon Id\n9606\n")
+
+    assert rest.get(f"{fake_uniprot.url}/taxonomy?a=1&b=2").text == "Taxon Id\n9606\n"
+    response = rest.get(f"{fake_uniprot.url}/taxonomy?b=2&a=1")
+    assert response.text == "Taxon Id\n9606\n"
+    assert response.headers["etag"] == '"v1"'
+    assert len(fake_uniprot.requests) == 1
+    assert cache.stats["hits"] == 1 and cache.stats["misses"] == 1
+
+
+def test_cache_revalidates_stale_entries(fake_uniprot, cache):
+    fake_uniprot.routes["/proteomes"] = (200, {"ETag": '"v1"'}, "upid\nUP1\n")
+    rest.get(f"{fake_uniprot.url}/proteomes")
+
+    cache.ttl = 0
+    fake_uniprot.routes["/proteomes"] = (304, {}, b"")
+    assert rest.get(f"{fake_uniprot.url}/proteomes").text == "upid\nUP1\n"
+    assert cache.stats["revalidated"] == 1
+
+
+def test_cache_offline_and_eviction(fake_uniprot, cache):
+    fake_uniprot.routes["/a"] = "a" * 100
+    fake_uniprot.routes["/b"] = "b" * 100
+    rest.get(f"{fake_uniprot.url}/a")
+    rest.get(f"{fake_uniprot.url}/b")
+
+    cache.offline = True
+    assert rest.get(f"{fake_uniprot.url}/a").text == "a" * 100
+    with pytest.raises(OfflineCacheMiss):
+        rest.get(f"{fake_uniprot.url}/c")
+
+    cache.offline = False
+    cache.max_size = 150
+    fake_uniprot.routes["/c"] = "c" * 100
+    rest.get(f"{fake_uniprot.url}/c")
+    assert cache.stats["evictions"] == 2
+    assert len(list(cache.directory.glob("*.body"))) == 1
@@ -40,3 +40,170 @@ def test_add_protein_entry(database):
 def test_get_protein_entry(database):
     result = database.get(test_data["protein_id"]).dict()
     assert result["protein_id"] == "A0A075B6G3"
+
+
+def test_add_many_protein_entries(database):
+    proteins = [
+        {**test_data, "protein_id": f"P{i:05d}", "taxon_id": "9606", "pe_level": "2",
+         "sequence_version": "1", "gene_priority": "1"}
+        for i in range(25)
+    ]
+    assert database.add_many(iter(proteins), batch_size=10) == 25
+
+    result = database.get("P00024")
+    assert result.taxon_id == 9606
+    assert result.pe_level == 2
+    assert result.gene_priority is True
+
+
+def test_add_many_upsert(database):
+    database.add_many([{**test_data, "protein_name": "Dystrophin isoform"}], upsert=True)
+    assert database.get(test_data["protein_id"]).protein_name == "Dystrophin isoform"
+
+
+def test_add_many_restores_journal_mode(tmp_path):
+    database = UniprotDatabase(database_path=f"sqlite:///{tmp_path / 'journal.db'}")
+    database.add_many([test_data])
+
+    with database.engine.connect() as connection:
+        assert connection.exec_driver_sql("PRAGMA journal_mode").scalar() == "delete"
+    database.engine.dispose()
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["journal.db"]
+
+
+def test_get_many_protein_entries(database):
+    protein_ids = [f"P{i:05d}" for i in range(25)] + ["missing"]
+    result = database.get_many(protein_ids, chunk_size=4)
+    assert sorted(entry.protein_id for entry in result) == protein_ids[:-1]
+
+
+def test_iter_entries(database):
+    from uniprotpy.database import HEADER_COLUMNS
+
+    rows = list(database.iter_entries())
+    assert len(rows) == 26
+    assert all(row.sequence == test_data["sequence"] for row in rows)
+
+    rows = list(database.iter_entries(columns=HEADER_COLUMNS, where={"pe_level": 2}, chunk_size=7, as_dict=True))
+    assert len(rows) == 25
+    assert "sequence" not in rows[0]
+
+    rows = list(database.iter_entries(columns=["protein_id"], where={"protein_id": ["P00001", "P00002"]}))
+    assert sorted(row.protein_id for row in rows) == ["P00001", "P00002"]
+
+
+def test_query_entries(database):
+    assert len(database.get_gene_priority(9606)) == 25
+    assert len(database.get_isoforms("DMD", columns=["protein_id"])) == 26
+    assert len(database.get_by_pe_level(1)) == 1
+    assert list(database.query(taxon_id=1)) == []
+
+
+def test_migrate_adds_indexes(tmp_path):
+    from sqlalchemy import create_engine, inspect
+
+    from uniprotpy.models import Base
+
+    database_path = f"sqlite:///{tmp_path / 'old.db'}"
+    engine = create_engine(database_path)
+    Base.metadata.create_all(engine)
+    for index in Base.metadata.tables["uniprot_entry"].indexes:
+        index.drop(engine)
+    assert inspect(engine).get_indexes("uniprot_entry") == []
+
+    UniprotDatabase(database_path=database_path)
+    indexed = {index["column_names"][0] for index in inspect(engine).get_indexes("uniprot_entry")}
+    assert indexed == {"taxon_id", "gene", "pe_level", "gene_priority"}
+
+
+def test_deduplicated_sequences(tmp_path):
+    from sqlalchemy import func, select
+
+    from uniprotpy.models import UniprotSequence
+
+    database = UniprotDatabase(database_path=f"sqlite:///{tmp_path / 'dedup.db'}",
+                               deduplicate=True, compression="zlib")
+    database.add_many([{**test_data, "protein_id": f"P{i:05d}"} for i in range(3)])
+    database.add({**test_data, "protein_id": "Q00000"})
+
+    with database.engine.connect() as connection:
+        assert connection.execute(select(func.count()).select_from(UniprotSequence)).scalar() == 1
+
+    assert database.get("Q00000").dict()["sequence"] == test_data["sequence"]
+    rows = list(database.iter_entries(columns=["protein_id", "sequence"], as_dict=True))
+    assert [row["sequence"] for row in rows] == [test_data["sequence"]] * 4
+
+
+@pytest.mark.parametrize("deduplicate", [False, True])
+def test_filter_by_sequence(tmp_path, deduplicate):
+    from uniprotpy.models import UniprotEntry
+
+    database = UniprotDatabase(database_path=f"sqlite:///{tmp_path / 'filter.db'}", deduplicate=deduplicate)
+    database.add_many([test_data, {**test_data, "protein_id": "Q00000", "sequence": "MKT"}])
+
+    session = database.session()
+    rows = session.query(UniprotEntry).filter(UniprotEntry.sequence == "MKT").all()
+    assert [row.protein_id for row in rows] == ["Q00000"]
+    assert rows[0].sequence == "MKT"
+    session.close()
+
+
+def test_sync_deletes_orphan_sequences(tmp_path):
+    from sqlalchemy import func, select
+
+    from uniprotpy.models import UniprotSequence
+
+    database = UniprotDatabase(database_path=f"sqlite:///{tmp_path / 'orphans.db'}", deduplicate=True)
+    database.add_many([test_data, {**test_data, "protein_id": "Q00000", "sequence": "MKT"}])
+    database.sync([test_data], delete_missing=True)
+
+    with database.engine.connect() as connection:
+        assert connection.execute(select(func.count()).select_from(UniprotSequence)).scalar() == 1
+    assert database.get(test_data["protein_id"]).sequence == test_data["sequence"]
+
+
+@pytest.mark.parametrize("deduplicate", [False, True])
+def test_sync(tmp_path, deduplicate):
+    database = UniprotDatabase(database_path=f"sqlite:///{tmp_path / 'sync.db'}", deduplicate=deduplicate)
+    proteins = [{**test_data, "protein_id": f"P{i:05d}", "sequence": f"MA{i}"} for i in range(5)]
+    assert database.sync(iter(proteins)) == {"inserted": 5, "updated": 0, "deleted": 0, "unchanged": 0}
+
+    proteins[1] = {**proteins[1], "sequence_version": 2, "sequence": "MAX"}
+    proteins[2] = {**proteins[2], "gene": "DMD2"}
+    proteins.append({**test_data, "protein_id": "P00005", "taxon_id": "9606", "pe_level": "1",
+                     "sequence_version": "1", "gene_priority": "0"})
+    del proteins[0]
+    summary = database.sync(proteins, delete_missing=True, batch_size=1)
+    assert summary == {"inserted": 1, "updated": 2, "deleted": 1, "unchanged": 2}
+
+    assert database.get("P00000") is None
+    assert database.get("P00001").sequence == "MAX"
+    assert database.get("P00002").gene == "DMD2"
+    assert database.sync(proteins)["unchanged"] == 5
+
+
+def test_sync_repeated_protein_ids(tmp_path):
+    database = UniprotDatabase(database_path=f"sqlite:///{tmp_path / 'sync.db'}")
+    proteins = [test_data, test_data, {**test_data, "sequence": "MKT"}]
+    assert database.sync(proteins) == {"inserted": 1, "updated": 1, "deleted": 0, "unchanged": 1}
+    assert database.get(test_data["protein_id"]).sequence == "MKT"
+    assert database.sync(proteins[2:]) == {"inserted": 0, "updated": 0, "deleted": 0, "unchanged": 1}
+
+
+def test_migrate_backfills_sequence_hashes(tmp_path):
+    from sqlalchemy import create_engine, text
+
+    from uniprotpy.models import sequence_hash
+
+    database_path = f"sqlite:///{tmp_path / 'old.db'}"
+    database = UniprotDatabase(database_path=database_path)
+    database.add_many([{**test_data, "protein_id": f"P{i:05d}"} for i in range(3)], batch_size=2)
+    engine = create_engine(database_path)
+    with engine.begin() as connection:
+        connection.execute(text("UPDATE uniprot_entry SET sequence_hash = NULL"))
+
+    database = UniprotDatabase(database_path=database_path)
+    with engine.connect() as connection:
+        hashes = connection.execute(text("SELECT sequence_hash FROM uniprot_entry")).scalars().all()
+    assert hashes == [sequence_hash(test_data["sequence"])] * 3
+    assert database.sync([{**test_data, "protein_id": f"P{i:05d}"} for i in range(3)])["unchanged"] == 3
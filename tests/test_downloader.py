@@ -0,0 +1,64 @@
+from uniprotpy.downloader import ProteomeDownloader
+
+
+def test_download_proteomes(fake_uniprot, tmp_path):
+    downloader = ProteomeDownloader(outdir=tmp_path, max_workers=2, base_url=fake_uniprot.url)
+    for identifier in ("UP000005640", "9606"):
+        path = downloader.url(identifier)[len(fake_uniprot.url):]
+        fake_uniprot.routes[path] = f">sp|{identifier}|TEST\nMAAA\n"
+
+    paths = downloader.download(["UP000005640", 9606, "UP000000000"])
+
+    assert sorted(paths) == ["9606", "UP000005640"]
+    assert paths["9606"].read_text() == ">sp|9606|TEST\nMAAA\n"
+    assert downloader.stats.files == 2
+    assert downloader.stats.failures == 1
+    assert downloader.stats.bytes == len(">sp|9606|TEST\nMAAA\n") + len(">sp|UP000005640|TEST\nMAAA\n")
+    assert downloader.stats.bytes_per_second > 0
+
+
+def test_download_decodes_gzip_content_encoding(fake_uniprot, tmp_path):
+    import gzip
+
+    downloader = ProteomeDownloader(outdir=tmp_path, base_url=fake_uniprot.url)
+    body = b">sp|P1|TEST\nMAAA\n" * 100
+    fake_uniprot.routes[downloader.url("UP000005640")[len(fake_uniprot.url):]] = (
+        200, {"Content-Encoding": "gzip"}, gzip.compress(body))
+
+    assert downloader.download(["UP000005640"])["UP000005640"].read_bytes() == body
+
+
+def test_download_rate_limits_retries(fake_uniprot, tmp_path):
+    import time
+
+    from uniprotpy import rest
+
+    downloader = ProteomeDownloader(outdir=tmp_path, rate_limit=5, base_url=fake_uniprot.url)
+    path = downloader.url("UP000005640")[len(fake_uniprot.url):]
+    responses = [(503, {"Retry-After": "0"}, ""), ">sp|P1|TEST\nMAAA\n"]
+
+    class Flaky(dict):
+        def get(self, key, default=None):
+            return responses.pop(0) if key == path else default
+    fake_uniprot.routes = Flaky()
+
+    rest.configure(retry=rest.RetryPolicy(backoff=0.001))
+    try:
+        start = time.monotonic()
+        assert "UP000005640" in downloader.download(["UP000005640"])
+        assert time.monotonic() - start >= 0.19
+    finally:
+        rest.configure()
+    assert len(fake_uniprot.requests) == 2
+
+
+def test_rate_limiter_spaces_requests():
+    import time
+
+    from uniprotpy.rest import RateLimiter
+
+    limiter = RateLimiter(rate=20)
+    start = time.monotonic()
+    for _ in range(5):
+        limiter.wait("https://rest.uniprot.org/a")
+    assert time.monotonic() - start >= 0.19
@@ -0,0 +1,73 @@
+import os
+
+import pytest
+
+from uniprotpy.fasta_index import FastaIndex, FastaIndexBuilder, build_fasta_index
+from uniprotpy.parser import iter_fasta
+
+
+fasta = (
+    b">sp|P1|A_HUMAN Protein A OS=Homo sapiens OX=9606 GN=A PE=1 SV=1\n"
+    b"MAAAAAAAAA\nCCCCCCCCCC\nDDDDD\n"
+    b">sp|P1-2|A_HUMAN Isoform 2 of Protein A OS=Homo sapiens OX=9606 GN=A\n"
+    b"MEEE\nFF\nGGGG\n"
+    b">tr|Q2|B_HUMAN Protein B OS=Homo sapiens OX=9606 PE=3 SV=1\r\n"
+    b"MKKK\r\nLLLL\r\nPP"
+)
+
+
+@pytest.fixture
+def fasta_path(tmp_path):
+    path = tmp_path / "proteome.fasta"
+    path.write_bytes(fasta)
+    return path
+
+
+def test_get_sequence(fasta_path):
+    expected = {header.split("|")[1]: sequence for header, sequence in iter_fasta(str(fasta_path))}
+    with FastaIndex(fasta_path.parent) as index:
+        assert len(index) == 3
+        assert {accession: index[accession] for accession in index} == expected
+        assert index.entries["P1"].line_bases == 10
+        assert index.entries["P1-2"].line_bases == 0 # uneven lines
+
+        for accession, sequence in expected.items():
+            for start, end in [(0, 1), (3, 12), (9, 11), (5, None), (-4, None), (20, 30)]:
+                assert index.get_sequence(accession, start, end) == sequence[start:end]
+        assert "P3" not in index
+
+
+def test_builder_matches_file_chunks(fasta_path, tmp_path):
+    build_fasta_index(fasta_path, tmp_path / "whole.idx", chunk_size=1 << 20)
+    builder = FastaIndexBuilder()
+    for i in range(0, len(fasta), 7):
+        builder.feed(fasta[i:i + 7])
+    builder.write(fasta_path, tmp_path / "chunks.idx")
+    assert (tmp_path / "whole.idx").read_text() == (tmp_path / "chunks.idx").read_text()
+
+
+def test_rebuilds_when_fasta_changes(fasta_path):
+    index = FastaIndex(fasta_path)
+    assert index["Q2"] == "MKKKLLLLPP"
+
+    fasta_path.write_bytes(b">sp|Q2|B_HUMAN Protein B\nMW\n")
+    stat = os.stat(fasta_path)
+    os.utime(fasta_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert index["Q2"] == "MW"
+    assert len(FastaIndex(fasta_path)) == 1
+    index.close()
+
+
+def test_get_proteome_writes_index(fake_uniprot, tmp_path, monkeypatch):
+    import gzip
+
+    from uniprotpy import rest
+    from uniprotpy.helpers import get_proteome
+
+    monkeypatch.setattr(rest, "BASE_URL", fake_uniprot.url)
+    path = "/uniprotkb/stream?compressed=true&format=fasta&includeIsoform=true&query=(proteome:UP000005640)"
+    fake_uniprot.routes[path] = gzip.compress(fasta)
+
+    output_file = get_proteome("UP000005640", output_file=tmp_path / "UP000005640.fasta", index=True)
+    assert (tmp_path / "UP000005640.fasta.idx").exists()
+    assert FastaIndex(output_file).get_sequence("P1", 8, 12) == "AACC"
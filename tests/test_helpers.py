@@ -0,0 +1,86 @@
+import csv
+
+import pytest
+
+from uniprotpy.helpers import batched, proteome_to_csv, proteome_to_tsv
+
+
+proteins = [
+    {
+        "protein_id": f"P{i:05d}",
+        "protein_name": "Dystrophin",
+        "species": "Homo sapiens",
+        "taxon_id": "9606",
+        "gene": "DMD",
+        "pe_level": "1",
+        "sequence_version": "1",
+        "gene_priority": "0",
+        "sequence": "MLWWEEVEDCYERE",
+    }
+    for i in range(5)
+]
+
+
+def test_batched():
+    assert [len(batch) for batch in batched(range(5), 2)] == [2, 2, 1]
+
+
+def test_proteome_to_csv_from_iterator(tmp_path):
+    output_file = tmp_path / "proteome.csv"
+    proteome_to_csv(iter(proteins), output_file, batch_size=2)
+
+    with open(output_file) as f:
+        assert list(csv.DictReader(f)) == proteins
+
+
+def test_proteome_to_tsv_from_dict(tmp_path):
+    output_file = tmp_path / "proteome.tsv"
+    proteome_to_tsv({protein["protein_id"]: protein for protein in proteins}, output_file)
+
+    with open(output_file) as f:
+        assert list(csv.DictReader(f, delimiter="\t")) == proteins
+
+
+def test_get_proteome_to_file(fake_uniprot, tmp_path, monkeypatch):
+    import gzip
+
+    from uniprotpy import rest
+    from uniprotpy.helpers import get_proteome
+
+    monkeypatch.setattr(rest, "BASE_URL", fake_uniprot.url)
+    body = b">sp|P1|TEST\nMAAA\n"
+    path = "/uniprotkb/stream?compressed=true&format=fasta&includeIsoform=true&query=(proteome:UP000005640)"
+    fake_uniprot.routes[path] = gzip.compress(body)
+
+    assert get_proteome("UP000005640", output_file=tmp_path / "p.fasta").read_bytes() == body
+    compressed = get_proteome("UP000005640", compress=True, output_file=tmp_path / "p.fasta.gz")
+    assert gzip.decompress(compressed.read_bytes()) == body
+
+
+def test_proteome_to_parquet_and_arrow(tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+
+    from uniprotpy.helpers import proteome_to_arrow, proteome_to_parquet
+
+    mixed = proteins + [{**proteins[0], "protein_id": "Q00000", "gene": "", "pe_level": "", "gene_priority": "1"}]
+
+    proteome_to_parquet(iter(mixed), tmp_path / "proteome.parquet", batch_size=2)
+    parquet_file = pq.ParquetFile(tmp_path / "proteome.parquet")
+    assert parquet_file.metadata.num_row_groups == 3
+    table = pq.read_table(tmp_path / "proteome.parquet", columns=["protein_id", "gene", "pe_level", "gene_priority"],
+                          read_dictionary=["gene"])
+    assert table.schema.field("gene").type == pa.dictionary(pa.int32(), pa.string())
+    assert table.column("pe_level").to_pylist() == [1] * 5 + [None]
+    assert table.column("gene_priority").to_pylist() == [False] * 5 + [True]
+
+    proteome_to_arrow(iter(mixed), tmp_path / "proteome.arrow", batch_size=4)
+    with pa.memory_map(str(tmp_path / "proteome.arrow")) as source:
+        reader = pa.ipc.open_file(source)
+        table = reader.read_all()
+        # the second batch only adds its new gene to the dictionary
+        assert reader.stats.num_dictionary_deltas == 1
+        assert reader.stats.num_replaced_dictionaries == 0
+    assert table.column("gene").to_pylist() == ["DMD"] * 5 + [""]
+    assert table.column("taxon_id").to_pylist() == [9606] * 6
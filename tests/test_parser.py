@@ -30,3 +30,74 @@ def test_parse_proteome():
         # Call the parse_proteome function with the mocked objects
         result = parse_proteome("dummy_path")
         assert result[test_result_expected["protein_id"]] == test_result_expected
+
+
+test_fasta = (
+    ">tr|A0A075B6G3|A0A075B6G3_HUMAN Dystrophin OS=Homo sapiens OX=9606 GN=DMD PE=1 SV=1\n"
+    "MLWWEEVEDCYEREDVQKKTFTKWVNAQFSKFGKQH\n"
+    "IENLFSDLQDGRRLLDLLEGLTGQ\n"
+    ">sp|P69905-2|HBA_HUMAN Isoform 2 of Hemoglobin subunit alpha OS=Homo sapiens OX=9606 GN=HBA1\n"
+    "MVLSPADKTNVKAAWGKVGAHAGEYGAEALERMFLSFPTTKTYFPHF\n"
+    ">sp|P0DTC2|SPIKE_SARS2 Spike glycoprotein OS=Severe acute respiratory syndrome coronavirus 2 OX=2697049 PE=1 SV=1\n"
+    "MFVFLVLLPLVSSQCVNLTTRTQLPPAYTNSFTRGVYYPDKVFRSS\n"
+)
+
+
+def test_parse_proteome_streaming(tmp_path):
+    path = tmp_path / "proteome.fasta"
+    path.write_text(test_fasta)
+
+    result = parse_proteome(path, streaming=True)
+    assert result[test_result_expected["protein_id"]] == test_result_expected
+    assert result == parse_proteome(str(path))
+
+
+def test_parse_proteome_streaming_sources(tmp_path):
+    import gzip
+    import io
+
+    expected = parse_proteome(io.StringIO(test_fasta))
+    data = test_fasta.encode()
+    assert parse_proteome(data, streaming=True) == expected
+    assert parse_proteome(gzip.compress(data), streaming=True) == expected
+    assert parse_proteome(io.BytesIO(data), streaming=True) == expected
+    assert parse_proteome(io.StringIO(test_fasta), streaming=True) == expected
+
+
+def test_parse_proteome_streaming_crlf(tmp_path):
+    import io
+
+    expected = parse_proteome(io.StringIO(test_fasta), streaming=True)
+    crlf = test_fasta.replace("\n", "\r\n")
+    path = tmp_path / "proteome.fasta"
+    path.write_bytes(crlf.encode())
+    assert parse_proteome(io.StringIO(crlf, newline=""), streaming=True) == expected
+    assert parse_proteome(path, streaming=True) == expected
+
+
+def test_iter_proteome_is_lazy():
+    import io
+
+    from uniprotpy.parser import iter_proteome
+
+    proteins = iter_proteome(io.StringIO(test_fasta))
+    assert next(proteins) == test_result_expected
+    assert [protein["protein_id"] for protein in proteins] == ["P69905-2", "P0DTC2"]
+
+
+def test_iter_proteome_parallel(tmp_path):
+    from uniprotpy.parser import iter_proteome, iter_proteome_parallel, shard_offsets
+
+    path = tmp_path / "proteome.fasta"
+    path.write_text("".join(
+        f">sp|P{i:05d}|P{i}_HUMAN Protein {i} OS=Homo sapiens OX=9606 GN=G{i} PE=1 SV=1\nMA{'C' * i}\n"
+        for i in range(50)
+    ))
+
+    shards = shard_offsets(path, 8)
+    assert shards[0][0] == 0 and shards[-1][1] == path.stat().st_size
+    data = path.read_bytes()
+    assert all(data[start:start + 1] == b">" for start, _ in shards)
+
+    proteins = list(iter_proteome_parallel(str(path), workers=2, shard_size=256))
+    assert proteins == list(iter_proteome(str(path)))
@@ -0,0 +1,39 @@
+from uniprotpy.protein_tree import create_protein_tree
+
+
+proteome = b"""\
+>sp|P1|A_HUMAN Protein A OS=Homo sapiens OX=9606 GN=GENEA PE=1 SV=1
+MAAA
+>sp|P2|B_HUMAN Protein B OS=Homo sapiens OX=9606 GN=GENEA PE=1 SV=1
+MAAB
+>tr|P3|C_HUMAN Protein C OS=Homo sapiens OX=9606 PE=1 SV=1
+MAAC
+>sp|P4|D_HUMAN Protein D OS=Homo sapiens OX=9606 GN=GENEB
+MAAD
+>sp|P5|E_HUMAN Protein E OS=Homo sapiens OX=9606 GN=P1 PE=2 SV=1
+MAAE
+"""
+gp_proteome = b">sp|P1|A_HUMAN Protein A\nMAAA\n>sp|P4|D_HUMAN Protein D\nMAAD\n"
+
+
+def test_create_protein_tree(tmp_path):
+    output_file = tmp_path / "tree.txt"
+    tree = create_protein_tree(proteome, gp_proteome, output_file)
+
+    assert tree == {'GENEA': ['P1', 'P2'], '': ['P3'], 'GENEB': ['P4'], 'P1': ['P5']}
+    assert output_file.read_text() == (
+        "GENEA\n"
+        "├── P1*\n"
+        "│   └── P5\n"
+        "└── P2\n"
+        "\n"
+        "└── P3\n"
+        "GENEB\n"
+        "└── P4*\n"
+    )
+
+
+def test_create_protein_tree_without_output(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert create_protein_tree(proteome, gp_proteome)['GENEB'] == ['P4']
+    assert not list(tmp_path.iterdir())
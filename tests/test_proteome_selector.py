@@ -0,0 +1,157 @@
+import json
+
+import pytest
+import requests
+
+from uniprotpy import rest
+from uniprotpy.proteome_selector import ProteomeSelector
+
+
+def make_selector(taxon_id):
+    """Build a ProteomeSelector without fetching its proteome list."""
+    selector = ProteomeSelector.__new__(ProteomeSelector)
+    selector.taxon_id = taxon_id
+    return selector
+
+
+def add_protein_pages(server, taxon_id, pages, total):
+    """Register paginated all-proteins search results on the fake server."""
+    paths = [f"/uniprotkb/search?format=fasta&query=taxonomy_id:{taxon_id}&size=500"]
+    paths += [f"/uniprotkb/search?format=fasta&query=taxonomy_id:{taxon_id}&size=500&cursor={i}"
+              for i in range(1, len(pages))]
+    for i, (path, page) in enumerate(zip(paths, pages)):
+        headers = {"X-Total-Results": str(total)}
+        if i + 1 < len(paths):
+            headers["Link"] = f'<{server.url}{paths[i + 1]}>; rel="next"'
+        server.routes[path] = (200, headers, page)
+    return paths
+
+
+def test_get_all_proteins_resumes(fake_uniprot, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(rest, "BASE_URL", fake_uniprot.url)
+    pages = [">sp|P1|A\nMA\n>sp|P2|B\nMC\n", ">sp|P3|C\nMD\n", ">sp|P4|D\nME\n"]
+    paths = add_protein_pages(fake_uniprot, "9606", pages, total=4)
+    (tmp_path / "data" / "9606").mkdir(parents=True)
+
+    # the second page fails the first time round
+    second_page = fake_uniprot.routes.pop(paths[1])
+    with pytest.raises(requests.HTTPError):
+        make_selector("9606")._get_all_proteins()
+    assert not (tmp_path / "data" / "9606" / "proteome.fasta").exists()
+    manifest = json.loads((tmp_path / "data" / "9606" / "proteome.fasta.manifest.json").read_text())
+    assert manifest["records"] == 2
+
+    fake_uniprot.routes[paths[1]] = second_page
+    fake_uniprot.requests.clear()
+    make_selector("9606")._get_all_proteins()
+
+    assert (tmp_path / "data" / "9606" / "proteome.fasta").read_text() == "".join(pages)
+    assert not (tmp_path / "data" / "9606" / "proteome.fasta.manifest.json").exists()
+    assert fake_uniprot.requests == paths[1:]
+
+
+def test_get_all_proteins_checks_total(fake_uniprot, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(rest, "BASE_URL", fake_uniprot.url)
+    add_protein_pages(fake_uniprot, "9606", [">sp|P1|A\nMA\n"], total=2)
+    (tmp_path / "data" / "9606").mkdir(parents=True)
+
+    with pytest.raises(RuntimeError):
+        make_selector("9606")._get_all_proteins()
+    assert not (tmp_path / "data" / "9606" / "proteome.fasta").exists()
+
+
+@pytest.mark.parametrize("chunk_size", [3, 1 << 20])
+def test_get_all_proteins_counts_records_not_gt_signs(fake_uniprot, tmp_path, monkeypatch, chunk_size):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(rest, "BASE_URL", fake_uniprot.url)
+    monkeypatch.setattr(rest, "CHUNK_SIZE", chunk_size)
+    pages = [">sp|P1|A 1->4-alpha-glucan branching enzyme\nMA\n>sp|P2|B 2'->5' ligase\nMC\n", ">sp|P3|C\nMD\n"]
+    add_protein_pages(fake_uniprot, "9606", pages, total=3)
+    (tmp_path / "data" / "9606").mkdir(parents=True)
+
+    make_selector("9606")._get_all_proteins()
+    assert (tmp_path / "data" / "9606" / "proteome.fasta").read_text() == "".join(pages)
+
+
+def test_proteome_to_csv(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "data" / "9606").mkdir(parents=True)
+    (tmp_path / "data" / "9606" / "proteome.fasta").write_text(
+        ">sp|P1|A_HUMAN Protein A OS=Homo sapiens OX=9606 GN=GENEA PE=1 SV=1\nMA\nAA\n"
+        ">sp|P1-2|A_HUMAN Isoform 2 of Protein A OS=Homo sapiens OX=9606 GN=GENEA\nMC\n"
+        ">tr|P2|B_HUMAN Protein B OS=Homo sapiens OX=9606 PE=3 SV=1\nMD\n"
+    )
+    (tmp_path / "data" / "9606" / "gp_proteome.fasta").write_text(">sp|P1|A_HUMAN Protein A\nMAAA\n")
+
+    make_selector("9606").proteome_to_csv(chunk_size=2)
+
+    assert (tmp_path / "data" / "9606" / "proteome.csv").read_text().splitlines() == [
+        "Database,Gene Symbol,UniProt ID,Gene Priority,Protein Existence Level,Sequence",
+        "sp,GENEA,P1,1,1,MAAA",
+        "sp,GENEA,P1-2,0,0,MC",
+        "tr,,P2,0,3,MD",
+    ]
+
+
+def test_proteome_to_parquet(tmp_path, monkeypatch):
+    pq = pytest.importorskip("pyarrow.parquet")
+
+    from uniprotpy.helpers import proteome_schema
+
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "data" / "9606").mkdir(parents=True)
+    (tmp_path / "data" / "9606" / "proteome.fasta").write_text(
+        ">sp|P1|A_HUMAN Protein A OS=Homo sapiens OX=9606 GN=GENEA PE=1 SV=1\nMA\nAA\n"
+        ">tr|P2|B_HUMAN Protein B OS=Homo sapiens OX=9606 PE=3 SV=1\nMD\n"
+    )
+    (tmp_path / "data" / "9606" / "gp_proteome.fasta").write_text(">sp|P1|A_HUMAN Protein A\nMAAA\n")
+
+    make_selector("9606").proteome_to_csv(format="parquet", chunk_size=1)
+
+    parquet_file = pq.ParquetFile(tmp_path / "data" / "9606" / "proteome.parquet")
+    assert parquet_file.metadata.num_row_groups == 2
+    assert parquet_file.schema_arrow.names == proteome_schema().names
+    table = parquet_file.read(columns=["protein_id", "gene", "pe_level", "gene_priority", "sequence"])
+    assert table.to_pylist() == [
+        {"protein_id": "P1", "gene": "GENEA", "pe_level": 1, "gene_priority": True, "sequence": "MAAA"},
+        {"protein_id": "P2", "gene": "", "pe_level": 3, "gene_priority": False, "sequence": "MD"},
+    ]
+
+
+def add_proteome_list(server, taxon_id, rows, reference_only=False):
+    """Register a proteome list TSV on the fake server."""
+    query = f"(proteome_type:1)AND(taxonomy_id:{taxon_id})" if reference_only else f"(taxonomy_id:{taxon_id})"
+    path = f"/proteomes/stream?format=tsv&fields=upid,organism_id,protein_count,proteome_type&query={query}"
+    server.routes[path] = "Proteome Id\tOrganism Id\tProtein count\tProteome type\n" + "".join(
+        "\t".join(map(str, row)) + "\n" for row in rows
+    )
+
+
+@pytest.mark.parametrize("rows, expected", [
+    # representative beats a larger reference proteome
+    ([("UP1", 1, 10, "Reference and representative proteome"), ("UP2", 1, 50, "Reference proteome")],
+     ("UP1", 1, "Representative", 10)),
+    ([("UP1", 1, 10, "Reference proteome"), ("UP2", 1, 50, "Reference proteome")],
+     ("UP2", 1, "Reference", 50)),
+    # without any redundant proteome, the largest one is "Other"
+    ([("UP1", 1, 10, "Other proteome"), ("UP2", 2, 50, "Other proteome")],
+     ("UP2", 2, "Other", 50)),
+    ([("UP1", 1, 10, "Other proteome"), ("UP2", 1, 50, "Redundant proteome")],
+     ("UP1", 1, "Non-redundant", 10)),
+    ([("UP1", 1, 10, "Redundant proteome"), ("UP2", 1, 50, "Redundant proteome")],
+     ("UP2", 1, "Other", 50)),
+    # ties go to the first proteome listed
+    ([("UP1", 1, 50, "Other proteome"), ("UP2", 1, 50, "Other proteome")],
+     ("UP1", 1, "Other", 50)),
+    ([], ("None", "7", "All-proteins", None)),
+])
+def test_choose_proteome(fake_uniprot, monkeypatch, rows, expected):
+    monkeypatch.setattr(rest, "BASE_URL", fake_uniprot.url)
+    add_proteome_list(fake_uniprot, "7", [], reference_only=True)
+    add_proteome_list(fake_uniprot, "7", rows)
+
+    selector = ProteomeSelector("7")
+    assert selector.num_of_proteomes == len(rows) + 1
+    assert (*selector.choose_proteome(), selector.protein_count) == expected
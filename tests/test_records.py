@@ -0,0 +1,32 @@
+from uniprotpy.parser import iter_proteome
+from uniprotpy.records import ProteinRecord, ProteomeTable, iter_records
+
+
+fasta = (
+    b">sp|P1|A_HUMAN Protein A OS=Homo sapiens OX=9606 GN=A PE=1 SV=2\nMAAA\n"
+    b">sp|P1-2|A_HUMAN Isoform 2 of Protein A OS=Homo sapiens OX=9606 GN=A\nMAAC\n"
+    b">tr|Q2|B_MOUSE Protein B OS=Mus musculus OX=10090 PE=3 SV=1 GP=1\nMD\n"
+)
+
+
+def test_protein_record_types():
+    record = next(iter_records(fasta))
+    assert record == ProteinRecord("P1", "Protein A", "Homo sapiens", 9606, "A", 1, 2, False, "MAAA")
+    assert record.to_entry().dict() == record._asdict()
+
+
+def test_proteome_table_round_trip():
+    table = ProteomeTable.from_fasta(fasta)
+    records = [ProteinRecord.from_dict(protein) for protein in iter_proteome(fasta)]
+
+    assert len(table) == 3
+    assert list(table) == records
+    assert table.genes == ["A", ""]
+    assert table.get("Q2").gene_priority is True
+    assert table.get("missing") is None
+
+    df = table.to_pandas()
+    assert df["species"].cat.categories.tolist() == ["Homo sapiens", "Mus musculus"]
+    assert df["sequence"].tolist() == ["MAAA", "MAAC", "MD"]
+    assert df["taxon_id"].tolist() == [9606, 9606, 10090]
+    assert [entry.protein_id for entry in table.to_entries()] == ["P1", "P1-2", "Q2"]
@@ -0,0 +1,130 @@
+import email.utils
+import gzip
+import socket
+import time
+
+import pytest
+import requests
+
+from uniprotpy import rest
+
+
+def test_gunzip_chunks_multiple_members():
+    data = gzip.compress(b">a\nMAAA\n") + gzip.compress(b">b\nMCCC\n")
+    chunks = [data[i:i + 7] for i in range(0, len(data), 7)]
+    assert b"".join(rest.gunzip_chunks(chunks)) == b">a\nMAAA\n>b\nMCCC\n"
+
+
+def test_stream_to_file_decompress(fake_uniprot, tmp_path):
+    body = b">sp|P1|TEST\nMAAA\n" * 1000
+    fake_uniprot.routes["/proteome.fasta.gz"] = gzip.compress(body)
+    path = tmp_path / "proteome.fasta"
+
+    written = rest.stream_to_file(f"{fake_uniprot.url}/proteome.fasta.gz", path, decompress=True, chunk_size=64)
+    assert written == len(body)
+    assert path.read_bytes() == body
+
+    rest.stream_to_file(f"{fake_uniprot.url}/proteome.fasta.gz", path, decompress=True, append=True)
+    assert path.read_bytes() == body * 2
+
+
+def test_stream_to_file_gzip_content_encoding(fake_uniprot, tmp_path):
+    body = b">sp|P1|TEST\nMAAA\n" * 1000
+    compressed = gzip.compress(body)
+    fake_uniprot.routes["/proteome.fasta"] = (200, {"Content-Encoding": "gzip"}, compressed)
+    url = f"{fake_uniprot.url}/proteome.fasta"
+    path = tmp_path / "proteome.fasta"
+
+    assert rest.stream_to_file(url, path, chunk_size=64) == len(body)
+    assert path.read_bytes() == body
+    rest.stream_to_file(url, path, decompress=True)
+    assert path.read_bytes() == body
+
+    assert rest.stream_to_file(url, path, chunk_size=64, keep_compressed=True) == len(compressed)
+    assert path.read_bytes() == compressed
+
+
+@pytest.fixture
+def fast_retries():
+    rest.configure(retry=rest.RetryPolicy(backoff=0.01))
+    yield
+    rest.configure()
+
+
+def flaky_routes(path, responses):
+    class Flaky(dict):
+        def get(self, key, default=None):
+            return responses.pop(0) if key == path else default
+    return Flaky()
+
+
+def test_get_retries_transient_errors(fake_uniprot, fast_retries):
+    fake_uniprot.routes = flaky_routes("/proteomes", [(503, {"Retry-After": "0"}, ""), (429, {}, ""), "upid\nUP1\n"])
+    metrics = rest.RequestMetrics()
+    rest.add_hook(metrics.record)
+    try:
+        response = rest.get(f"{fake_uniprot.url}/proteomes")
+    finally:
+        rest.remove_hook(metrics.record)
+
+    assert response.text == "upid\nUP1\n"
+    assert len(fake_uniprot.requests) == 3
+    stats = metrics.as_dict()[f"127.0.0.1:{fake_uniprot.server_address[1]}/proteomes"]
+    assert (stats["requests"], stats["retries"], stats["errors"], stats["bytes"]) == (3, 2, 2, 9)
+    assert sum(stats["histogram"].values()) == 3
+
+
+def test_get_does_not_retry_client_errors(fake_uniprot, fast_retries):
+    assert rest.get(f"{fake_uniprot.url}/missing").status_code == 404
+    assert len(fake_uniprot.requests) == 1
+
+
+def test_gives_up_after_retries(fake_uniprot):
+    rest.configure(retry=rest.RetryPolicy(retries=1, backoff=0.01))
+    try:
+        fake_uniprot.routes["/busy"] = (503, {}, "")
+        assert rest.get(f"{fake_uniprot.url}/busy").status_code == 503
+    finally:
+        rest.configure()
+    assert len(fake_uniprot.requests) == 2
+
+
+def test_retry_delay_honors_retry_after():
+    policy = rest.RetryPolicy(backoff=1, max_backoff=4)
+    assert 1 <= policy.delay(1) <= 2
+    assert 2 <= policy.delay(10) <= 4
+    assert policy.delay(0, "30") == 30
+    date = email.utils.formatdate(time.time() + 120, usegmt=True)
+    assert 100 < rest.parse_retry_after(date) <= 120
+    assert rest.parse_retry_after("soon") == 0
+
+
+def test_rate_limiter_allows_bursts():
+    limiter = rest.RateLimiter(rate=10, burst=3)
+    start = time.perf_counter()
+    for _ in range(3):
+        limiter.wait("https://rest.uniprot.org/a")
+    assert time.perf_counter() - start < 0.05
+    limiter.wait("https://rest.uniprot.org/a")
+    assert time.perf_counter() - start >= 0.09
+    # other hosts have their own bucket
+    start = time.perf_counter()
+    limiter.wait("https://ftp.uniprot.org/a")
+    assert time.perf_counter() - start < 0.05
+
+
+def test_stream_to_file_retries_connection_errors_once(tmp_path):
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    events = []
+    rest.configure(retry=rest.RetryPolicy(retries=2, backoff=0.01))
+    rest.add_hook(events.append)
+    try:
+        with pytest.raises(requests.ConnectionError):
+            rest.stream_to_file(f"http://127.0.0.1:{port}/proteome.fasta", tmp_path / "proteome.fasta")
+    finally:
+        rest.remove_hook(events.append)
+        rest.configure()
+    assert [event.attempt for event in events] == [0, 1, 2]
+    assert [event.will_retry for event in events] == [True, True, False]
@@ -0,0 +1,76 @@
+import pytest
+
+from uniprotpy.taxon_index import TaxonIndex
+from uniprotpy.taxon_tree import traverse_tree
+
+# (taxon, parent, name) for a slice of the NCBI taxonomy around the homo genus
+taxa = [
+    (1, 1, "root"),
+    (9604, 1, "Hominidae"),
+    (9605, 9604, "Homo"),
+    (9606, 9605, "Homo sapiens"),
+    (63221, 9606, "Homo sapiens neanderthalensis"),
+    (741158, 9606, "Homo sapiens subsp. 'Denisova'"),
+    (1425170, 9605, "Homo heidelbergensis"),
+    (2665952, 9605, "environmental samples"),
+    (2665953, 2665952, "Homo sapiens environmental sample"),
+    (9596, 9604, "Pan"),
+    (9598, 9596, "Pan troglodytes"),
+]
+
+
+@pytest.fixture
+def index(tmp_path):
+    with open(tmp_path / "nodes.dmp", "w") as f:
+        for taxon_id, parent_id, _ in reversed(taxa):
+            f.write(f"{taxon_id}\t|\t{parent_id}\t|\tspecies\t|\t\t|\n")
+    with open(tmp_path / "names.dmp", "w") as f:
+        for taxon_id, _, name in taxa:
+            f.write(f"{taxon_id}\t|\t{name}\t|\t\t|\tscientific name\t|\n")
+            f.write(f"{taxon_id}\t|\tsynonym {taxon_id}\t|\t\t|\tsynonym\t|\n")
+    return TaxonIndex.from_ncbi_dump(tmp_path / "nodes.dmp", tmp_path / "names.dmp")
+
+
+def test_taxon_index_queries(index):
+    assert len(index) == len(taxa)
+    assert index.name(9606) == "Homo sapiens"
+    assert index.parent_of(9606) == 9605
+    assert index.parent_of(1) is None
+    assert index.children_of(9605) == [9606, 1425170, 2665952]
+    assert sorted(index.descendants(9605)) == [9606, 63221, 741158, 1425170, 2665952, 2665953]
+    assert index.ancestors(63221) == [9606, 9605, 9604, 1]
+    assert index.is_descendant(63221, 9605)
+    assert not index.is_descendant(9598, 9605)
+    assert not index.is_descendant(9605, 9605)
+    assert index.lca(63221, 2665953) == 9605
+    assert index.lca(63221, 9598) == 9604
+    assert index.lca(9606, 63221) == 9606
+    with pytest.raises(KeyError):
+        index.parent_of(42)
+
+
+def test_taxon_index_save_and_load(index, tmp_path):
+    index.save(tmp_path / "taxonomy.idx")
+    loaded = TaxonIndex.load(tmp_path / "taxonomy.idx")
+
+    assert loaded.name(741158) == "Homo sapiens subsp. 'Denisova'"
+    assert loaded.descendants(9604) == index.descendants(9604)
+    assert loaded.lca(9598, 2665953) == 9604
+
+
+def test_taxon_index_from_uniprot_tsv(tmp_path):
+    with open(tmp_path / "taxonomy.tsv", "w") as f:
+        f.write("Taxon Id\tScientific name\tParent\n")
+        for taxon_id, parent_id, name in taxa[2:9]:
+            f.write(f"{taxon_id}\t{name}\t{parent_id}\n")
+    index = TaxonIndex.from_uniprot_tsv(tmp_path / "taxonomy.tsv")
+
+    assert index.parent_of(9605) is None
+    assert index.name(1425170) == "Homo heidelbergensis"
+
+
+def test_traverse_tree_with_index(index):
+    assert traverse_tree(9605, index=index) == {
+        9605: [{9606: [63221, 741158]}, 1425170, {2665952: [2665953]}]
+    }
+    assert traverse_tree(9598, index=index) == 9598
@@ -0,0 +1,105 @@
+from uniprotpy import taxon_tree
+
+
+# the homo genus from the create_taxon_tree docstring
+homo_children = {
+    9605: [9606, 1425170, 2665952, 2813598],
+    9606: [63221, 741158],
+    2665952: [2665953],
+    2813598: [2813599],
+}
+homo_tree = {9605: [{9606: [63221, 741158]}, 1425170, {2665952: [2665953]}, {2813598: [2813599]}]}
+
+
+def fake_get_taxa_children(taxon_ids):
+    return {
+        int(parent): [{'Taxon Id': child, 'Scientific name': str(child)} for child in homo_children[int(parent)]]
+        for parent in taxon_ids if int(parent) in homo_children
+    }
+
+
+def test_traverse_tree(monkeypatch):
+    monkeypatch.setattr(taxon_tree, "get_taxa_children", fake_get_taxa_children)
+
+    assert taxon_tree.traverse_tree(9605, batch_size=2) == homo_tree
+    assert taxon_tree.traverse_tree(9605, as_adjacency=True) == homo_children
+    assert taxon_tree.traverse_tree(63221) == 63221
+
+
+def test_traverse_tree_limits(monkeypatch):
+    requested = []
+
+    def get_taxa_children(taxon_ids):
+        requested.extend(taxon_ids)
+        return fake_get_taxa_children(taxon_ids)
+    monkeypatch.setattr(taxon_tree, "get_taxa_children", get_taxa_children)
+
+    assert taxon_tree.traverse_tree(9605, max_depth=2) == {9605: [9606, 1425170, 2665952, 2813598]}
+    assert requested == [9605]
+    assert taxon_tree.traverse_tree(9605, max_nodes=6) == {9605: [{9606: [63221]}, 1425170, 2665952, 2813598]}
+    assert taxon_tree.traverse_tree(9605, max_depth=1) == 9605
+    assert taxon_tree.limit_adjacency(9605, homo_children, max_nodes=3) == {9605: [9606, 1425170]}
+
+
+def test_get_taxa_children(fake_uniprot, monkeypatch):
+    monkeypatch.setattr(taxon_tree, "BASE_URL", f"{fake_uniprot.url}/taxonomy/stream")
+    fake_uniprot.routes["/taxonomy/stream?fields=id%2Cscientific_name%2Cparent&format=tsv"
+                        "&query=%28parent%3A9606%29%20OR%20%28parent%3A2665952%29"] = (
+        "Taxon Id\tScientific name\tParent\n"
+        "63221\tHomo sapiens neanderthalensis\t9606\n"
+        "741158\tHomo sapiens subsp. 'Denisova'\t9606\n"
+        "2665953\tHomo naledi\t2665952\n"
+    )
+
+    children = taxon_tree.get_taxa_children([9606, 2665952])
+    assert [child["Taxon Id"] for child in children[9606]] == [63221, 741158]
+    assert children[2665952] == [{"Taxon Id": 2665953, "Scientific name": "Homo naledi"}]
+
+
+def test_adjacency_to_tree_deep():
+    adjacency = {i: [i + 1] for i in range(5000)}
+    tree = taxon_tree.adjacency_to_tree(0, adjacency)
+    for i in range(5000):
+        tree = tree[i][0]
+    assert tree == 5000
+
+
+def test_create_taxon_tree():
+    import io
+
+    output = io.StringIO()
+    taxon_tree.create_taxon_tree(homo_tree, file=output)
+    assert output.getvalue() == (
+        "└──9605\n"
+        "    ├──9606\n"
+        "    │   ├──63221\n"
+        "    │   └──741158\n"
+        "    ├──1425170\n"
+        "    ├──2665952\n"
+        "    │   └──2665953\n"
+        "    └──2813598\n"
+        "        └──2813599\n"
+    )
+
+    output = io.StringIO()
+    taxon_tree.create_taxon_tree(homo_tree, file=output, max_depth=2, max_nodes=4)
+    assert output.getvalue() == "└──9605\n    ├──9606\n    ├──1425170\n    ├──2665952\n"
+
+
+def test_write_newick_and_json():
+    import io
+    import json
+
+    output = io.StringIO()
+    taxon_tree.write_newick(homo_tree, file=output)
+    assert output.getvalue() == "((63221,741158)9606,1425170,(2665953)2665952,(2813599)2813598)9605;\n"
+
+    output = io.StringIO()
+    taxon_tree.write_json(homo_tree, file=output)
+    root = json.loads(output.getvalue())[0]
+    assert root["taxon_id"] == 9605
+    assert root["children"][0] == {"taxon_id": 9606, "children": [{"taxon_id": 63221}, {"taxon_id": 741158}]}
+
+    output = io.StringIO()
+    taxon_tree.write_newick(9606, file=output)
+    assert output.getvalue() == ""
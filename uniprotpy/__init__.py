@@ -1,3 +1,5 @@
 from .proteome_selector import ProteomeSelector
+from .batch_selector import BatchProteomeSelector
+from .async_client import AsyncUniprotClient
 
-from .version import __version__
\ No newline at end of file
+from .version import __version__
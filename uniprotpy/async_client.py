@@ -0,0 +1,175 @@
+"""Asyncio client for the UniProt REST API (needs aiohttp)."""
+import asyncio
+import os
+import re
+import time
+from typing import AsyncIterator, Dict, List
+from urllib.parse import quote
+
+from . import rest
+from .proteome_selector import parse_proteome_list, proteome_list_url
+from .taxon_tree import parse_taxa_children, taxa_children_url
+
+NEXT_LINK_REGEX = re.compile(r'<(.+)>; rel="next"')
+
+
+class AsyncUniprotClient:
+    """Make UniProt requests from asyncio code over one connection pool.
+
+    At most concurrency requests are in flight at a time. Responses with a
+    429 or 5xx status, and connection errors, are retried up to retries
+    times with exponential backoff and jitter, waiting at least as long as
+    a Retry-After header asks (see rest.RetryPolicy). Every attempt is
+    reported to the rest hooks, so a rest.RequestMetrics counts these
+    requests too.
+
+    Use it as an async context manager:
+
+        async with AsyncUniprotClient() as client:
+            proteomes = await client.get_proteome_list('9606')
+
+    Args:
+        base_url: UniProt REST API root.
+        concurrency: maximum number of requests in flight.
+        timeout: seconds allowed for a whole request.
+        retries: number of retries after the first attempt.
+        backoff: delay before the first retry in seconds, doubled each time.
+        max_backoff: longest delay between two attempts.
+    """
+    def __init__(self, base_url: str = None, concurrency: int = rest.POOL_SIZE, timeout: float = 300,
+                 retries: int = 5, backoff: float = 0.5, max_backoff: float = 60):
+        self.base_url = base_url or rest.BASE_URL
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.retry = rest.RetryPolicy(retries, backoff, max_backoff)
+        self._session = None
+        self._semaphore = None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def open(self) -> None:
+        """Create the connection pool; done by "async with" too."""
+        try:
+            import aiohttp
+        except ImportError:
+            raise ImportError('AsyncUniprotClient needs aiohttp: pip install uniprotpy[async]')
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.concurrency),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _request(self, url: str, consume):
+        """GET url and return await consume(response), retrying transient failures."""
+        import aiohttp
+        import yarl
+
+        if self._session is None:
+            await self.open()
+        endpoint = rest.endpoint_of(url)
+        attempt = 0
+        while True:
+            async with self._semaphore:
+                start = time.perf_counter()
+                try:
+                    # URLs are built encoded, and UniProt cursor links come encoded
+                    async with self._session.get(yarl.URL(url, encoded=True)) as response:
+                        seconds = time.perf_counter() - start
+                        will_retry = response.status in self.retry.statuses and attempt < self.retry.retries
+                        rest.emit(rest.RequestEvent(endpoint, url, response.status, seconds,
+                                                    response.content_length, attempt, will_retry, None))
+                        if will_retry:
+                            delay = self.retry.delay(attempt, response.headers.get('Retry-After'))
+                        else:
+                            response.raise_for_status()
+                            return await consume(response)
+                # a payload error is a body cut off mid-read, as in rest.BODY_ERRORS
+                except (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError) as e:
+                    will_retry = attempt < self.retry.retries
+                    rest.emit(rest.RequestEvent(endpoint, url, None, time.perf_counter() - start, None, attempt,
+                                                will_retry, repr(e)))
+                    if not will_retry:
+                        raise
+                    delay = self.retry.delay(attempt)
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def get_text(self, url: str) -> str:
+        """GET url and return the body as text."""
+        async def text(response):
+            return await response.text()
+        return await self._request(url, text)
+
+    async def get_proteome(self, proteome_id: str, output_file=None):
+        """Get the FASTA of a proteome, isoforms included.
+
+        Args:
+            proteome_id: UniProt proteome identifier.
+            output_file: path to stream the FASTA to instead of returning it.
+
+        Returns:
+            The FASTA text, or output_file.
+        """
+        url = f'{self.base_url}/uniprotkb/stream?compressed=false&format=fasta&includeIsoform=true'\
+              f'&query=(proteome:{proteome_id})'
+        if output_file is None:
+            return await self.get_text(url)
+
+        async def write(response):
+            with open(f'{output_file}.part', 'wb') as f:
+                async for chunk in response.content.iter_chunked(rest.CHUNK_SIZE):
+                    f.write(chunk)
+        await self._request(url, write)
+        os.replace(f'{output_file}.part', output_file)
+        return output_file
+
+    async def iter_search(self, query: str, format: str = 'fasta', size: int = 500,
+                          endpoint: str = 'uniprotkb') -> AsyncIterator[str]:
+        """Yield every page of a search, following the Link header cursors.
+
+        Args:
+            query: UniProt query, e.g. "taxonomy_id:9606".
+            format: response format, e.g. "fasta" or "tsv".
+            size: number of results per page.
+            endpoint: the API to search, e.g. "uniprotkb" or "taxonomy".
+        """
+        url = f'{self.base_url}/{endpoint}/search?format={format}&query={quote(query)}&size={size}'
+        while url:
+            async def page(response):
+                match = NEXT_LINK_REGEX.match(response.headers.get('Link', ''))
+                return await response.text(), match.group(1) if match else None
+            text, url = await self._request(url, page)
+            yield text
+
+    async def get_proteome_list(self, taxon_id) -> list:
+        """Return the candidate proteomes of a taxon as proteome_selector.Proteome tuples.
+
+        As in ProteomeSelector, the representative and reference proteomes
+        are asked for first and the full list only when there are none.
+        """
+        for reference_only in (True, False):
+            text = await self.get_text(proteome_list_url(taxon_id, reference_only, self.base_url))
+            proteome_list = parse_proteome_list(text.splitlines())
+            if proteome_list:
+                return proteome_list
+        return []
+
+    async def get_taxa_children(self, taxon_ids) -> Dict[int, List[dict]]:
+        """Return {parent taxon ID: [{'Taxon Id', 'Scientific name'}, ...]} for taxon_ids."""
+        text = await self.get_text(taxa_children_url(taxon_ids, f'{self.base_url}/taxonomy/stream'))
+        return parse_taxa_children(text)
+
+    async def get_taxon_children(self, taxon_id) -> List[dict]:
+        """Return the children of one taxon as {'Taxon Id', 'Scientific name'} records."""
+        return (await self.get_taxa_children([taxon_id])).get(int(taxon_id), [])
@@ -0,0 +1,113 @@
+import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, Iterable
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from .models import ProteomeSelection, SelectionBase
+from .proteome_selector import ProteomeSelector
+
+
+class BatchProteomeSelector:
+  """Select and download the best proteome for many taxa.
+
+  Every selection is recorded in a SQLite manifest. A re-run only does
+  the work that is missing: taxa that are already in the manifest and
+  still have their data/<taxon>/proteome.fasta are skipped. With refresh,
+  their proteome lists are fetched again and only the taxa whose best
+  proteome changed are downloaded again.
+
+  Proteome lists are fetched list_workers at a time and proteomes are
+  downloaded download_workers at a time.
+
+  Args:
+    manifest_path: SQLite file to record the selections in.
+    list_workers: number of concurrent proteome list requests.
+    download_workers: number of concurrent proteome downloads.
+  """
+  def __init__(self, manifest_path='data/selections.db', list_workers: int = 8, download_workers: int = 4):
+    self.manifest_path = Path(manifest_path)
+    self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    self.list_workers = list_workers
+    self.download_workers = download_workers
+    self.engine = create_engine(f'sqlite:///{self.manifest_path}')
+    self.session = sessionmaker(bind=self.engine)
+    SelectionBase.metadata.create_all(self.engine)
+
+  def selections(self) -> Dict[str, dict]:
+    """Return every recorded selection, keyed by taxon ID."""
+    with self.session() as session:
+      return {row.taxon_id: row.dict() for row in session.scalars(select(ProteomeSelection))}
+
+  def run(self, taxon_ids: Iterable, refresh: bool = False) -> dict:
+    """Select the best proteome for every taxon that still needs one.
+
+    Args:
+      taxon_ids: taxon IDs to select proteomes for.
+      refresh: check the taxa that are already selected for a better
+        proteome too.
+
+    Returns:
+      A summary with the taxon IDs that were "selected", "skipped"
+      (already done), "unchanged" (refreshed, same proteome) and
+      "failed" (a dict of taxon ID to error message).
+    """
+    summary = {'selected': [], 'skipped': [], 'unchanged': [], 'failed': {}}
+    recorded = self.selections()
+    pending = []
+    for taxon_id in dict.fromkeys(str(taxon_id) for taxon_id in taxon_ids):
+      if taxon_id in recorded and self._fasta_path(taxon_id).exists() and not refresh:
+        summary['skipped'].append(taxon_id)
+      else:
+        pending.append(taxon_id)
+
+    with ThreadPoolExecutor(max_workers=self.list_workers) as list_pool, \
+         ThreadPoolExecutor(max_workers=self.download_workers) as download_pool:
+      list_futures = {list_pool.submit(self._choose, taxon_id): taxon_id for taxon_id in pending}
+      download_futures = {}
+      for future in as_completed(list_futures):
+        taxon_id = list_futures[future]
+        try:
+          selector, (proteome_id, _, _) = future.result()
+        except Exception as e:
+          summary['failed'][taxon_id] = repr(e)
+          continue
+
+        previous = recorded.get(taxon_id)
+        if previous and previous['proteome_id'] == proteome_id and self._fasta_path(taxon_id).exists():
+          summary['unchanged'].append(taxon_id)
+          continue
+        download_futures[download_pool.submit(selector.select_best_proteome, force=True)] = selector
+
+      # record the selections from this thread only, SQLite has one writer
+      for future in as_completed(download_futures):
+        selector = download_futures[future]
+        try:
+          proteome_id, proteome_taxon, proteome_type = future.result()
+        except Exception as e:
+          summary['failed'][selector.taxon_id] = repr(e)
+          continue
+        self._record(selector.taxon_id, proteome_id, proteome_taxon, proteome_type, selector.protein_count)
+        summary['selected'].append(selector.taxon_id)
+    return summary
+
+  def _choose(self, taxon_id):
+    selector = ProteomeSelector(taxon_id)
+    return selector, selector.choose_proteome()
+
+  def _fasta_path(self, taxon_id):
+    return Path('data') / taxon_id / 'proteome.fasta'
+
+  def _record(self, taxon_id, proteome_id, proteome_taxon, proteome_type, protein_count):
+    with self.session() as session:
+      session.merge(ProteomeSelection(
+        taxon_id=taxon_id,
+        proteome_id=str(proteome_id),
+        proteome_taxon=str(proteome_taxon),
+        proteome_type=proteome_type,
+        protein_count=protein_count,
+        selected_at=datetime.datetime.now(datetime.timezone.utc),
+      ))
+      session.commit()
@@ -0,0 +1,160 @@
+"""On-disk cache for UniProt REST responses."""
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+# response headers worth keeping with a cached body
+CACHED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified', 'Link', 'X-Total-Results')
+
+
+class OfflineCacheMiss(LookupError):
+    """Raised in offline mode when a URL is not in the cache."""
+
+
+def normalize_url(url: str) -> str:
+    """Lower-case the scheme and host and sort the query parameters of url."""
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or '/', query, ''))
+
+
+class ResponseCache:
+    """Cache GET responses on disk, keyed on the normalized URL.
+
+    Entries younger than ttl are served without a request. Older entries
+    are revalidated with If-None-Match/If-Modified-Since and served again
+    on a 304. Once the bodies take up more than max_size bytes, the least
+    recently used entries are evicted.
+
+    Args:
+        directory: where to keep the cached responses.
+        ttl: seconds an entry is served without revalidation.
+        max_size: maximum total size of the cached bodies in bytes.
+        offline: only serve from the cache and never make a request.
+    """
+    def __init__(self, directory, ttl: float = 24 * 60 * 60, max_size: int = 1 << 30,
+                 offline: bool = False):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_size = max_size
+        self.offline = offline
+        self.stats = {'hits': 0, 'misses': 0, 'revalidated': 0, 'evictions': 0}
+        self._lock = threading.Lock()
+        self._size = sum(path.stat().st_size for path in self.directory.glob('*.body'))
+
+    def get(self, url: str, session: requests.Session, **kwargs) -> requests.Response:
+        """Return the response for url from the cache or from session.
+
+        Args:
+            url: URL to GET.
+            session: session used on a miss or to revalidate.
+            kwargs: passed on to session.get.
+        """
+        key = hashlib.sha256(normalize_url(url).encode()).hexdigest()
+        meta = self._read_meta(key)
+
+        if meta is not None and (self.offline or time.time() - meta['stored_at'] < self.ttl):
+            return self._hit(key, meta)
+        if self.offline:
+            raise OfflineCacheMiss(url)
+
+        kwargs.pop('stream', None)
+        headers = dict(kwargs.pop('headers', None) or {})
+        if meta is not None:
+            if 'ETag' in meta['headers']:
+                headers['If-None-Match'] = meta['headers']['ETag']
+            if 'Last-Modified' in meta['headers']:
+                headers['If-Modified-Since'] = meta['headers']['Last-Modified']
+
+        r = session.get(url, headers=headers, **kwargs)
+        if r.status_code == 304 and meta is not None:
+            meta['stored_at'] = time.time()
+            self._write_meta(key, meta)
+            with self._lock:
+                self.stats['revalidated'] += 1
+            return self._hit(key, meta)
+
+        with self._lock:
+            self.stats['misses'] += 1
+        if r.status_code == 200:
+            self._store(key, url, r)
+        return r
+
+    def clear(self) -> None:
+        """Delete every cached response."""
+        with self._lock:
+            for path in self.directory.iterdir():
+                if path.suffix in ('.body', '.json'):
+                    path.unlink()
+            self._size = 0
+
+    def _hit(self, key, meta) -> requests.Response:
+        body_path = self.directory / f'{key}.body'
+        os.utime(body_path) # mark as recently used
+        with self._lock:
+            self.stats['hits'] += 1
+
+        r = requests.Response()
+        r.status_code = 200
+        r.url = meta['url']
+        r.headers = CaseInsensitiveDict(meta['headers'])
+        r.encoding = meta.get('encoding')
+        r._content = body_path.read_bytes()
+        r._content_consumed = True
+        return r
+
+    def _read_meta(self, key):
+        meta_path = self.directory / f'{key}.json'
+        if not (meta_path.exists() and (self.directory / f'{key}.body').exists()):
+            return None
+        try:
+            return json.loads(meta_path.read_text())
+        except (OSError, ValueError): # evicted or half written by another process
+            return None
+
+    def _write_meta(self, key, meta):
+        _atomic_write(self.directory / f'{key}.json', json.dumps(meta).encode())
+
+    def _store(self, key, url, r):
+        body = r.content
+        body_path = self.directory / f'{key}.body'
+        with self._lock:
+            if body_path.exists():
+                self._size -= body_path.stat().st_size
+            _atomic_write(body_path, body)
+            self._size += len(body)
+        self._write_meta(key, {
+            'url': url,
+            'stored_at': time.time(),
+            'encoding': r.encoding,
+            'headers': {name: r.headers[name] for name in CACHED_HEADERS if name in r.headers},
+        })
+        self._evict()
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits in max_size."""
+        with self._lock:
+            if self._size <= self.max_size:
+                return
+            bodies = sorted(self.directory.glob('*.body'), key=lambda path: path.stat().st_mtime)
+            for body_path in bodies:
+                if self._size <= self.max_size:
+                    break
+                self._size -= body_path.stat().st_size
+                body_path.unlink()
+                body_path.with_suffix('.json').unlink(missing_ok=True)
+                self.stats['evictions'] += 1
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    temp_path = path.with_name(f'{path.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+    temp_path.write_bytes(data)
+    os.replace(temp_path, path)
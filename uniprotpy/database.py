@@ -1,12 +1,76 @@
-from sqlalchemy import create_engine, inspect
-from sqlalchemy.orm import sessionmaker
-from uniprotpy.models import UniprotEntry, Base
+from collections import namedtuple
+
+from sqlalchemy import and_, bindparam, create_engine, delete, insert, inspect, select, true, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import selectinload, sessionmaker
+from uniprotpy.helpers import batched, to_bool, to_int
+from uniprotpy.models import (COMPRESSIONS, Base, UniprotEntry, UniprotSequence, compress_sequence,
+                              decompress_sequence, sequence_hash)
+
+INTEGER_COLUMNS = ('taxon_id', 'pe_level', 'sequence_version')
+HEADER_COLUMNS = (
+    'protein_id', 'protein_name', 'species', 'taxon_id', 'gene',
+    'pe_level', 'sequence_version', 'gene_priority',
+)
+# stay below SQLITE_MAX_VARIABLE_NUMBER, which is 999 on older SQLite builds
+MAX_SQL_VARIABLES = 900
+
+
+def to_entry_values(protein):
+    """Convert a protein dictionary from the parser to column values.
+
+    The parser keeps every field as a string; integer and boolean columns
+    are converted here and empty strings become NULL. The sequence hash
+    sync compares entries by is computed here too.
+
+    Args:
+        protein (dict): Dictionary containing a uniprot entry.
+    """
+    values = dict(protein)
+    for key in INTEGER_COLUMNS:
+        if key in values:
+            values[key] = to_int(values[key])
+    if 'gene_priority' in values:
+        values['gene_priority'] = to_bool(values['gene_priority'])
+    if values.get('sequence') is not None and values.get('sequence_hash') is None:
+        values['sequence_hash'] = sequence_hash(values['sequence'])
+    return values
+
+
+def to_entry_row(protein):
+    """Convert a protein dictionary to a full uniprot_entry row, missing columns as NULL."""
+    values = to_entry_values(protein)
+    return {column.name: values.get(column.name) for column in UniprotEntry.__table__.columns}
+
+
+def entry_fingerprint(values, sequence_hash):
+    """Hash the header columns and sequence hash of an entry to compare it cheaply.
+
+    Args:
+        values (mapping): Column values of the entry.
+        sequence_hash (str): Hash of the entry's sequence, None without one.
+    """
+    return hash((*(values[name] for name in HEADER_COLUMNS), sequence_hash))
+
 
 class UniprotDatabase():
-    def __init__(self, species=None, proteome_id=None, database_path=None):
+    """SQLite store of uniprot entries.
+
+    With deduplicate, each distinct sequence is stored once in the
+    uniprot_sequence table, keyed by its MD5 hash and optionally compressed
+    with zlib or zstd; entries reference it through sequence_hash.
+    """
+    def __init__(self, species=None, proteome_id=None, database_path=None,
+                 deduplicate=False, compression=None):
+        if compression not in COMPRESSIONS:
+            raise ValueError(f'compression must be one of {COMPRESSIONS}.')
+        if compression and not deduplicate:
+            raise ValueError('compression is only supported with deduplicate=True.')
         self.species = species
         self.proteome_id = proteome_id
         self.database_path = database_path
+        self.deduplicate = deduplicate
+        self.compression = compression
         self.engine = create_engine(self.database_path)
         self.session = sessionmaker(bind=self.engine)
         self._init_sqlite()
@@ -15,6 +79,31 @@ class UniprotDatabase():
         """Initialize a sqlite database."""
         if not inspect(self.engine).has_table("uniprot_entry"):
             Base.metadata.create_all(self.engine)
+        else:
+            self._migrate()
+
+    def _migrate(self):
+        """Bring a database file created by an older version up to date."""
+        Base.metadata.create_all(self.engine)
+        columns = {column['name'] for column in inspect(self.engine).get_columns('uniprot_entry')}
+        if 'sequence_hash' not in columns:
+            with self.engine.begin() as connection:
+                connection.exec_driver_sql('ALTER TABLE uniprot_entry ADD COLUMN sequence_hash VARCHAR')
+        self._backfill_sequence_hashes()
+        for index in UniprotEntry.__table__.indexes:
+            index.create(self.engine, checkfirst=True)
+
+    def _backfill_sequence_hashes(self, batch_size=10000):
+        """Hash the sequences of entries written before every entry had a sequence_hash."""
+        table = UniprotEntry.__table__
+        missing = select(table.c.protein_id, table.c.sequence).where(
+            table.c.sequence_hash.is_(None), table.c.sequence.is_not(None)).limit(batch_size)
+        statement = update(table).where(table.c.protein_id == bindparam('id')).values(
+            sequence_hash=bindparam('hash'))
+        with self.engine.connect() as connection:
+            while rows := connection.execute(missing).all():
+                connection.execute(statement, [{'id': id_, 'hash': sequence_hash(sequence)} for id_, sequence in rows])
+                connection.commit()
 
     def add(self, protein):
         """Given a dictionary containing a uniprot entry, add it to the database.
@@ -22,11 +111,178 @@ class UniprotDatabase():
         Args:
             protein (dict): Dictionary containing a uniprot entry.
         """
+        if self.deduplicate:
+            self.add_many([protein], fast_load=False)
+            return
         session = self.session()
-        session.add(UniprotEntry(**protein))
+        session.add(UniprotEntry(**to_entry_values(protein)))
         session.commit()
         session.close()
 
+    def add_many(self, proteins, batch_size=10000, upsert=False, fast_load=True):
+        """Bulk insert uniprot entries, one executemany transaction per batch.
+
+        Args:
+            proteins (iterable): Dictionaries containing uniprot entries,
+                e.g. from parser.iter_proteome.
+            batch_size (int): Number of entries held in memory per transaction.
+            upsert (bool): Replace existing entries with the same protein ID
+                instead of failing on the conflict.
+            fast_load (bool): Switch SQLite to WAL and synchronous=OFF while
+                loading. The previous journal mode and synchronous setting
+                are restored after.
+        """
+        statement = self._insert_statement(upsert)
+        fast_load = fast_load and self.engine.dialect.name == 'sqlite'
+        count = 0
+        with self.engine.connect() as connection:
+            if fast_load:
+                synchronous = connection.exec_driver_sql('PRAGMA synchronous').scalar()
+                journal_mode = connection.exec_driver_sql('PRAGMA journal_mode').scalar()
+                connection.exec_driver_sql('PRAGMA journal_mode=WAL')
+                connection.exec_driver_sql('PRAGMA synchronous=OFF')
+                connection.commit()
+            try:
+                for batch in batched(proteins, batch_size):
+                    rows = [to_entry_row(protein) for protein in batch]
+                    if self.deduplicate:
+                        self._store_sequences(connection, rows)
+                    connection.execute(statement, rows)
+                    connection.commit()
+                    count += len(rows)
+            finally:
+                if fast_load:
+                    connection.rollback()
+                    connection.exec_driver_sql(f'PRAGMA synchronous={synchronous}')
+                    connection.exec_driver_sql(f'PRAGMA journal_mode={journal_mode}')
+                    connection.commit()
+        return count
+
+    def _insert_statement(self, upsert=False):
+        """Build the executemany insert for uniprot_entry rows.
+
+        With upsert, a row replaces the stored entry with the same protein ID.
+        """
+        table = UniprotEntry.__table__
+        if not upsert:
+            return insert(table)
+        statement = sqlite_insert(table)
+        return statement.on_conflict_do_update(
+            index_elements=[table.c.protein_id],
+            set_={column.name: statement.excluded[column.name] for column in table.columns
+                  if column.name != 'protein_id'}
+        )
+
+    def sync(self, proteins, delete_missing=False, batch_size=10000):
+        """Bring the database in line with a fresh copy of the proteome.
+
+        Each incoming entry is compared with the stored one on its header
+        columns (sequence_version included) and the hash of its sequence.
+        Only new and changed entries are written, batch_size per
+        transaction, so a refresh where few entries change writes little.
+
+        Args:
+            proteins (iterable): Dictionaries containing uniprot entries,
+                e.g. from parser.iter_proteome.
+            delete_missing (bool): Delete stored entries that are not in
+                proteins, and the deduplicated sequences no entry uses
+                any more.
+            batch_size (int): Number of changed entries per transaction.
+
+        Returns:
+            A dict with the number of entries inserted, updated, deleted and
+            unchanged.
+        """
+        summary = {'inserted': 0, 'updated': 0, 'deleted': 0, 'unchanged': 0}
+        stored = self._fingerprints()
+        statement = self._insert_statement(upsert=True)
+        table = UniprotEntry.__table__
+
+        with self.engine.connect() as connection:
+            def write(rows):
+                if self.deduplicate:
+                    self._store_sequences(connection, rows)
+                connection.execute(statement, rows)
+                connection.commit()
+
+            pending = []
+            # fingerprints of the entries already synced, so a protein ID
+            # repeated in proteins is compared against its earlier entry
+            synced = {}
+            for protein in proteins:
+                row = to_entry_row(protein)
+                fingerprint = entry_fingerprint(row, row['sequence_hash'])
+                protein_id = row['protein_id']
+                previous = synced[protein_id] if protein_id in synced else stored.pop(protein_id, None)
+                synced[protein_id] = fingerprint
+                if previous == fingerprint:
+                    summary['unchanged'] += 1
+                    continue
+                summary['inserted' if previous is None else 'updated'] += 1
+                pending.append(row)
+                if len(pending) >= batch_size:
+                    write(pending)
+                    pending = []
+            if pending:
+                write(pending)
+
+            # whatever is left in stored was not in proteins
+            if delete_missing and stored:
+                for chunk in batched(stored, MAX_SQL_VARIABLES):
+                    connection.execute(delete(table).where(table.c.protein_id.in_(chunk)))
+                connection.commit()
+                summary['deleted'] = len(stored)
+            if delete_missing:
+                self._delete_orphan_sequences(connection)
+        return summary
+
+    def _delete_orphan_sequences(self, connection):
+        """Delete the stored sequences no entry references any more."""
+        sequences = UniprotSequence.__table__
+        referenced = select(UniprotEntry.__table__.c.sequence_hash).where(
+            UniprotEntry.__table__.c.sequence_hash.is_not(None))
+        connection.execute(delete(sequences).where(sequences.c.sequence_hash.not_in(referenced)))
+        connection.commit()
+
+    def _fingerprints(self):
+        """Map every stored protein ID to the fingerprint sync compares against."""
+        table = UniprotEntry.__table__
+        statement = select(*[table.c[name] for name in HEADER_COLUMNS], table.c.sequence_hash)
+        fingerprints = {}
+        with self.engine.connect() as connection:
+            for row in connection.execution_options(yield_per=10000).execute(statement):
+                values = row._mapping
+                fingerprints[values['protein_id']] = entry_fingerprint(values, values['sequence_hash'])
+        return fingerprints
+
+    def _store_sequences(self, connection, rows):
+        """Move the sequences of rows into uniprot_sequence, keyed by hash.
+
+        Sequences whose hash is already stored are not compressed or
+        written again.
+        """
+        sequences = {}
+        for row in rows:
+            if row['sequence'] is not None:
+                sequences[row['sequence_hash']] = row['sequence']
+                row['sequence'] = None
+
+        table = UniprotSequence.__table__
+        for chunk in batched(list(sequences), MAX_SQL_VARIABLES):
+            stored = select(table.c.sequence_hash).where(table.c.sequence_hash.in_(chunk))
+            for stored_hash in connection.execute(stored).scalars():
+                del sequences[stored_hash]
+
+        if sequences:
+            connection.execute(sqlite_insert(table).on_conflict_do_nothing(), [
+                {
+                    'sequence_hash': hash_,
+                    'compression': self.compression,
+                    'data': compress_sequence(sequence, self.compression),
+                }
+                for hash_, sequence in sequences.items()
+            ])
+
     def get(self, protein_id):
         """Given a protein ID, return the corresponding uniprot entry.
 
@@ -34,14 +290,134 @@ class UniprotDatabase():
             protein_id (str): Protein ID.
         """
         session = self.session()
-        result = session.query(UniprotEntry).filter_by(protein_id=protein_id).first()
+        result = self._query_entries(session).filter_by(protein_id=protein_id).first()
+        session.close()
+        return result
+
+    def get_many(self, protein_ids, chunk_size=MAX_SQL_VARIABLES):
+        """Given protein IDs, return the corresponding uniprot entries.
+
+        The IDs are looked up with IN queries of at most chunk_size IDs so
+        large lists stay under SQLite's limit on bound variables. IDs that
+        are not in the database are skipped.
+
+        Args:
+            protein_ids (iterable): Protein IDs.
+            chunk_size (int): Number of IDs per query.
+        """
+        session = self.session()
+        result = []
+        for chunk in batched(dict.fromkeys(protein_ids), chunk_size):
+            result.extend(self._query_entries(session).filter(UniprotEntry.protein_id.in_(chunk)).all())
         session.close()
         return result
-    
-    
+
+    def _query_entries(self, session):
+        """Query entries with their deduplicated sequences loaded, as the session is closed after."""
+        return session.query(UniprotEntry).options(selectinload(UniprotEntry.stored_sequence))
+
+    def query(self, taxon_id=None, gene=None, gene_priority=None, max_pe_level=None,
+              columns=None, as_dict=False):
+        """Stream the entries matching all of the given filters.
+
+        Each filter is backed by an index on uniprot_entry.
+
+        Args:
+            taxon_id (int): NCBI taxonomy identifier.
+            gene (str): Gene symbol.
+            gene_priority (bool): Only (or no) gene priority proteins.
+            max_pe_level (int): Highest protein existence level to include.
+            columns (list): Column names to select, all columns by default.
+            as_dict (bool): Yield dictionaries instead of named tuples.
+        """
+        table = UniprotEntry.__table__
+        clauses = []
+        if taxon_id is not None:
+            clauses.append(table.c.taxon_id == taxon_id)
+        if gene is not None:
+            clauses.append(table.c.gene == gene)
+        if gene_priority is not None:
+            clauses.append(table.c.gene_priority == gene_priority)
+        if max_pe_level is not None:
+            clauses.append(table.c.pe_level <= max_pe_level)
+        return self.iter_entries(columns=columns, where=and_(true(), *clauses), as_dict=as_dict)
+
+    def get_gene_priority(self, taxon_id, columns=None):
+        """Return the gene priority proteins of a taxon.
+
+        Args:
+            taxon_id (int): NCBI taxonomy identifier.
+            columns (list): Column names to select, all columns by default.
+        """
+        return list(self.query(taxon_id=taxon_id, gene_priority=True, columns=columns))
+
+    def get_isoforms(self, gene, taxon_id=None, columns=None):
+        """Return every protein (canonical and isoforms) of a gene.
+
+        Args:
+            gene (str): Gene symbol.
+            taxon_id (int): Only return proteins from this taxon.
+            columns (list): Column names to select, all columns by default.
+        """
+        return list(self.query(taxon_id=taxon_id, gene=gene, columns=columns))
+
+    def get_by_pe_level(self, max_pe_level, taxon_id=None, columns=None):
+        """Return the proteins with a protein existence level of at most max_pe_level.
+
+        Args:
+            max_pe_level (int): Highest protein existence level to include.
+            taxon_id (int): Only return proteins from this taxon.
+            columns (list): Column names to select, all columns by default.
+        """
+        return list(self.query(taxon_id=taxon_id, max_pe_level=max_pe_level, columns=columns))
+
+    def iter_entries(self, columns=None, where=None, chunk_size=1000, as_dict=False):
+        """Stream rows of the database without loading ORM objects.
+
+        Rows are fetched chunk_size at a time, so memory use does not grow
+        with the size of the table. Select HEADER_COLUMNS to leave the
+        sequences in the database. Deduplicated sequences are read from
+        uniprot_sequence when the sequence column is selected.
+
+        Args:
+            columns (list): Column names to select, all columns by default.
+            where (dict or clause): Mapping of column names to a value (or a
+                list of values) to match, or a SQLAlchemy filter expression.
+            chunk_size (int): Number of rows fetched at a time.
+            as_dict (bool): Yield dictionaries instead of named tuples.
+        """
+        table = UniprotEntry.__table__
+        sequences = UniprotSequence.__table__
+        names = list(columns) if columns else [column.name for column in table.columns]
+        statement = select(*[table.c[name] for name in names])
+        if 'sequence' in names:
+            statement = statement.add_columns(sequences.c.data, sequences.c.compression)
+            statement = statement.select_from(table.outerjoin(
+                sequences, and_(table.c.sequence.is_(None), table.c.sequence_hash == sequences.c.sequence_hash)))
+        if isinstance(where, dict):
+            for name, value in where.items():
+                if isinstance(value, (list, tuple, set)):
+                    statement = statement.where(table.c[name].in_(value))
+                else:
+                    statement = statement.where(table.c[name] == value)
+        elif where is not None:
+            statement = statement.where(where)
+
+        row_type = namedtuple('UniprotRow', names)
+        sequence_index = names.index('sequence') if 'sequence' in names else None
+        with self.engine.connect() as connection:
+            result = connection.execution_options(yield_per=chunk_size).execute(statement)
+            for row in result:
+                values = list(row[:len(names)])
+                if sequence_index is not None and values[sequence_index] is None:
+                    data, compression = row[len(names):]
+                    if data is not None:
+                        values[sequence_index] = decompress_sequence(data, compression)
+                yield dict(zip(names, values)) if as_dict else row_type(*values)
+
     def list(self):
         """Return a list of all protein IDs in the database."""
         session = self.session()
-        result = session.query(UniprotEntry).all()
+        result = self._query_entries(session).all()
         session.close()
-        return result
\ No newline at end of file
+        return result
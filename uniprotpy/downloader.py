@@ -0,0 +1,103 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable
+
+from . import rest
+
+
+class DownloadStats:
+  """Running totals of a ProteomeDownloader, safe to read while it runs."""
+  def __init__(self):
+    self.files = 0
+    self.bytes = 0
+    self.failures = 0
+    self.seconds = 0.0
+    self._lock = threading.Lock()
+
+  def record(self, num_bytes: int) -> None:
+    with self._lock:
+      self.files += 1
+      self.bytes += num_bytes
+
+  def record_failure(self) -> None:
+    with self._lock:
+      self.failures += 1
+
+  @property
+  def bytes_per_second(self) -> float:
+    return self.bytes / self.seconds if self.seconds else 0.0
+
+  @property
+  def files_per_second(self) -> float:
+    return self.files / self.seconds if self.seconds else 0.0
+
+  def as_dict(self) -> dict:
+    return {
+      'files': self.files,
+      'bytes': self.bytes,
+      'failures': self.failures,
+      'seconds': self.seconds,
+      'bytes_per_second': self.bytes_per_second,
+      'files_per_second': self.files_per_second,
+    }
+
+
+class ProteomeDownloader:
+  """Download the FASTA files for many proteomes or taxa concurrently.
+
+  Every download goes through one pooled session and is streamed straight
+  to <outdir>/<id>.fasta.
+
+  Args:
+    outdir: directory to write the FASTA files to.
+    max_workers: number of concurrent downloads.
+    rate_limit: maximum requests per second per host, retries included.
+      None applies the limit set with rest.configure.
+    session: requests session to use, the package-wide session by default.
+    base_url: UniProt REST API root.
+  """
+  def __init__(self, outdir='.', max_workers: int = 4, rate_limit: float = None,
+               session=None, base_url: str = None):
+    self.outdir = Path(outdir)
+    self.max_workers = max_workers
+    self.rate_limiter = rest.RateLimiter(rate_limit) if rate_limit is not None else None
+    self.session = session or rest.create_session(pool_size=max_workers)
+    self.base_url = base_url or rest.BASE_URL
+    self.stats = DownloadStats()
+
+  def url(self, identifier: str) -> str:
+    """Build the stream URL for a proteome ID (UP...) or a taxon ID."""
+    identifier = str(identifier)
+    query = f'proteome:{identifier}' if identifier.startswith('UP') else f'taxonomy_id:{identifier}'
+    return f'{self.base_url}/uniprotkb/stream?compressed=false&format=fasta&includeIsoform=true&query=({query})'
+
+  def download(self, identifiers: Iterable) -> Dict[str, Path]:
+    """Download every identifier and return a mapping of ID to FASTA path.
+
+    IDs that fail to download are left out of the mapping and counted in
+    stats.failures.
+    """
+    self.outdir.mkdir(parents=True, exist_ok=True)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+      futures = {str(i): executor.submit(self._download_one, str(i)) for i in identifiers}
+    self.stats.seconds += time.perf_counter() - start
+
+    paths = {}
+    for identifier, future in futures.items():
+      if future.exception() is None:
+        paths[identifier] = future.result()
+    return paths
+
+  def _download_one(self, identifier: str) -> Path:
+    url = self.url(identifier)
+    path = self.outdir / f'{identifier}.fasta'
+    try:
+      num_bytes = rest.stream_to_file(url, path, session=self.session, rate_limiter=self.rate_limiter)
+    except Exception:
+      self.stats.record_failure()
+      raise
+    self.stats.record(num_bytes)
+    return path
@@ -0,0 +1,244 @@
+"""Random access to the sequences of a FASTA file by UniProt accession.
+
+The index is a small TSV next to the FASTA file, like a samtools .fai but
+keyed by accession. For every record it holds the sequence length, the
+byte offset of the first residue and, when all lines but the last have
+the same width, the residues and bytes per line, so a slice of a
+sequence is read without touching the rest of it. The first line records
+the size and mtime of the FASTA file the index was built from; an index
+that no longer matches is rebuilt.
+"""
+import mmap
+import os
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, NamedTuple, Optional
+
+INDEX_SUFFIX = '.idx'
+CHUNK_SIZE = 1 << 20
+
+
+class IndexEntry(NamedTuple):
+    length: int      # number of residues
+    offset: int      # byte offset of the first residue
+    line_bases: int  # residues per full line, 0 when lines are uneven
+    line_width: int  # bytes per full line, newline included
+    end: int         # byte offset just past the record
+
+
+def accession_of(header: str) -> str:
+    """Return the accession of a FASTA header, "sp|P12345|..." -> "P12345".
+
+    Headers that are not in UniProt format are keyed by their first word.
+    """
+    identifier = header.split(None, 1)[0] if header.strip() else ''
+    parts = identifier.split('|')
+    return parts[1] if len(parts) > 2 else identifier
+
+
+class FastaIndexBuilder:
+    """Build an index from the bytes of a FASTA file as they are written.
+
+    Feed every chunk of the file in order, then call write. Only the last,
+    unfinished record is kept in memory.
+    """
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        """Drop everything fed so far, e.g. when a download starts over."""
+        self.entries: Dict[str, IndexEntry] = {}
+        self._buffer = b''
+        self._buffer_offset = 0
+
+    def feed(self, chunk: bytes) -> None:
+        """Index the records completed by chunk."""
+        buffer = self._buffer + chunk
+        position = 0
+        while True:
+            boundary = buffer.find(b'\n>', position)
+            if boundary == -1:
+                break
+            self._add_record(buffer, position, boundary + 1)
+            position = boundary + 1
+        self._buffer = buffer[position:]
+        self._buffer_offset += position
+
+    def finish(self) -> Dict[str, IndexEntry]:
+        """Index the last record and return every entry."""
+        if self._buffer:
+            self._add_record(self._buffer, 0, len(self._buffer))
+            self._buffer_offset += len(self._buffer)
+            self._buffer = b''
+        return self.entries
+
+    def write(self, fasta_path, index_path=None) -> Path:
+        """Finish the index and write it for fasta_path, which must be complete on disk."""
+        self.finish()
+        index_path = Path(index_path or f'{fasta_path}{INDEX_SUFFIX}')
+        stat = os.stat(fasta_path)
+        temp_path = index_path.with_name(f'{index_path.name}.{os.getpid()}.tmp')
+        with open(temp_path, 'w') as f:
+            f.write(f'#\t{stat.st_size}\t{stat.st_mtime_ns}\n')
+            for accession, entry in self.entries.items():
+                f.write(f'{accession}\t' + '\t'.join(map(str, entry)) + '\n')
+        os.replace(temp_path, index_path)
+        return index_path
+
+    def _add_record(self, buffer, start, end):
+        if buffer[start:start + 1] != b'>':
+            return # blank lines or other text before the first record
+        header_end = buffer.find(b'\n', start, end)
+        if header_end == -1:
+            header_end = end
+        accession = accession_of(buffer[start + 1:header_end].decode())
+        if accession in self.entries:
+            return # keep the first record of a duplicated accession
+
+        sequence_start = min(header_end + 1, end)
+        span = end - sequence_start
+        line_end = buffer.find(b'\n', sequence_start, end)
+        line_width = line_end + 1 - sequence_start if line_end != -1 else span
+        carriage_returns = buffer.count(b'\r', sequence_start, end)
+        length = span - buffer.count(b'\n', sequence_start, end) - carriage_returns
+        line_bases = line_width - (1 if line_end != -1 else 0) - (1 if carriage_returns else 0)
+
+        # lines of even width let a slice be located arithmetically
+        if not (length and line_bases > 0 and self._even_lines(buffer, sequence_start, end, length,
+                                                               line_bases, line_width)):
+            line_bases = line_width = 0
+
+        offset = self._buffer_offset + sequence_start
+        self.entries[accession] = IndexEntry(length, offset, line_bases, line_width, self._buffer_offset + end)
+
+    @staticmethod
+    def _even_lines(buffer, start, end, length, line_bases, line_width):
+        """Whether every line of the sequence but the last holds exactly line_bases residues."""
+        full_lines, rest = divmod(length, line_bases)
+        newline = line_width - line_bases
+        expected = full_lines * line_width + (rest + newline if rest else 0)
+        if end - start not in (expected, expected - newline):
+            return False
+        # the line endings of the full lines sit every line_width bytes and nowhere else
+        full = buffer[start:start + full_lines * line_width]
+        if full[line_width - 1::line_width].count(b'\n') != full_lines or full.count(b'\n') != full_lines:
+            return False
+        if newline == 2 and full[line_width - 2::line_width].count(b'\r') != full_lines:
+            return False
+        last = buffer[start + full_lines * line_width:end]
+        return b'\n' not in last.rstrip(b'\r\n')
+
+
+def build_fasta_index(fasta_path, index_path=None, chunk_size: int = CHUNK_SIZE) -> Path:
+    """Index a FASTA file on disk in one pass and return the index path."""
+    builder = FastaIndexBuilder()
+    with open(fasta_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            builder.feed(chunk)
+    return builder.write(fasta_path, index_path)
+
+
+class FastaIndex:
+    """Look up sequences of a FASTA file by accession through mmap.
+
+    The index is built when it is missing and rebuilt when the size or
+    mtime of the FASTA file no longer match it, including when the file
+    changes while the FASTA index is open.
+
+    Args:
+        fasta_path: FASTA file, or a directory with a proteome.fasta
+            (e.g. data/<taxon> of ProteomeSelector).
+        index_path: index file, "<fasta_path>.idx" by default.
+    """
+    def __init__(self, fasta_path, index_path=None):
+        fasta_path = Path(fasta_path)
+        if fasta_path.is_dir():
+            fasta_path = fasta_path / 'proteome.fasta'
+        self.fasta_path = fasta_path
+        self.index_path = Path(index_path or f'{fasta_path}{INDEX_SUFFIX}')
+        self._mmap = None
+        self._open()
+
+    def _open(self):
+        self.close()
+        stat = os.stat(self.fasta_path)
+        self._stamp = (stat.st_size, stat.st_mtime_ns)
+        self.entries = self._read_index()
+        if self.entries is None:
+            build_fasta_index(self.fasta_path, self.index_path)
+            self.entries = self._read_index()
+        if self._stamp[0]:
+            with open(self.fasta_path, 'rb') as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _read_index(self) -> Optional[Dict[str, IndexEntry]]:
+        """Read the index, None when it is missing or stale."""
+        try:
+            with open(self.index_path) as f:
+                stamp = f.readline().rstrip('\n').split('\t')
+                if stamp[1:] != [str(value) for value in self._stamp]:
+                    return None
+                entries = {}
+                for line in f:
+                    accession, *values = line.rstrip('\n').split('\t')
+                    entries[accession] = IndexEntry(*map(int, values))
+                return entries
+        except (OSError, IndexError, ValueError):
+            return None
+
+    def _check(self):
+        stat = os.stat(self.fasta_path)
+        if (stat.st_size, stat.st_mtime_ns) != self._stamp:
+            self._open()
+
+    def get_sequence(self, accession: str, start: int = None, end: int = None) -> str:
+        """Return the sequence of accession, or its [start:end] slice.
+
+        Args:
+            accession: UniProt accession, e.g. "P12345" or "P12345-2".
+            start: 0-based start of the slice.
+            end: end of the slice, exclusive.
+        """
+        self._check()
+        entry = self.entries[accession]
+        start, end, _ = slice(start, end).indices(entry.length)
+        if end <= start:
+            return ''
+        if not entry.line_bases:
+            raw = self._mmap[entry.offset:entry.end]
+            return raw.replace(b'\n', b'').replace(b'\r', b'').decode()[start:end]
+
+        def position(i):
+            return entry.offset + (i // entry.line_bases) * entry.line_width + i % entry.line_bases
+
+        raw = self._mmap[position(start):position(end - 1) + 1]
+        return raw.replace(b'\n', b'').replace(b'\r', b'').decode()
+
+    def __getitem__(self, accession: str) -> str:
+        return self.get_sequence(accession)
+
+    def __contains__(self, accession: str) -> bool:
+        self._check()
+        return accession in self.entries
+
+    def __len__(self) -> int:
+        self._check()
+        return len(self.entries)
+
+    def __iter__(self) -> Iterator[str]:
+        self._check()
+        return iter(list(self.entries))
+
+    def get_many(self, accessions: Iterable[str]) -> Dict[str, str]:
+        """Return the sequences of the accessions that are in the file."""
+        return {accession: self.get_sequence(accession) for accession in accessions if accession in self}
+
+    def close(self) -> None:
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
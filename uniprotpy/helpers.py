@@ -1,33 +1,233 @@
-import requests
-import pandas as pd
+import csv
+import itertools
 from pathlib import Path
+from typing import Iterable, Iterator, List, Union
 
+from . import rest
+from .fasta_index import FastaIndexBuilder
 
-def get_proteome(proteome_id: str, compress: bool = False) -> None:
+PROTEOME_COLUMNS = [
+    'protein_id', 'protein_name', 'species', 'taxon_id', 'gene',
+    'pe_level', 'sequence_version', 'gene_priority', 'sequence',
+]
+
+
+def get_proteome(proteome_id: str, compress: bool = False, output_file: Path = None, index: bool = False):
     """Get the FASTA file for a proteome from UniProt API.
-    
+
+    With output_file, the proteome is downloaded gzip compressed and
+    streamed to disk chunk by chunk, so memory use does not depend on the
+    size of the proteome. Without it, the whole FASTA is returned as text.
+
     Args:
       proteome_id: UniProt proteome identifier.
-      compress: Whether to download the FASTA file as compressed."""
+      compress: Whether to download the FASTA file as compressed. With
+        output_file, whether to keep it compressed on disk.
+      output_file: path to stream the FASTA file to.
+      index: with an uncompressed output_file, also write an accession
+        index for fasta_index.FastaIndex, built while downloading.
+
+    Returns:
+      The output_file path, or the FASTA text without output_file."""
+    base_url = f'{rest.BASE_URL}/uniprotkb'
+    if output_file is not None:
+        full_url = f'{base_url}/stream?compressed=true&format=fasta&includeIsoform=true&query=(proteome:{proteome_id})'
+        builder = FastaIndexBuilder() if index and not compress else None
+        rest.stream_to_file(full_url, output_file, decompress=not compress, keep_compressed=compress,
+                            on_chunk=builder.feed if builder else None,
+                            on_restart=builder.reset if builder else None)
+        if builder:
+            builder.write(output_file)
+        return output_file
+
     compress = 'true' if compress else 'false'
-    base_url = 'https://rest.uniprot.org/uniprotkb'
     full_url = f'{base_url}/stream?compressed={compress}&format=fasta&includeIsoform=true&query=(proteome:{proteome_id})'
-  
-    r = requests.get(full_url)
+
+    r = rest.get(full_url)
     r.raise_for_status()
-    
+
     return r.text
 
 
+def batched(iterable: Iterable, batch_size: int) -> Iterator[List]:
+    """Split an iterable into lists of at most batch_size items."""
+    iterator = iter(iterable)
+    while batch := list(itertools.islice(iterator, batch_size)):
+        yield batch
+
+
 def proteome_to_fasta(proteome: str, output_dir: Path) -> None:
     pass
 
-    
-def proteome_to_csv(proteome_dict: dict, output_dir: Path) -> None:
-    df = pd.DataFrame.from_dict(proteome_dict, orient='index').reset_index(drop=True)
-    df.to_csv(output_dir, index=False)
 
+def proteome_to_csv(proteome: Union[dict, Iterable[dict]], output_file: Path,
+                    sep: str = ',', batch_size: int = 10000) -> None:
+    """Write a proteome to a CSV file, batch_size proteins at a time.
+
+    Args:
+      proteome: dictionary from parse_proteome or protein dictionaries
+        from iter_proteome.
+      output_file: path of the CSV file.
+      sep: column delimiter.
+      batch_size: number of proteins held in memory before writing."""
+    proteins = proteome.values() if isinstance(proteome, dict) else proteome
+    with open(output_file, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=PROTEOME_COLUMNS, delimiter=sep, extrasaction='ignore')
+        writer.writeheader()
+        for batch in batched(proteins, batch_size):
+            writer.writerows(batch)
+
+
+def proteome_to_tsv(proteome: Union[dict, Iterable[dict]], output_file: Path,
+                    batch_size: int = 10000) -> None:
+    """Write a proteome to a TSV file, batch_size proteins at a time."""
+    proteome_to_csv(proteome, output_file, sep='\t', batch_size=batch_size)
+
+
+def to_int(value):
+    """Convert a parser string (or an int) to an int, '' and None to None."""
+    if value is None or value == '':
+        return None
+    return int(value)
+
+
+def to_bool(value):
+    """Convert a gene_priority value from the parser (or a bool) to a bool."""
+    if isinstance(value, str):
+        return value not in ('', '0')
+    return None if value is None else bool(value)
+
+
+class StringTable:
+    """Give every distinct string an integer code, in order of first appearance."""
+    def __init__(self):
+        self.codes = {}
+        self.values = []
+
+    def code(self, value) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+class _DictionaryEncoder(StringTable):
+    """Dictionary-encode a string column batch by batch against one growing dictionary.
+
+    An Arrow IPC file can only extend a dictionary between batches, not
+    replace it, so every batch is encoded against all the values seen so
+    far and the writer stores the values a batch adds as a dictionary
+    delta. Only those new values are converted to Arrow and appended.
+    """
+    def __init__(self):
+        super().__init__()
+        self.dictionary = None
+
+    def encode(self, values):
+        import pyarrow as pa
+
+        known = len(self.values)
+        indices = pa.array([self.code(value) for value in values], pa.int32())
+        if self.dictionary is None or len(self.values) > known:
+            added = pa.array(self.values[known:], pa.string())
+            self.dictionary = added if self.dictionary is None else pa.concat_arrays([self.dictionary, added])
+        return pa.DictionaryArray.from_arrays(indices, self.dictionary)
+
+
+def proteome_schema():
+    """Arrow schema of the Parquet and Arrow proteome files (needs pyarrow)."""
+    import pyarrow as pa
+
+    return pa.schema([
+        ('protein_id', pa.string()),
+        ('protein_name', pa.string()),
+        ('species', pa.dictionary(pa.int32(), pa.string())),
+        ('taxon_id', pa.int32()),
+        ('gene', pa.dictionary(pa.int32(), pa.string())),
+        ('pe_level', pa.int8()),
+        ('sequence_version', pa.int16()),
+        ('gene_priority', pa.bool_()),
+        ('sequence', pa.string()),
+    ])
+
+
+def _iter_record_batches(proteins, batch_size, shared_dictionaries=False):
+    """Convert protein dictionaries to Arrow record batches of batch_size rows.
+
+    With shared_dictionaries, the species and gene dictionaries of a batch
+    extend those of the batches before it, as Arrow IPC files need;
+    otherwise every batch is encoded on its own, as Parquet row groups are.
+    """
+    import pyarrow as pa
+
+    schema = proteome_schema()
+    encoders = {'species': _DictionaryEncoder(), 'gene': _DictionaryEncoder()} if shared_dictionaries else {}
+    converters = {
+        'taxon_id': to_int, 'pe_level': to_int, 'sequence_version': to_int, 'gene_priority': to_bool,
+    }
+    for batch in batched(proteins, batch_size):
+        arrays = []
+        for field in schema:
+            values = [protein.get(field.name) for protein in batch]
+            if field.name in encoders:
+                arrays.append(encoders[field.name].encode(values))
+                continue
+            if field.name in converters:
+                values = [converters[field.name](value) for value in values]
+            if pa.types.is_dictionary(field.type):
+                arrays.append(pa.array(values, field.type.value_type).dictionary_encode())
+            else:
+                arrays.append(pa.array(values, field.type))
+        yield pa.record_batch(arrays, schema=schema)
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow # noqa: F401
+    except ImportError:
+        raise ImportError('Parquet and Arrow output need pyarrow: pip install uniprotpy[parquet]')
+
+
+def proteome_to_parquet(proteome: Union[dict, Iterable[dict]], output_file: Path,
+                        batch_size: int = 100000) -> None:
+    """Write a proteome to a Parquet file, one row group per batch_size proteins.
+
+    species and gene are dictionary encoded and the numeric and
+    gene_priority columns are typed (see proteome_schema), so readers can
+    load and filter single columns without reading the sequences.
+
+    Args:
+      proteome: dictionary from parse_proteome or protein dictionaries
+        from iter_proteome.
+      output_file: path of the Parquet file.
+      batch_size: number of proteins per row group."""
+    _require_pyarrow()
+    import pyarrow.parquet as pq
+
+    proteins = proteome.values() if isinstance(proteome, dict) else proteome
+    with pq.ParquetWriter(output_file, proteome_schema()) as writer:
+        for record_batch in _iter_record_batches(proteins, batch_size):
+            writer.write_batch(record_batch, row_group_size=batch_size)
+
+
+def proteome_to_arrow(proteome: Union[dict, Iterable[dict]], output_file: Path,
+                      batch_size: int = 100000) -> None:
+    """Write a proteome to an Arrow IPC file, one record batch per batch_size proteins.
+
+    The file can be memory-mapped with pyarrow.ipc.open_file. Columns are
+    typed as in proteome_to_parquet.
+
+    Args:
+      proteome: dictionary from parse_proteome or protein dictionaries
+        from iter_proteome.
+      output_file: path of the Arrow file.
+      batch_size: number of proteins per record batch."""
+    _require_pyarrow()
+    import pyarrow.ipc as ipc
 
-def proteome_to_tsv(proteome_dict: dict, output_dir: Path) -> None:
-    df = pd.DataFrame.from_dict(proteome_dict, orient='index').reset_index(drop=True)
-    df.to_csv('/home/dan/Desktop/proteome.tsv', sep='\t', index=False)
\ No newline at end of file
+    proteins = proteome.values() if isinstance(proteome, dict) else proteome
+    options = ipc.IpcWriteOptions(emit_dictionary_deltas=True)
+    with ipc.new_file(str(output_file), proteome_schema(), options=options) as writer:
+        for record_batch in _iter_record_batches(proteins, batch_size, shared_dictionaries=True):
+            writer.write_batch(record_batch)
@@ -1,19 +1,111 @@
-from sqlalchemy import Boolean, Column, Float, ForeignKey, Integer, String
+import hashlib
+import zlib
+
+from sqlalchemy import Boolean, Column, DateTime, Float, Integer, LargeBinary, String, or_
+from sqlalchemy.ext.hybrid import Comparator, hybrid_property
 from sqlalchemy.orm import relationship, declarative_base
 
 Base = declarative_base()
+# proteome selection manifests live in their own database, apart from the entries
+SelectionBase = declarative_base()
+
+COMPRESSIONS = (None, 'zlib', 'zstd')
+
+
+def sequence_hash(sequence):
+    """Return the MD5 checksum of a sequence, as used by UniParc."""
+    return hashlib.md5(sequence.encode()).hexdigest()
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError('zstd compression needs zstandard: pip install uniprotpy[zstd]')
+    return zstandard
+
+
+def compress_sequence(sequence, compression=None):
+    """Encode a sequence for the uniprot_sequence table.
+
+    Args:
+        sequence (str): Amino acid sequence.
+        compression (str): None, "zlib" or "zstd" (needs zstandard).
+    """
+    data = sequence.encode()
+    if compression == 'zlib':
+        return zlib.compress(data)
+    if compression == 'zstd':
+        return _zstandard().ZstdCompressor().compress(data)
+    if compression is not None:
+        raise ValueError(f'Unknown compression: {compression}')
+    return data
+
+
+def decompress_sequence(data, compression=None):
+    """Decode a sequence stored with compress_sequence."""
+    if compression == 'zlib':
+        data = zlib.decompress(data)
+    elif compression == 'zstd':
+        data = _zstandard().ZstdDecompressor().decompress(data)
+    return data.decode()
+
+
+class UniprotSequence(Base):
+    __tablename__ = 'uniprot_sequence'
+    sequence_hash = Column(String, primary_key=True)
+    compression = Column(String)
+    data = Column(LargeBinary)
+
+    def decode(self):
+        return decompress_sequence(self.data, self.compression)
+
+
+class _SequenceComparator(Comparator):
+    """Compare UniprotEntry.sequence in queries, deduplicated entries by their hash."""
+    def __init__(self, entry):
+        super().__init__(entry._sequence)
+        self.entry = entry
+
+    def __eq__(self, other):
+        if isinstance(other, str):
+            return or_(self.entry._sequence == other, self.entry.sequence_hash == sequence_hash(other))
+        return self.expression == other
+
 
 class UniprotEntry(Base):
     __tablename__ = 'uniprot_entry'
     protein_id = Column(String, primary_key=True)
     protein_name = Column(String)
     species = Column(String)
-    taxon_id = Column(Integer)
-    gene = Column(String)
-    pe_level = Column(Integer)
+    taxon_id = Column(Integer, index=True)
+    gene = Column(String, index=True)
+    pe_level = Column(Integer, index=True)
     sequence_version = Column(Integer)
-    gene_priority = Column(Boolean)
-    sequence = Column(String)
+    gene_priority = Column(Boolean, index=True)
+    _sequence = Column('sequence', String)
+    # set for every entry; only deduplicated entries, whose sequence column is
+    # NULL, have their sequence in uniprot_sequence, so it is not a foreign key
+    sequence_hash = Column(String)
+    stored_sequence = relationship(
+        UniprotSequence, lazy='select', viewonly=True,
+        primaryjoin='foreign(UniprotEntry.sequence_hash) == UniprotSequence.sequence_hash')
+
+    @hybrid_property
+    def sequence(self):
+        """The sequence, read from uniprot_sequence for deduplicated entries."""
+        if self._sequence is None and self.sequence_hash is not None and self.stored_sequence is not None:
+            return self.stored_sequence.decode()
+        return self._sequence
+
+    @sequence.setter
+    def sequence(self, sequence):
+        self._sequence = sequence
+        self.sequence_hash = sequence_hash(sequence) if sequence is not None else None
+
+    @sequence.comparator
+    def sequence(cls):
+        return _SequenceComparator(cls)
 
     def dict(self):
         return {
@@ -26,4 +118,24 @@ class UniprotEntry(Base):
             "sequence_version": self.sequence_version,
             "gene_priority": self.gene_priority,
             "sequence": self.sequence
-        }
\ No newline at end of file
+        }
+
+
+class ProteomeSelection(SelectionBase):
+    __tablename__ = 'proteome_selection'
+    taxon_id = Column(String, primary_key=True)
+    proteome_id = Column(String)
+    proteome_taxon = Column(String)
+    proteome_type = Column(String)
+    protein_count = Column(Integer)
+    selected_at = Column(DateTime)
+
+    def dict(self):
+        return {
+            "taxon_id": self.taxon_id,
+            "proteome_id": self.proteome_id,
+            "proteome_taxon": self.proteome_taxon,
+            "proteome_type": self.proteome_type,
+            "protein_count": self.protein_count,
+            "selected_at": self.selected_at,
+        }
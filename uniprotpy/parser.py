@@ -1,56 +1,313 @@
+import collections
+import contextlib
+import gzip
+import io
+import mmap
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Tuple
+
 from Bio import SeqIO
 from Bio.SeqRecord import SeqRecord
 
 
-def parse_proteome(proteome_file) -> dict:
-    """Parse out a proteome FASTA file and return a protein dictionary    
+# regexes for each field of a UniProt FASTA header
+FIELD_REGEXES = {
+    'protein_id': re.compile(r"\|([^|]*)\|"),     # between | and |
+    'protein_name': re.compile(r"\s(.+?)\sOS"),   # between space and space before OS
+    'species': re.compile(r"OS=(.+?)\sOX"),       # between OS= and space before OX
+    'taxon_id': re.compile(r"OX=(.+?)(\s|$)"),         # between OX= and space
+    'gene': re.compile(r"GN=(.+?)(\s|$)"),             # between GN= and space
+    'pe_level': re.compile(r"PE=(.+?)(\s|$)"),         # between PE= and space
+    'sequence_version': re.compile(r"SV=(.+?)(\s|$)"), # between SV= and space
+    'gene_priority': re.compile(r"GP=(.+?)(\s|$)"),    # between GP= and space
+}
+
+# one pattern for a whole canonical UniProt header:
+# db|accession|entry_name protein name OS=species OX=taxon [GN=] [PE=] [SV=] [GP=]
+HEADER_REGEX = re.compile(
+    r"[^|\s]*\|(?P<protein_id>[^|\s]*)\|[^\s=]*"
+    r"\s(?P<protein_name>[^\s=][^=]*)"
+    r"\sOS=(?P<species>[^\s=][^=]*)"
+    r"\sOX=(?P<taxon_id>[^\s=]+)"
+    r"(?:\sGN=(?P<gene>[^\s=]+))?"
+    r"(?:\sPE=(?P<pe_level>[^\s=]+))?"
+    r"(?:\sSV=(?P<sequence_version>[^\s=]+))?"
+    r"(?:\sGP=(?P<gene_priority>[^\s=]+))?"
+)
+
+# values used when a field is missing from the header
+FIELD_DEFAULTS = {
+    'protein_name': '',
+    'species': '',
+    'taxon_id': '',
+    'gene': '',
+    'pe_level': '0',
+    'sequence_version': '1',
+    'gene_priority': '0',
+}
+
+GZIP_MAGIC = b'\x1f\x8b'
+SHARD_SIZE = 64 << 20
+
+# key order of the protein tuples sent back by the shard workers
+PROTEIN_KEYS = ('protein_id', 'protein_name', 'species', 'taxon_id', 'gene',
+                'pe_level', 'sequence_version', 'gene_priority', 'sequence')
+
+
+def parse_proteome(proteome_file, streaming: bool = False, workers: int = None) -> dict:
+    """Parse out a proteome FASTA file and return a protein dictionary
     Args:
-        proteome_file: path to a proteome file in FASTA format.
-        
+        proteome_file: path to a proteome file in FASTA format. With
+            streaming, this can also be a file object or the raw bytes of
+            the file, plain or gzip compressed.
+        streaming: read the file line by line with the native header parser
+            instead of building Biopython SeqRecords.
+        workers: parse an uncompressed FASTA file on disk in this many
+            processes with iter_proteome_parallel (implies streaming).
+
     Returns:
         A dictionary mapping protein IDs to keyword-value pairs."""
     proteome_dict = {}
+    if workers:
+        for protein_data in iter_proteome_parallel(proteome_file, workers=workers):
+            proteome_dict[protein_data["protein_id"]] = protein_data
+        return proteome_dict
+
+    if streaming:
+        for protein_data in iter_proteome(proteome_file):
+            proteome_dict[protein_data["protein_id"]] = protein_data
+        return proteome_dict
+
     for record in SeqIO.parse(proteome_file, "fasta"):
         protein_data = parse_protein_record(record)
         protein_id = protein_data["protein_id"]
         proteome_dict[protein_id] = protein_data
         proteome_dict[protein_id]["sequence"] = str(record.seq)
-    
+
     return proteome_dict
 
 
+def iter_proteome(proteome_file) -> Iterator[dict]:
+    """Lazily parse a proteome FASTA file one protein at a time.
+
+    Only the protein being parsed is held in memory, so this can be fed
+    into the writers in helpers or UniprotDatabase.add_many regardless of
+    the size of the proteome.
+
+    Args:
+        proteome_file: path, file object or bytes of a FASTA file, plain or
+            gzip compressed.
+
+    Yields:
+        The same protein dictionaries as the values of parse_proteome."""
+    for description, sequence in iter_fasta(proteome_file):
+        protein_data = parse_header(description)
+        protein_data["sequence"] = sequence
+        yield protein_data
+
+
+def iter_proteome_parallel(proteome_file, workers: int = None, shard_size: int = SHARD_SIZE) -> Iterator[dict]:
+    """Parse a proteome FASTA file in a pool of processes, in file order.
+
+    The file is split into byte ranges that start on a record, each worker
+    reads its range through mmap and the parsed shards are yielded in
+    order, so this can feed the same sinks as iter_proteome. At most two
+    shards per worker are parsed ahead of the consumer.
+
+    Gzip files and anything but a path cannot be split and are parsed by
+    iter_proteome in this process.
+
+    Args:
+        proteome_file: path to an uncompressed FASTA file.
+        workers: number of processes, os.cpu_count() by default.
+        shard_size: target number of bytes per shard.
+
+    Yields:
+        The same protein dictionaries as iter_proteome."""
+    workers = workers or os.cpu_count() or 1
+    if not isinstance(proteome_file, (str, os.PathLike)) or _is_gzip(proteome_file) or workers == 1:
+        yield from iter_proteome(proteome_file)
+        return
+
+    shards = shard_offsets(proteome_file, max(workers, -(-os.path.getsize(proteome_file) // shard_size)))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = collections.deque()
+        for start, end in shards:
+            pending.append(executor.submit(_parse_shard, proteome_file, start, end))
+            if len(pending) >= 2 * workers:
+                yield from _protein_dicts(pending.popleft().result())
+        while pending:
+            yield from _protein_dicts(pending.popleft().result())
+
+
+def shard_offsets(path, num_shards: int) -> List[Tuple[int, int]]:
+    """Split a FASTA file into at most num_shards byte ranges that each start on a record.
+
+    Args:
+        path: path to an uncompressed FASTA file.
+        num_shards: number of ranges to aim for.
+
+    Returns:
+        (start, end) byte offsets covering the whole file."""
+    size = os.path.getsize(path)
+    if not size:
+        return []
+    boundaries = [0]
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        for i in range(1, num_shards):
+            target = max(size * i // num_shards, boundaries[-1])
+            boundary = data.find(b'\n>', target)
+            if boundary == -1:
+                break
+            if boundary + 1 > boundaries[-1]:
+                boundaries.append(boundary + 1)
+    boundaries.append(size)
+    return list(zip(boundaries, boundaries[1:]))
+
+
+def _parse_shard(path, start: int, end: int) -> List[tuple]:
+    """Parse the records in path[start:end] into tuples of PROTEIN_KEYS values."""
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        shard = data[start:end]
+    proteins = []
+    for description, sequence in iter_fasta(shard):
+        protein_data = parse_header(description)
+        protein_data['sequence'] = sequence
+        proteins.append(tuple(protein_data[key] for key in PROTEIN_KEYS))
+    return proteins
+
+
+def _protein_dicts(proteins: List[tuple]) -> Iterator[dict]:
+    for values in proteins:
+        yield dict(zip(PROTEIN_KEYS, values))
+
+
+def _is_gzip(path) -> bool:
+    with open(path, 'rb') as f:
+        return f.read(2) == GZIP_MAGIC
+
+
 def parse_protein_record(record: SeqRecord) -> dict:
     """Parse a record from a FASTA file and return a list of the protein data.
     Args:
         record: Biopython SeqRecord of the protein entry.
-        
+
     Returns:
         A list of the protein data in the order of the regexes below."""
-    regexes = {
-        'protein_id': re.compile(r"\|([^|]*)\|"),     # between | and |
-        'protein_name': re.compile(r"\s(.+?)\sOS"),   # between space and space before OS
-        'species': re.compile(r"OS=(.+?)\sOX"),       # between OS= and space before OX
-        'taxon_id': re.compile(r"OX=(.+?)(\s|$)"),         # between OX= and space
-        'gene': re.compile(r"GN=(.+?)(\s|$)"),             # between GN= and space
-        'pe_level': re.compile(r"PE=(.+?)(\s|$)"),         # between PE= and space
-        'sequence_version': re.compile(r"SV=(.+?)(\s|$)"), # between SV= and space
-        'gene_priority': re.compile(r"GP=(.+?)(\s|$)"),    # between GP= and space
-    }
+    description = str(record.description)
     protein_data = {}
-    for key in regexes: # loop through compiled regexes to extract protein data
-        match = regexes[key].search(str(record.description))
-        
+    for key, regex in FIELD_REGEXES.items(): # loop through compiled regexes to extract protein data
+        match = regex.search(description)
+
         if match:
             protein_data[key] = match.group(1)
         else:
             if key == 'protein_id':
                 protein_data[key] = str(record.id) # get record.id from FASTA header instead
-            elif key == 'sequence_version':
-                protein_data[key] = '1'
-            elif key in ['pe_level', 'gene_priority']:
-                protein_data[key] = '0' # zeros for integer columns
             else:
-                protein_data[key] = ''  # empty strings for string columns
+                protein_data[key] = FIELD_DEFAULTS[key]
+
+    return protein_data
+
+
+def parse_header(description: str) -> dict:
+    """Parse a FASTA header (without the leading ">") into the protein data.
+
+    Canonical UniProt headers are matched with a single pattern; anything
+    else falls back to the per-field regexes so the result is always the
+    same as with parse_protein_record.
+
+    Args:
+        description: the full FASTA header line.
+
+    Returns:
+        A dictionary with the same keys and values as parse_protein_record."""
+    match = HEADER_REGEX.fullmatch(description)
+    # names with "OS"/"OX" in them are cut short by the per-field regexes
+    if match and 'OS' not in match['protein_name'] and 'OX' not in match['species']:
+        protein_data = match.groupdict('')
+        for key in ('pe_level', 'sequence_version', 'gene_priority'):
+            if not protein_data[key]:
+                protein_data[key] = FIELD_DEFAULTS[key]
+        return protein_data
+
+    protein_data = {}
+    for key, regex in FIELD_REGEXES.items():
+        match = regex.search(description)
+        if match:
+            protein_data[key] = match.group(1)
+        elif key == 'protein_id':
+            protein_data[key] = description.split(None, 1)[0] if description.strip() else ''
+        else:
+            protein_data[key] = FIELD_DEFAULTS[key]
 
     return protein_data
+
+
+def iter_fasta(source, chunk_size: int = 1 << 20) -> Iterator[Tuple[str, str]]:
+    """Stream (header, sequence) pairs out of a FASTA file.
+
+    The file is read in chunks that are split on record boundaries, so
+    only one chunk is held in memory at a time.
+
+    Args:
+        source: path to a FASTA file, a text or binary file object, or the
+            bytes of a FASTA file. Gzip input is detected and decompressed.
+        chunk_size: number of characters to read at a time.
+
+    Yields:
+        The header line without ">" and the full sequence of each record."""
+    with _open_fasta(source) as handle:
+        buffer = '\n'
+        while True:
+            chunk = handle.read(chunk_size)
+            records = (buffer + chunk).split('\n>')
+            # the last record may continue in the next chunk
+            buffer = '\n>' + records.pop() if chunk else ''
+
+            # records[0] is whatever came before the first ">"
+            for record in records[1:]:
+                header, _, sequence = record.partition('\n')
+                # drop line endings (\n or \r\n) and any other whitespace
+                yield header.rstrip(), ''.join(sequence.split())
+
+            if not chunk:
+                break
+
+
+@contextlib.contextmanager
+def _open_fasta(source):
+    """Open a path, file object or bytes as a text stream of FASTA lines."""
+    if isinstance(source, io.TextIOBase):
+        yield source
+        return
+
+    with contextlib.ExitStack() as stack:
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            source = io.BytesIO(source)
+        elif isinstance(source, (str, os.PathLike)):
+            source = stack.enter_context(open(source, 'rb'))
+        else:
+            source = _NonClosing(source)
+
+        if not hasattr(source, 'peek'):
+            source = io.BufferedReader(source)
+        if source.peek(2)[:2] == GZIP_MAGIC:
+            source = stack.enter_context(gzip.GzipFile(fileobj=source))
+        yield io.TextIOWrapper(source, encoding='utf-8')
+
+
+class _NonClosing(io.RawIOBase):
+    """Read from a caller-owned binary file object without closing it."""
+    def __init__(self, handle):
+        self._handle = handle
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self._handle.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
@@ -1,55 +1,110 @@
 import re
-import pandas as pd
 
-from Bio import SeqIO
-from anytree import Node, RenderTree
+from .parser import iter_fasta
 
+# gene symbol runs up to the next space or the end of the FASTA description
+GENE_REGEX = re.compile(r'GN=([^ ]*)')
 
-def add_nodes(nodes, parent, child):
-  if parent not in nodes:
-    nodes[parent] = Node(parent)
-  if child not in nodes:
-    nodes[child] = Node(child)
-  nodes[child].parent = nodes[parent]
 
-def create_protein_tree(proteome, gp_proteome):
-  proteins = list(SeqIO.parse(proteome, 'fasta'))
+def group_proteins(proteome):
+  """
+  Group the proteins of a proteome FASTA file by gene symbol.
+
+  Proteins without a gene symbol are grouped under ''. A protein listed
+  under several genes ends up under the last one, and genes keep the order
+  in which they first appear.
+
+  Args:
+    proteome: path, file object or bytes of the proteome FASTA file.
+
+  Returns:
+    A dict mapping each gene symbol to the list of its UniProt IDs, and
+    the list of genes in order of first appearance.
+  """
+  children = {}
+  parent_of = {}
+  genes = []
+  for description, _ in iter_fasta(proteome):
+    protein_id = description.split(None, 1)[0].split('|')[1]
+    match = GENE_REGEX.search(description)
+    gene = match.group(1) if match else ''
+
+    if gene not in children:
+      children[gene] = {}
+      genes.append(gene)
+
+    # move proteins seen under another gene, keep the position otherwise
+    previous = parent_of.get(protein_id)
+    if previous == gene:
+      continue
+    if previous is not None:
+      del children[previous][protein_id]
+    children[gene][protein_id] = None
+    parent_of[protein_id] = gene
+
+  return {gene: list(ids) for gene, ids in children.items()}, genes
+
+
+def read_gp_ids(gp_proteome):
+  """Return the set of UniProt IDs in a gene priority proteome FASTA file."""
+  return {description.split(None, 1)[0].split('|')[1] for description, _ in iter_fasta(gp_proteome)}
+
+
+def render_protein_tree(tree, gp_ids, roots, file, buffer_size=4096):
+  """
+  Write a gene -> UniProt ID tree, marking gene priority proteins with "*".
+
+  Args:
+    tree: dict mapping each node to its children.
+    gp_ids: set of gene priority UniProt IDs.
+    roots: nodes to start a tree from.
+    file: open text file to write to.
+    buffer_size: number of lines collected before each write.
+  """
+  lines = []
+  for root in roots:
+    stack = [(root, '', '')]
+    while stack:
+      node, pre, fill = stack.pop()
+      lines.append(f"{pre}{node}{'*' if node in gp_ids else ''}\n")
+      kids = tree.get(node, [])
+      # push in reverse so the first child is written first
+      for i in range(len(kids) - 1, -1, -1):
+        last = i == len(kids) - 1
+        stack.append((kids[i], fill + ('└── ' if last else '├── '), fill + ('    ' if last else '│   ')))
+      if len(lines) >= buffer_size:
+        file.write(''.join(lines))
+        lines.clear()
+  file.write(''.join(lines))
+
+
+def create_protein_tree(proteome, gp_proteome, output_file=None):
+  """
+  Build the gene -> isoform tree of a proteome, and write it to output_file
+  if one is given.
+
+  Each gene is a root with its UniProt IDs as children; gene priority
+  proteins are marked with "*". Runs in linear time and holds only the
+  IDs in memory, never the sequences.
+
+  Args:
+    proteome: path, file object or bytes of the proteome FASTA file.
+    gp_proteome: the gene priority proteome FASTA file.
+    output_file: where to write the tree; by default it is only returned.
+
+  Returns:
+    A dict mapping each gene symbol to the list of its UniProt IDs.
+  """
+  tree, genes = group_proteins(proteome)
 
   # get UniProt IDs for one protein per gene proteome
-  # TODO: See why this was gp_proteome rather than proteome
-  gp_ids = [str(x.id.split('|')[1]) for x in list(SeqIO.parse(gp_proteome, 'fasta'))]
-
-  data = []
-  for protein in proteins:
-    # get gene symbol from FASTA file
-    try:
-      gene = re.search('GN=(.*?) ', protein.description).group(1)
-    except AttributeError:
-
-      # sometimes the gene symbol is at the end of the FASTA description
-      try:
-        gene = re.search('GN=(.*?)$', protein.description).group(1)
-      except AttributeError:
-        gene = ''
-
-    data.append([protein.id.split('|')[0], gene, protein.id.split('|')[1], str(protein.seq)])
-
-  # put protein tree data into dataframe
-  df = pd.DataFrame(data, columns=['db', 'gene', 'id', 'seq'])
-
-  # start tree with nodes - genes as root and UniProt IDs as children
-  nodes = {}
-  for parent, child in zip(df['gene'],df['id']):
-    add_nodes(nodes, parent, child)
-
-  # write the tree into a text file
-  with open('protein_tree.txt', 'w') as f:
-    roots = list(df[~df['gene'].isin(df['id'])]['gene'].unique())
-    for root in roots:         # you can skip this for roots[0], if there is no forest and just 1 tree
-      for pre, _, node in RenderTree(nodes[root]):
-        if node.name in gp_ids:
-          f.write("%s%s*" % (pre, node.name))
-          f.write('\n')
-        else:
-          f.write("%s%s" % (pre, node.name))
-          f.write('\n')
+  gp_ids = read_gp_ids(gp_proteome)
+
+  if output_file is not None:
+    # genes that are also protein IDs hang under that protein instead of being a root
+    protein_ids = {protein_id for ids in tree.values() for protein_id in ids}
+    roots = [gene for gene in genes if gene not in protein_ids]
+    with open(output_file, 'w') as f:
+      render_protein_tree(tree, gp_ids, roots, f)
+
+  return tree
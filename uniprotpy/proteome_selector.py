@@ -1,9 +1,69 @@
 import re
 import os
-import pandas as pd
+import csv
+import json
 import requests
+from collections import namedtuple
 from pathlib import Path
 
+from . import rest
+from .fasta_index import FastaIndexBuilder, build_fasta_index
+from .helpers import batched, proteome_to_parquet
+from .parser import iter_fasta, parse_header
+
+# fields of the proteome list needed to rank the candidate proteomes
+PROTEOME_LIST_FIELDS = 'upid,organism_id,protein_count,proteome_type'
+Proteome = namedtuple('Proteome', ['upid', 'taxonomy', 'protein_count', 'is_representative', 'is_reference',
+                                   'is_redundant'])
+
+
+def proteome_list_url(taxon_id, reference_only=True, base_url=None):
+  """
+  URL of the proteome list of a taxon with the PROTEOME_LIST_FIELDS fields.
+
+  Args:
+    taxon_id (str): NCBI taxonomy identifier.
+    reference_only (bool): only list proteome_type:1, the representative
+      and reference proteomes.
+    base_url (str): UniProt REST API root, rest.BASE_URL by default.
+  """
+  query = f'(proteome_type:1)AND(taxonomy_id:{taxon_id})' if reference_only else f'(taxonomy_id:{taxon_id})'
+  return f'{base_url or rest.BASE_URL}/proteomes/stream?format=tsv&fields={PROTEOME_LIST_FIELDS}&query={query}'
+
+
+def parse_proteome_list(lines):
+  """
+  Parse the lines of a proteome list TSV into Proteome tuples.
+
+  Args:
+    lines (iterable): TSV lines, header first.
+  """
+  rows = csv.reader(lines, delimiter='\t')
+  next(rows, None) # header
+  proteome_list = []
+  for row in rows:
+    if not row:
+      continue
+    upid, taxonomy, protein_count, proteome_type = row
+    proteome_type = proteome_type.lower()
+    proteome_list.append(Proteome(
+      upid=upid,
+      taxonomy=int(taxonomy),
+      protein_count=int(protein_count or 0),
+      is_representative='representative' in proteome_type,
+      is_reference='reference' in proteome_type,
+      is_redundant=proteome_type.startswith('redundant'),
+    ))
+  return proteome_list
+
+
+PROTEOME_CSV_COLUMNS = ['Database', 'Gene Symbol', 'UniProt ID', 'Gene Priority', 'Protein Existence Level', 'Sequence']
+
+# the gene symbol runs up to the next space or the end of the header,
+# the protein existence level is only read when followed by a space
+RE_GENE = re.compile(r'GN=([^ ]*)')
+RE_PE_LEVEL = re.compile(r'PE=([^ ]*) ')
+
 
 class ProteomeSelector:
   def __init__(self, taxon_id):
@@ -12,6 +72,9 @@ class ProteomeSelector:
     # get proteome list for species and count number of proteomes
     self.proteome_list = self._get_proteome_list()
     self.num_of_proteomes = len(self.proteome_list) + 1 # +1 because "all proteins" is also a candidate proteome
+
+    # number of proteins in the chosen proteome, set by choose_proteome
+    self.protein_count = None
   
   def download(self, format: str, compressed: bool = False, outdir: str = '.') -> None:
     """After a proteome is selected from UniProt, download it in a given format.
@@ -22,7 +85,7 @@ class ProteomeSelector:
       outdir: the directory to download the file to.
     """
 
-  def select_best_proteome(self):
+  def select_best_proteome(self, force: bool = False):
     """
     Select the best proteome to use for a species. Return the proteome ID, 
     proteome taxon, and proteome type.
@@ -40,92 +103,141 @@ class ProteomeSelector:
 
     If no to all of the above, then get every protein associated with
     the taxon ID using the get_all_proteins method.
+
+    Args:
+      force (bool): select and download again even if
+        data/<taxon>/proteome.fasta already exists.
     """
-    if (Path('.') / 'data' / self.taxon_id / 'proteome.fasta').exists():
+    if (Path('.') / 'data' / self.taxon_id / 'proteome.fasta').exists() and not force:
       print(f'Proteome already selected for {self.taxon_id}.')
       return None
     else:
       (Path('.') / 'data' / self.taxon_id).mkdir(parents=True, exist_ok=True)
 
-    # if there is no proteome_list, get all proteins associated with that taxon ID
-    if self.proteome_list.empty:
+    proteome_id, proteome_taxon, proteome_type = self.choose_proteome()
+
+    # if there are no candidate proteomes, get all proteins associated with that taxon ID
+    if proteome_type == 'All-proteins':
       self._get_all_proteins()
       return 'None', self.taxon_id, 'All-proteins'
 
-    if self.proteome_list['isRepresentativeProteome'].any():
-      proteome_type = 'Representative'
-      self.proteome_list = self.proteome_list[self.proteome_list['isRepresentativeProteome']]
-      proteome_id, proteome_taxon = self._get_proteome_with_most_proteins()
-      # self._get_gp_proteome_to_fasta(proteome_id, proteome_taxon)
-    
-    elif self.proteome_list['isReferenceProteome'].any():
-      proteome_type = 'Reference'
-      self.proteome_list = self.proteome_list[self.proteome_list['isReferenceProteome']]
-      proteome_id, proteome_taxon = self._get_proteome_with_most_proteins()
-      # self._get_gp_proteome_to_fasta(proteome_id, proteome_taxon)
+    # write the proteome to a file
+    self._get_proteome_to_fasta(proteome_id)
 
-    elif 'redundantTo' not in self.proteome_list.columns:
-      proteome_type = 'Other'
-      proteome_id, proteome_taxon = self._get_proteome_with_most_proteins()
-    
-    elif self.proteome_list['redundantTo'].isna().any():
-      proteome_type = 'Non-redundant'
-      self.proteome_list = self.proteome_list[self.proteome_list['redundantTo'].isna()]
-      proteome_id, proteome_taxon = self._get_proteome_with_most_proteins()
-    
-    else:
-      proteome_type = 'Other'
-      proteome_id, proteome_taxon = self._get_proteome_with_most_proteins()
-    
     # sanity check to make sure proteome.fasta is not empty
     if os.stat(f'./data/{self.taxon_id}/proteome.fasta').st_size == 0:
       proteome_id = 'None'
       proteome_taxon = self.taxon_id
       proteome_type = 'All-proteins'
+      self.protein_count = None
       self._get_all_proteins()
 
     proteome_data = [proteome_id, proteome_taxon, proteome_type]
     return proteome_data
 
-  def proteome_to_csv(self):
+  def choose_proteome(self):
     """
-    Write the proteome data for a species to a CSV file for later use.
+    Pick the best proteome from the proteome list without downloading it.
+    Return the proteome ID, proteome taxon, and proteome type, and set
+    protein_count to the number of proteins in the chosen proteome.
+
+    See select_best_proteome for the order of the checks. The best
+    candidate of every check is tracked in one pass over the list; ties
+    go to the proteome with the most proteins, then to the first one
+    listed. With no candidate proteomes, return 'None', the taxon ID and
+    'All-proteins'.
+    """
+    self.protein_count = None
+    if not self.proteome_list:
+      return 'None', self.taxon_id, 'All-proteins'
+
+    best = {}
+    any_redundant = False
+    for proteome in self.proteome_list:
+      any_redundant = any_redundant or proteome.is_redundant
+      checks = (
+        ('Representative', proteome.is_representative),
+        ('Reference', proteome.is_reference),
+        ('Non-redundant', not proteome.is_redundant),
+        ('Other', True),
+      )
+      for proteome_type, passes in checks:
+        if passes and (proteome_type not in best or proteome.protein_count > best[proteome_type].protein_count):
+          best[proteome_type] = proteome
+
+    if 'Representative' in best:
+      proteome_type = 'Representative'
+    elif 'Reference' in best:
+      proteome_type = 'Reference'
+    elif any_redundant and 'Non-redundant' in best:
+      proteome_type = 'Non-redundant'
+    else:
+      proteome_type = 'Other'
+
+    proteome = best[proteome_type]
+    self.protein_count = proteome.protein_count
+    return proteome.upid, proteome.taxonomy, proteome_type
+
+  def proteome_to_csv(self, format: str = 'csv', chunk_size: int = 10000):
     """
-    from Bio import SeqIO
+    Write the proteome data for a species to a CSV file for later use.
+
+    The proteome is read in one pass and written chunk_size proteins at a
+    time, so memory use does not grow with the size of the proteome. The
+    gene priority IDs are held in a set.
 
-    # read in the FASTA file and then get the gene priority IDs if they exist
-    proteins = list(SeqIO.parse(f'data/{self.taxon_id}/proteome.fasta', 'fasta'))
+    Args:
+      format (str): 'csv', or 'parquet' to write proteome.parquet instead
+        with the columns of helpers.proteome_schema (needs pyarrow).
+      chunk_size (int): number of proteins held in memory before writing,
+        and the Parquet row group size.
+    """
+    if format not in ('csv', 'parquet'):
+      raise ValueError(f'Unknown format {format!r}, expected "csv" or "parquet".')
 
+    # get the gene priority IDs if they exist
     gp_proteome_path = f'data/{self.taxon_id}/gp_proteome.fasta'
     if os.path.isfile(gp_proteome_path):
-      gp_ids = [str(protein.id.split('|')[1]) for protein in list(SeqIO.parse(gp_proteome_path, 'fasta'))]
+      gp_ids = {header.split(None, 1)[0].split('|')[1] for header, _ in iter_fasta(gp_proteome_path)}
     else:
-      gp_ids = []
-
-    # start collecting proteome data
-    proteome_data = []
-    for protein in proteins:
-      uniprot_id = protein.id.split('|')[1]
-      gp = 1 if uniprot_id in gp_ids else 0
-
-      # TODO: look into using HUGO to map old gene names to new ones
-
-      try:
-        gene = re.search('GN=(.*?) ', protein.description).group(1)
-      except AttributeError:
-        try: # some gene names are at the end of the header
-          gene = re.search('GN=(.*?)$', protein.description).group(1)
-        except AttributeError:
-          gene = ''
-      try: # protein existence level
-        pe_level = int(re.search('PE=(.*?) ', protein.description).group(1))
-      except AttributeError:
-        pe_level = 0
-      
-      proteome_data.append([protein.id.split('|')[0], gene, uniprot_id, gp, pe_level, str(protein.seq)])
-    
-    columns = ['Database', 'Gene Symbol', 'UniProt ID', 'Gene Priority', 'Protein Existence Level', 'Sequence']
-    pd.DataFrame(proteome_data, columns=columns).to_csv(f'data/{self.taxon_id}/proteome.csv', index=False)
+      gp_ids = set()
+
+    fasta = iter_fasta(f'data/{self.taxon_id}/proteome.fasta')
+    if format == 'parquet':
+      proteins = ({**parse_header(header), 'sequence': sequence} for header, sequence in fasta)
+      proteins = ({**protein, 'gene_priority': protein['protein_id'] in gp_ids} for protein in proteins)
+      proteome_to_parquet(proteins, f'data/{self.taxon_id}/proteome.parquet', batch_size=chunk_size)
+      return
+
+    # TODO: look into using HUGO to map old gene names to new ones
+    rows = (self._proteome_row(header, sequence, gp_ids) for header, sequence in fasta)
+    with open(f'data/{self.taxon_id}/proteome.csv', 'w', newline='') as f:
+      writer = csv.writer(f, lineterminator=os.linesep)
+      writer.writerow(PROTEOME_CSV_COLUMNS)
+      for chunk in batched(rows, chunk_size):
+        writer.writerows(chunk)
+
+  @staticmethod
+  def _proteome_row(header, sequence, gp_ids):
+    """
+    Build a proteome.csv row from a FASTA header and sequence.
+
+    Args:
+      header (str): FASTA header without the leading ">".
+      sequence (str): protein sequence.
+      gp_ids (set): UniProt IDs in the gene priority proteome.
+    """
+    database, uniprot_id = header.split(None, 1)[0].split('|')[:2]
+    gene = RE_GENE.search(header)
+    pe_level = RE_PE_LEVEL.search(header)
+    return [
+      database,
+      gene.group(1) if gene else '',
+      uniprot_id,
+      1 if uniprot_id in gp_ids else 0,
+      int(pe_level.group(1)) if pe_level else 0,
+      sequence,
+    ]
 
   def _get_proteome_list(self):
     """
@@ -133,39 +245,101 @@ class ProteomeSelector:
     Check for proteome_type:1 first, which are the representative or
     reference proteomes.
 
-    If there are no proteomes, return empty DataFrame.
+    Only the fields needed to rank the proteomes are requested, as TSV,
+    and the rows are parsed as they stream in.
+
+    If there are no proteomes, return an empty list.
     """
     # URL to get proteome list for a species - use proteome_type:1 first
-    url = f'https://rest.uniprot.org/proteomes/stream?format=xml&query=(proteome_type:1)AND(taxonomy_id:{self.taxon_id})'
-    
-    try:
-      proteome_list = pd.read_xml(requests.get(url).text)
-    except ValueError:
-      try: # delete proteome_type:1 from URL and try again
-        url = url.replace('(proteome_type:1)AND', '')
-        proteome_list = pd.read_xml(requests.get(url).text)
-      except ValueError: # if there are no proteomes, return empty DataFrame
-        return pd.DataFrame()
-
-    # remove the namespace from the columns
-    proteome_list.columns = [x.replace('{http://uniprot.org/proteome}', '') for x in proteome_list.columns]
+    url = proteome_list_url(self.taxon_id)
+
+    proteome_list = self._read_proteome_list(url)
+    if not proteome_list: # drop proteome_type:1 from the query and try again
+      proteome_list = self._read_proteome_list(proteome_list_url(self.taxon_id, reference_only=False))
     return proteome_list
 
-  def _get_all_proteins(self):
+  def _read_proteome_list(self, url):
+    """
+    Parse a proteome list TSV into Proteome tuples.
+
+    Args:
+      url (str): proteomes stream URL with the PROTEOME_LIST_FIELDS fields.
+    """
+    with rest.get(url, stream=True) as r:
+      r.raise_for_status()
+      r.encoding = r.encoding or 'utf-8'
+      return parse_proteome_list(r.iter_lines(decode_unicode=True))
+
+  def _get_all_proteins(self, resume: bool = True):
     """
     Get every protein associated with a taxon ID on UniProt.
     Species on UniProt will have a proteome, but not every protein is
     stored within those proteomes. There is a way to get every protein
     using the taxonomy part of UniProt. 
+
+    Batches are appended to proteome.fasta.part. After each batch, the
+    cursor URL of the next batch and the byte offset are saved in
+    proteome.fasta.manifest.json, so an interrupted run picks up where it
+    stopped. proteome.fasta only appears once every batch is in and the
+    number of records matches the X-Total-Results header.
+
+    Args:
+      resume (bool): continue from the manifest of an interrupted run.
     """
     # URL link to all proteins for a species - size = 500 proteins at a time
-    url = f'https://rest.uniprot.org/uniprotkb/search?format=fasta&'\
+    url = f'{rest.BASE_URL}/uniprotkb/search?format=fasta&'\
           f'query=taxonomy_id:{self.taxon_id}&size=500' 
 
-    # loop through all protein batches and write proteins to FASTA file
-    for batch in self._get_protein_batches(url):
-      with open(f'data/{self.taxon_id}/proteome.fasta', 'a') as f:
-        f.write(batch.text)
+    data_dir = Path('data') / self.taxon_id
+    fasta_path = data_dir / 'proteome.fasta'
+    part_path = data_dir / 'proteome.fasta.part'
+    manifest_path = data_dir / 'proteome.fasta.manifest.json'
+
+    manifest = {'next_url': url, 'offset': 0, 'records': 0, 'total': None}
+    if resume and manifest_path.exists() and part_path.exists():
+      manifest = json.loads(manifest_path.read_text())
+
+    # loop through all protein batches and stream proteins to FASTA file
+    with open(part_path, 'ab') as f:
+      f.truncate(manifest['offset']) # drop a batch that was only partly written
+      for batch in self._get_protein_batches(manifest['next_url']) if manifest['next_url'] else []:
+        if 'X-Total-Results' in batch.headers:
+          manifest['total'] = int(batch.headers['X-Total-Results'])
+        # a record starts with ">" at the start of a line; descriptions may contain ">" too
+        last_byte = b'\n'
+        for chunk in batch.iter_content(chunk_size=rest.CHUNK_SIZE):
+          f.write(chunk)
+          manifest['records'] += (last_byte + chunk).count(b'\n>')
+          last_byte = chunk[-1:] or last_byte
+        f.flush()
+        os.fsync(f.fileno())
+
+        manifest['next_url'] = self._get_next_link(batch.headers)
+        manifest['offset'] = f.tell()
+        self._write_manifest(manifest_path, manifest)
+
+    if manifest['total'] is not None and manifest['records'] != manifest['total']:
+      manifest_path.unlink()
+      raise RuntimeError(
+        f'Expected {manifest["total"]} proteins for taxon {self.taxon_id} '
+        f'but downloaded {manifest["records"]}.'
+      )
+
+    os.replace(part_path, fasta_path)
+    manifest_path.unlink(missing_ok=True)
+    build_fasta_index(fasta_path)
+
+  def _write_manifest(self, manifest_path, manifest):
+    """
+    Atomically replace the download manifest with a new one.
+
+    Args:
+      manifest_path (Path): path of the manifest file.
+      manifest (dict): cursor URL, byte offset and record counts.
+    """
+    temp_path = manifest_path.with_name(manifest_path.name + '.tmp')
+    temp_path.write_text(json.dumps(manifest))
+    os.replace(temp_path, manifest_path)
 
   def _get_protein_batches(self, batch_url):
     """
@@ -177,9 +351,9 @@ class ProteomeSelector:
       batch_url (str): URL to get all proteins for a species.
     """
     while batch_url:
-      r = requests.get(batch_url)
-      r.raise_for_status()
-      yield r
+      with rest.get(batch_url, stream=True) as r:
+        r.raise_for_status()
+        yield r
       batch_url = self._get_next_link(r.headers)
 
   def _get_next_link(self, headers):
@@ -207,8 +381,6 @@ class ProteomeSelector:
       proteome_id (str): Proteome ID.
       proteome_taxon (str): Taxon ID for the proteome.
     """
-    import gzip
-    
     group = self.species_df[self.species_df['Taxon ID'].astype(str) == self.taxon_id]['Group'].iloc[0]
     ftp_url = f'https://ftp.uniprot.org/pub/databases/uniprot/knowledgebase/reference_proteomes/'
     
@@ -221,36 +393,24 @@ class ProteomeSelector:
     elif group in ['virus', 'small-virus', 'large-virus']:
       ftp_url += f'Viruses/{proteome_id}/{proteome_id}_{proteome_taxon}.fasta.gz'
     
-    r = requests.get(ftp_url, stream=True)
+    # unzip the download as it streams and write the gene priority proteome to a file.
+    # not every proteome has one; anything but a 404 is an error
     try:
-      r.raise_for_status()
-    except:
-      return
-
-    # unzip the request and write the gene priority proteome to a file
-    with open(f'data/{self.taxon_id}/gp_proteome.fasta', 'wb') as f:
-      f.write(gzip.open(r.raw, 'rb').read())
+      rest.stream_to_file(ftp_url, f'data/{self.taxon_id}/gp_proteome.fasta', decompress=True)
+    except requests.HTTPError as e:
+      if e.response is None or e.response.status_code != 404:
+        raise
+      print(f'No gene priority proteome for {proteome_id}.')
   
   def _get_proteome_to_fasta(self, proteome_id):
     """
     Get the FASTA file for a proteome from UniProt API.
-    Include all isoforms and do not compress the file.
-    """
-    url = f'https://rest.uniprot.org/uniprotkb/stream?compressed=false&format=fasta&includeIsoform=true&query=(proteome:{proteome_id})'
-    r = requests.get(url)
-    r.raise_for_status()
-    with open(f'data/{self.taxon_id}/proteome.fasta', 'w') as f:
-      f.write(r.text)
-
-  def _get_proteome_with_most_proteins(self):
+    Include all isoforms. The file is downloaded compressed and
+    decompressed chunk by chunk as it is written, and indexed by
+    accession on the way for FastaIndex.
     """
-    Between UniProt proteome ties, get the proteome with the most proteins.
-    """
-    # get the index of the row with the most proteins using proteinCount
-    proteome_id = self.proteome_list.loc[self.proteome_list['proteinCount'].idxmax()]['upid']
-    proteome_taxon = self.proteome_list.loc[self.proteome_list['proteinCount'].idxmax()]['taxonomy']
-
-    # write the proteome to a file
-    self._get_proteome_to_fasta(proteome_id)
-
-    return proteome_id, proteome_taxon
+    url = f'{rest.BASE_URL}/uniprotkb/stream?compressed=true&format=fasta&includeIsoform=true&query=(proteome:{proteome_id})'
+    builder = FastaIndexBuilder()
+    rest.stream_to_file(url, f'data/{self.taxon_id}/proteome.fasta', decompress=True,
+                        on_chunk=builder.feed, on_restart=builder.reset)
+    builder.write(f'data/{self.taxon_id}/proteome.fasta')
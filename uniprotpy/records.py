@@ -0,0 +1,191 @@
+"""Compact, typed containers for parsed proteins.
+
+ProteinRecord is a NamedTuple with the header fields converted to their
+types. ProteomeTable keeps a whole proteome in columns: numpy arrays for
+the numeric fields, integer codes into shared string tables for species,
+gene and protein names, and every sequence in one buffer with offsets.
+"""
+from array import array
+from typing import Dict, Iterable, Iterator, NamedTuple, Optional
+
+import numpy as np
+
+from .helpers import StringTable, to_bool, to_int
+from .models import UniprotEntry
+from .parser import iter_proteome
+
+
+class ProteinRecord(NamedTuple):
+    protein_id: str
+    protein_name: str
+    species: str
+    taxon_id: Optional[int]
+    gene: str
+    pe_level: int
+    sequence_version: int
+    gene_priority: bool
+    sequence: str
+
+    @classmethod
+    def from_dict(cls, protein: dict) -> 'ProteinRecord':
+        """Build a record from a parser dictionary, converting the string fields."""
+        return cls(
+            protein_id=protein['protein_id'],
+            protein_name=protein.get('protein_name', ''),
+            species=protein.get('species', ''),
+            taxon_id=to_int(protein.get('taxon_id')),
+            gene=protein.get('gene', ''),
+            pe_level=to_int(protein.get('pe_level')) or 0,
+            sequence_version=to_int(protein.get('sequence_version')) or 1,
+            gene_priority=bool(to_bool(protein.get('gene_priority'))),
+            sequence=protein.get('sequence') or '',
+        )
+
+    def to_entry(self) -> UniprotEntry:
+        return UniprotEntry(**self._asdict())
+
+
+def iter_records(proteome_file) -> Iterator[ProteinRecord]:
+    """Lazily parse a proteome FASTA file into ProteinRecords (see parser.iter_proteome)."""
+    for protein in iter_proteome(proteome_file):
+        yield ProteinRecord.from_dict(protein)
+
+
+class ProteomeTable:
+    """A proteome held column by column.
+
+    Build one with from_proteins or from_fasta. Rows come back as
+    ProteinRecords by position (table[i]) or by protein ID (get).
+
+    Missing taxon IDs are stored as -1.
+    """
+    NUMERIC_COLUMNS = {
+        'taxon_id': np.int32, 'pe_level': np.int8, 'sequence_version': np.int16, 'gene_priority': np.bool_,
+    }
+
+    def __init__(self, protein_ids, name_codes, names, species_codes, species, gene_codes, genes,
+                 numeric, sequence_offsets, sequence_data):
+        self.protein_ids = protein_ids
+        self.name_codes = name_codes
+        self.names = names
+        self.species_codes = species_codes
+        self.species = species
+        self.gene_codes = gene_codes
+        self.genes = genes
+        self.taxon_id = numeric['taxon_id']
+        self.pe_level = numeric['pe_level']
+        self.sequence_version = numeric['sequence_version']
+        self.gene_priority = numeric['gene_priority']
+        self.sequence_offsets = sequence_offsets
+        self.sequence_data = sequence_data
+        self._positions = None
+
+    @classmethod
+    def from_proteins(cls, proteins: Iterable) -> 'ProteomeTable':
+        """Build a table from parser dictionaries or ProteinRecords."""
+        protein_ids = []
+        names, species, genes = StringTable(), StringTable(), StringTable()
+        name_codes, species_codes, gene_codes = array('i'), array('i'), array('i')
+        numeric = {name: array('q') for name in cls.NUMERIC_COLUMNS}
+        sequence_offsets = array('q', [0])
+        sequence_data = bytearray()
+
+        for protein in proteins:
+            if not isinstance(protein, ProteinRecord):
+                protein = ProteinRecord.from_dict(protein)
+            protein_ids.append(protein.protein_id)
+            name_codes.append(names.code(protein.protein_name))
+            species_codes.append(species.code(protein.species))
+            gene_codes.append(genes.code(protein.gene))
+            numeric['taxon_id'].append(-1 if protein.taxon_id is None else protein.taxon_id)
+            numeric['pe_level'].append(protein.pe_level)
+            numeric['sequence_version'].append(protein.sequence_version)
+            numeric['gene_priority'].append(protein.gene_priority)
+            sequence_data += protein.sequence.encode()
+            sequence_offsets.append(len(sequence_data))
+
+        return cls(
+            protein_ids,
+            np.frombuffer(name_codes, dtype=np.int32), names.values,
+            np.frombuffer(species_codes, dtype=np.int32), species.values,
+            np.frombuffer(gene_codes, dtype=np.int32), genes.values,
+            {name: np.asarray(numeric[name], dtype=dtype) for name, dtype in cls.NUMERIC_COLUMNS.items()},
+            np.frombuffer(sequence_offsets, dtype=np.int64), sequence_data,
+        )
+
+    @classmethod
+    def from_fasta(cls, proteome_file) -> 'ProteomeTable':
+        """Parse a proteome FASTA file straight into a table."""
+        return cls.from_proteins(iter_proteome(proteome_file))
+
+    def __len__(self) -> int:
+        return len(self.protein_ids)
+
+    def sequence(self, i: int) -> str:
+        return self.sequence_data[self.sequence_offsets[i]:self.sequence_offsets[i + 1]].decode()
+
+    def __getitem__(self, i: int) -> ProteinRecord:
+        taxon_id = int(self.taxon_id[i])
+        return ProteinRecord(
+            protein_id=self.protein_ids[i],
+            protein_name=self.names[self.name_codes[i]],
+            species=self.species[self.species_codes[i]],
+            taxon_id=None if taxon_id < 0 else taxon_id,
+            gene=self.genes[self.gene_codes[i]],
+            pe_level=int(self.pe_level[i]),
+            sequence_version=int(self.sequence_version[i]),
+            gene_priority=bool(self.gene_priority[i]),
+            sequence=self.sequence(i),
+        )
+
+    def __iter__(self) -> Iterator[ProteinRecord]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def get(self, protein_id: str) -> Optional[ProteinRecord]:
+        """Return the record of a protein ID, None if it is not in the table."""
+        if self._positions is None:
+            self._positions = {protein_id: i for i, protein_id in enumerate(self.protein_ids)}
+        i = self._positions.get(protein_id)
+        return None if i is None else self[i]
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the columns, strings included."""
+        arrays = (self.name_codes, self.species_codes, self.gene_codes, self.taxon_id, self.pe_level,
+                  self.sequence_version, self.gene_priority, self.sequence_offsets)
+        strings = sum(len(value) for table in (self.names, self.species, self.genes) for value in table)
+        return (sum(array_.nbytes for array_ in arrays) + len(self.sequence_data)
+                + sum(len(protein_id) for protein_id in self.protein_ids) + strings)
+
+    def to_pandas(self, sequences: bool = True):
+        """Return a DataFrame with categorical species and gene columns.
+
+        Args:
+            sequences: include the sequence column.
+        """
+        import pandas as pd
+
+        columns = {
+            'protein_id': self.protein_ids,
+            'protein_name': pd.Categorical.from_codes(self.name_codes, self.names),
+            'species': pd.Categorical.from_codes(self.species_codes, self.species),
+            'taxon_id': pd.array(np.where(self.taxon_id < 0, None, self.taxon_id), dtype='Int32'),
+            'gene': pd.Categorical.from_codes(self.gene_codes, self.genes),
+            'pe_level': self.pe_level,
+            'sequence_version': self.sequence_version,
+            'gene_priority': self.gene_priority,
+        }
+        if sequences:
+            columns['sequence'] = [self.sequence(i) for i in range(len(self))]
+        return pd.DataFrame(columns)
+
+    def to_entries(self) -> Iterator[UniprotEntry]:
+        """Yield a UniprotEntry per protein, e.g. for a SQLAlchemy session."""
+        for record in self:
+            yield record.to_entry()
+
+    def iter_dicts(self) -> Iterator[Dict]:
+        """Yield typed protein dictionaries for UniprotDatabase.add_many and the helpers writers."""
+        for record in self:
+            yield record._asdict()
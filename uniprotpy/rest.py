@@ -0,0 +1,388 @@
+"""Shared HTTP plumbing for the UniProt REST API.
+
+Every request goes through get() or stream_to_file(), which retry 429 and
+5xx responses and connection errors with exponential backoff and jitter,
+honor Retry-After, apply an optional per-host token-bucket rate limit and
+a default timeout, and report each attempt to the registered hooks.
+"""
+import email.utils
+import os
+import random
+import threading
+import time
+import zlib
+from typing import Callable, NamedTuple, Optional
+from urllib.parse import urlsplit
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+
+BASE_URL = 'https://rest.uniprot.org'
+POOL_SIZE = 16
+CHUNK_SIZE = 1 << 20
+# (connect, read) seconds
+TIMEOUT = (10, 300)
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# errors raised while reading a response body, after which a download starts over
+BODY_ERRORS = (requests.exceptions.ChunkedEncodingError, requests.ConnectionError)
+# upper bounds in seconds of the latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, float('inf'))
+
+_session = None
+_session_lock = threading.Lock()
+_cache = None
+_hooks = []
+
+
+class RetryPolicy:
+    """When and how long to wait before retrying a request.
+
+    Args:
+      retries: number of retries after the first attempt.
+      backoff: delay before the first retry in seconds, doubled each time.
+      max_backoff: longest delay between two attempts.
+      statuses: response statuses worth retrying.
+    """
+    def __init__(self, retries: int = 5, backoff: float = 0.5, max_backoff: float = 60,
+                 statuses=RETRY_STATUSES):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.statuses = statuses
+
+    def delay(self, attempt: int, retry_after: str = None) -> float:
+        """Seconds to wait before retry number attempt (from 0).
+
+        Exponential backoff with jitter, but never less than Retry-After,
+        given in seconds or as an HTTP date.
+        """
+        delay = min(self.max_backoff, self.backoff * 2 ** attempt) * random.uniform(0.5, 1)
+        return max(delay, parse_retry_after(retry_after))
+
+
+def parse_retry_after(value: str) -> float:
+    """Seconds asked for by a Retry-After header, 0 when missing or invalid."""
+    if not value:
+        return 0.0
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class RateLimiter:
+    """Token bucket allowing rate requests per second per host, in bursts of up to burst.
+
+    With the default burst of 1, requests to a host are evenly spaced.
+
+    Args:
+      rate: maximum requests per second per host, None for no limit.
+      burst: number of requests allowed back to back.
+    """
+    def __init__(self, rate: float = None, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url: str) -> None:
+        """Block until a request to the host of url is allowed."""
+        if not self.rate:
+            return
+        host = urlsplit(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            tokens, updated = self._buckets.get(host, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate) - 1
+            self._buckets[host] = (tokens, now)
+        # a negative balance is the wait reserved for this request
+        if tokens < 0:
+            time.sleep(-tokens / self.rate)
+
+
+_retry_policy = RetryPolicy()
+_rate_limiter = RateLimiter()
+_timeout = TIMEOUT
+
+
+def configure(retry: RetryPolicy = None, rate_limit: float = None, burst: int = 1, timeout=TIMEOUT) -> None:
+    """Set how every request in the package is retried, rate limited and timed out.
+
+    Args:
+      retry: the retry policy, RetryPolicy() by default; RetryPolicy(retries=0)
+        turns retries off.
+      rate_limit: maximum requests per second per host, None for no limit.
+      burst: number of requests per host allowed back to back.
+      timeout: default requests timeout, seconds or (connect, read).
+    """
+    global _retry_policy, _rate_limiter, _timeout
+    _retry_policy = retry or RetryPolicy()
+    _rate_limiter = RateLimiter(rate_limit, burst)
+    _timeout = timeout
+
+
+def get_retry_policy() -> RetryPolicy:
+    """Return the retry policy set with configure()."""
+    return _retry_policy
+
+
+class RequestEvent(NamedTuple):
+    """One attempt at a request, as passed to the hooks."""
+    endpoint: str          # host and path, without the query
+    url: str
+    status: Optional[int]  # None when no response came back
+    seconds: float         # time until the response headers arrived
+    bytes: Optional[int]   # body size, Content-Length for streamed bodies
+    attempt: int           # 0 for the first attempt
+    will_retry: bool
+    error: Optional[str]
+
+
+def add_hook(hook: Callable[[RequestEvent], None]) -> None:
+    """Call hook with a RequestEvent after every attempt at a request."""
+    _hooks.append(hook)
+
+
+def remove_hook(hook: Callable[[RequestEvent], None]) -> None:
+    _hooks.remove(hook)
+
+
+def emit(event: RequestEvent) -> None:
+    """Pass event to every hook."""
+    for hook in list(_hooks):
+        hook(event)
+
+
+def endpoint_of(url: str) -> str:
+    """Host and path of url, the key requests are grouped by in RequestMetrics."""
+    parts = urlsplit(url)
+    return f'{parts.netloc}{parts.path}'
+
+
+class RequestMetrics:
+    """Per-endpoint request counts, latency histograms, bytes and retries.
+
+    Register it with add_hook(metrics.record) and read as_dict().
+    """
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.endpoints = {}
+        self._lock = threading.Lock()
+
+    def record(self, event: RequestEvent) -> None:
+        with self._lock:
+            stats = self.endpoints.setdefault(event.endpoint, {
+                'requests': 0, 'retries': 0, 'errors': 0, 'bytes': 0, 'seconds': 0.0,
+                'histogram': [0] * len(self.buckets),
+            })
+            stats['requests'] += 1
+            stats['retries'] += event.will_retry
+            stats['errors'] += event.error is not None or (event.status or 0) >= 400
+            stats['bytes'] += event.bytes or 0
+            stats['seconds'] += event.seconds
+            stats['histogram'][next(i for i, bound in enumerate(self.buckets) if event.seconds <= bound)] += 1
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                endpoint: {**stats, 'histogram': dict(zip(map(str, self.buckets), stats['histogram']))}
+                for endpoint, stats in self.endpoints.items()
+            }
+
+
+def create_session(pool_size: int = POOL_SIZE) -> requests.Session:
+    """Create a requests session that keeps up to pool_size connections per host alive."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    """Return the session shared by every UniProt request in the package."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = create_session()
+        return _session
+
+
+def set_cache(cache) -> None:
+    """Serve every get() through cache, a cache.ResponseCache, or stop caching with None."""
+    global _cache
+    _cache = cache
+
+
+def get_cache():
+    """Return the response cache in use, if any."""
+    return _cache
+
+
+def send(session: requests.Session, url: str, **kwargs) -> requests.Response:
+    """GET url with session, retrying, rate limiting and reporting every attempt.
+
+    The last response is returned whatever its status; connection errors
+    and timeouts are raised once the retries run out.
+    """
+    return _send(session, url, 0, **kwargs)[0]
+
+
+def _send(session, url, attempt, rate_limiter=None, **kwargs):
+    """send() starting at retry number attempt; return the response and its attempt number.
+
+    Every attempt waits on rate_limiter, the one set with configure() by default.
+    """
+    kwargs.setdefault('timeout', _timeout)
+    retry = _retry_policy
+    rate_limiter = rate_limiter or _rate_limiter
+    while True:
+        rate_limiter.wait(url)
+        start = time.perf_counter()
+        try:
+            r = session.get(url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            will_retry = attempt < retry.retries
+            emit(RequestEvent(endpoint_of(url), url, None, time.perf_counter() - start, None, attempt,
+                              will_retry, repr(e)))
+            if not will_retry:
+                raise
+            time.sleep(retry.delay(attempt))
+            attempt += 1
+            continue
+
+        seconds = time.perf_counter() - start
+        will_retry = r.status_code in retry.statuses and attempt < retry.retries
+        if kwargs.get('stream'):
+            size = int(r.headers['Content-Length']) if 'Content-Length' in r.headers else None
+        else:
+            size = len(r.content)
+        emit(RequestEvent(endpoint_of(url), url, r.status_code, seconds, size, attempt, will_retry, None))
+        if not will_retry:
+            return r, attempt
+        r.close()
+        time.sleep(retry.delay(attempt, r.headers.get('Retry-After')))
+        attempt += 1
+
+
+class _SendingSession:
+    """Give the response cache a session whose get() goes through send()."""
+    def __init__(self, session):
+        self.session = session
+
+    def get(self, url, **kwargs):
+        return send(self.session, url, **kwargs)
+
+
+def get(url: str, session: requests.Session = None, **kwargs) -> requests.Response:
+    """GET a UniProt REST URL through the response cache when one is set.
+
+    Args:
+      url: URL to GET.
+      session: session to use, the shared session by default.
+      kwargs: passed on to requests.Session.get.
+    """
+    session = session or get_session()
+    if _cache is not None:
+        return _cache.get(url, _SendingSession(session), **kwargs)
+    return send(session, url, **kwargs)
+
+
+def gunzip_chunks(chunks):
+    """Decompress an iterable of gzip byte chunks on the fly.
+
+    Concatenated gzip members are decompressed one after the other.
+    """
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        while chunk:
+            yield decompressor.decompress(chunk)
+            chunk = decompressor.unused_data if decompressor.eof else b''
+            if chunk:
+                decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    yield decompressor.flush()
+
+
+def _raw_chunks(r, chunk_size):
+    """Iterate over the body as sent, without undoing a gzip Content-Encoding.
+
+    urllib3 errors are raised as the requests errors iter_content raises.
+    """
+    try:
+        yield from r.raw.stream(chunk_size, decode_content=False)
+    except urllib3.exceptions.ProtocolError as e:
+        raise requests.exceptions.ChunkedEncodingError(e)
+    except urllib3.exceptions.ReadTimeoutError as e:
+        raise requests.ConnectionError(e)
+
+
+def stream_to_file(url: str, path, session: requests.Session = None, chunk_size: int = CHUNK_SIZE,
+                   decompress: bool = False, append: bool = False, on_chunk=None, on_restart=None,
+                   keep_compressed: bool = False, rate_limiter: RateLimiter = None) -> int:
+    """Download url into path chunk by chunk and return the number of bytes written.
+
+    Unless appending, the body is written to "<path>.part" and renamed to
+    path once complete, so an interrupted download never leaves a
+    truncated file at path. A download cut off mid-body is then started
+    over; these restarts and the retries of the request itself share the
+    retries of the retry policy.
+
+    Args:
+      url: URL to download.
+      path: file to write the response body to.
+      session: session to use, the shared session by default.
+      chunk_size: number of bytes held in memory at a time.
+      decompress: the body is gzip compressed and should be written
+        decompressed.
+      append: append to path instead of overwriting it.
+      on_chunk: called with every chunk as it is written, e.g. the feed
+        method of a fasta_index.FastaIndexBuilder.
+      on_restart: called before a download cut off mid-body starts over,
+        e.g. the reset method of that FastaIndexBuilder.
+      keep_compressed: write the body as sent, without undoing a gzip
+        Content-Encoding, for compressed=true downloads kept compressed.
+      rate_limiter: limiter every attempt waits on, the one set with
+        configure() by default.
+    """
+    session = session or get_session()
+    attempt = 0
+    while True:
+        r, attempt = _send(session, url, attempt, rate_limiter, stream=True)
+        try:
+            with r:
+                r.raise_for_status()
+                return _write_body(r, path, chunk_size, decompress, append, on_chunk, keep_compressed)
+        except BODY_ERRORS as e:
+            # connection errors before the body are retried by _send, and count towards the same retries
+            if append or attempt >= _retry_policy.retries:
+                raise
+            emit(RequestEvent(endpoint_of(url), url, r.status_code, 0.0, None, attempt, True, repr(e)))
+            time.sleep(_retry_policy.delay(attempt))
+            attempt += 1
+            if on_restart is not None:
+                on_restart()
+
+
+def _write_body(r, path, chunk_size, decompress, append, on_chunk, keep_compressed):
+    written = 0
+    if keep_compressed:
+        chunks = _raw_chunks(r, chunk_size)
+    else:
+        chunks = r.iter_content(chunk_size=chunk_size)
+        # requests already decodes a gzip Content-Encoding
+        if decompress and 'gzip' not in r.headers.get('Content-Encoding', ''):
+            chunks = gunzip_chunks(chunks)
+    target = path if append else f'{path}.part'
+    with open(target, 'ab' if append else 'wb') as f:
+        for chunk in chunks:
+            f.write(chunk)
+            written += len(chunk)
+            if on_chunk is not None:
+                on_chunk(chunk)
+    if not append:
+        os.replace(target, path)
+    return written
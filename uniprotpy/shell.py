@@ -1,8 +1,10 @@
 import argparse
+import tempfile
 from pathlib import Path
 
-from .helpers import get_proteome, proteome_to_csv, proteome_to_tsv
-from .parser import parse_proteome
+from .database import UniprotDatabase
+from .helpers import get_proteome, proteome_to_arrow, proteome_to_csv, proteome_to_parquet, proteome_to_tsv
+from .parser import iter_proteome, iter_proteome_parallel
 from .proteome_selector import ProteomeSelector
 
 
@@ -25,12 +27,31 @@ def parse_arguments():
       'sql',
       'fasta',
       'csv',
-      'tsv'
+      'tsv',
+      'parquet',
+      'arrow'
     ),
     default='sql',
     help='\"sql\" will store the proteome in a SQLite database. '
       '\"fasta\" will store the proteome in a FASTA file. '
-      '\"csv\" will store the proteome in a CSV file.'
+      '\"csv\" will store the proteome in a CSV file. '
+      '\"parquet\" and \"arrow\" will store the proteome in a Parquet or Arrow IPC file (needs pyarrow).'
+  )
+  parser.add_argument(
+    '-b', '--batch_size', type=int, default=10000,
+    help='Number of proteins held in memory at a time when storing the proteome.'
+  )
+  parser.add_argument(
+    '-w', '--workers', type=int, default=1,
+    help='Number of processes to parse the proteome with.'
+  )
+  parser.add_argument(
+    '--sync', action='store_true',
+    help='Update an existing SQLite database in place, only writing new and changed entries.'
+  )
+  parser.add_argument(
+    '--delete_missing', action='store_true',
+    help='With --sync, delete entries that are no longer in the proteome.'
   )
 
   args = parser.parse_args()
@@ -45,6 +66,9 @@ def run():
   proteome_id = args.proteome_id
   output_dir = args.output_dir
   store = args.store
+  batch_size = args.batch_size
+  sync = args.sync
+  workers = args.workers
 
   if taxon_id:
     assert proteome_id is None, 'Proteome ID cannot be provided when taxon ID is provided.'
@@ -54,11 +78,35 @@ def run():
     assert proteome_id is not None, 'Proteome ID must be provided when taxon ID is not provided.'
     assert 'UP' in proteome_id, 'Proteome ID must be a UniProt proteome ID.'
     
-    proteome = get_proteome(proteome_id)
-    proteome_dict = parse_proteome(proteome)
-    
-    if store == 'csv':
-      proteome_to_csv(proteome_dict, output_dir=output_dir)
-    elif store == 'tsv':
-      proteome_to_tsv(proteome_id, output_dir=output_dir)      
+    if store == 'fasta':
+      get_proteome(proteome_id, output_file=Path(output_dir) / f'{proteome_id}.fasta')
+      return
+
+    # keep the download compressed on disk; the parser decompresses it as it reads.
+    # parallel parsing splits the file into byte ranges, so it needs it uncompressed
+    with tempfile.TemporaryDirectory() as tmp:
+      if workers > 1:
+        proteome = get_proteome(proteome_id, output_file=Path(tmp) / f'{proteome_id}.fasta')
+        proteins = iter_proteome_parallel(proteome, workers=workers)
+      else:
+        proteome = get_proteome(proteome_id, compress=True, output_file=Path(tmp) / f'{proteome_id}.fasta.gz')
+        proteins = iter_proteome(proteome)
+
+      if store == 'csv':
+        proteome_to_csv(proteins, Path(output_dir) / f'{proteome_id}.csv', batch_size=batch_size)
+      elif store == 'tsv':
+        proteome_to_tsv(proteins, Path(output_dir) / f'{proteome_id}.tsv', batch_size=batch_size)
+      elif store == 'parquet':
+        proteome_to_parquet(proteins, Path(output_dir) / f'{proteome_id}.parquet', batch_size=batch_size)
+      elif store == 'arrow':
+        proteome_to_arrow(proteins, Path(output_dir) / f'{proteome_id}.arrow', batch_size=batch_size)
+      elif store == 'sql':
+        database_path = f'sqlite:///{Path(output_dir) / f"{proteome_id}.db"}'
+        database = UniprotDatabase(proteome_id=proteome_id, database_path=database_path)
+        if sync:
+          summary = database.sync(proteins, delete_missing=args.delete_missing, batch_size=batch_size)
+          print(f'{proteome_id}: {summary["inserted"]} inserted, {summary["updated"]} updated, '
+                f'{summary["deleted"]} deleted, {summary["unchanged"]} unchanged.')
+        else:
+          database.add_many(proteins, batch_size=batch_size, upsert=True)
     
@@ -0,0 +1,264 @@
+"""Offline taxonomy index built from a bulk taxonomy dump.
+
+The tree is kept in flat numpy arrays: the taxon IDs in sorted order,
+each taxon's parent position, the children in CSR layout (child_offsets
+into children) and a preorder numbering where the descendants of a taxon
+are exactly the positions tin[i] + 1 .. tout[i] - 1. Saved indexes are
+memory-mapped when loaded, so opening one costs next to nothing.
+"""
+import csv
+import json
+
+import numpy as np
+
+MAGIC = b'UPTAXIDX'
+ALIGNMENT = 64
+ARRAYS = ('ids', 'parent', 'child_offsets', 'children', 'depth', 'tin', 'tout', 'preorder',
+          'name_offsets', 'name_data')
+
+
+class TaxonIndex:
+  """Answer descendant, ancestor, LCA and subtree queries without the network.
+
+  Build one with from_ncbi_dump or from_uniprot_tsv, or open a saved one
+  with load.
+
+  Args:
+    taxon_ids: taxon ID of every node.
+    parent_ids: parent taxon ID of every node. Roots point to themselves
+      (as in NCBI nodes.dmp) or to a taxon that is not in taxon_ids.
+    names: optional scientific name of every node.
+  """
+  def __init__(self, taxon_ids, parent_ids, names=None, _arrays=None):
+    if _arrays is not None:
+      for name in ARRAYS:
+        setattr(self, name, _arrays[name])
+      return
+
+    taxon_ids = np.asarray(taxon_ids, dtype=np.int64)
+    parent_ids = np.asarray(parent_ids, dtype=np.int64)
+    order = np.argsort(taxon_ids, kind='stable')
+    self.ids = taxon_ids[order]
+    parent_ids = parent_ids[order]
+    n = len(self.ids)
+
+    # positions of the parents, -1 for roots
+    position = np.searchsorted(self.ids, parent_ids)
+    position[position == n] = 0
+    known = (self.ids[position] == parent_ids) & (parent_ids != self.ids)
+    self.parent = np.where(known, position, -1).astype(np.int32)
+
+    # children in CSR layout, ordered by taxon ID
+    has_parent = np.flatnonzero(self.parent >= 0)
+    self.children = has_parent[np.argsort(self.parent[has_parent], kind='stable')].astype(np.int32)
+    counts = np.bincount(self.parent[has_parent], minlength=n)
+    self.child_offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(counts, out=self.child_offsets[1:])
+
+    self._number_nodes()
+    self._set_names(None if names is None else [names[i] for i in order])
+
+  def _number_nodes(self):
+    """Compute depth and the preorder interval [tin, tout) of every node, level by level."""
+    n = len(self.ids)
+    levels = [np.flatnonzero(self.parent < 0).astype(np.int32)]
+    while True:
+      positions = self._child_positions(levels[-1])
+      if not len(positions):
+        break
+      levels.append(self.children[positions])
+
+    self.depth = np.zeros(n, dtype=np.int32)
+    for depth, level in enumerate(levels):
+      self.depth[level] = depth
+
+    size = np.ones(n, dtype=np.int64)
+    for level in reversed(levels[1:]):
+      np.add.at(size, self.parent[level], size[level])
+
+    # a child starts right after its parent and the subtrees of its earlier siblings
+    subtree_prefix = np.zeros(len(self.children) + 1, dtype=np.int64)
+    np.cumsum(size[self.children], out=subtree_prefix[1:])
+    self.tin = np.zeros(n, dtype=np.int64)
+    roots = levels[0]
+    self.tin[roots] = np.cumsum(size[roots]) - size[roots]
+    for level in levels[:-1]:
+      positions = self._child_positions(level)
+      children = self.children[positions]
+      parents = self.parent[children]
+      siblings_before = subtree_prefix[positions] - subtree_prefix[self.child_offsets[parents]]
+      self.tin[children] = self.tin[parents] + 1 + siblings_before
+
+    self.tout = self.tin + size
+    self.preorder = np.empty(n, dtype=np.int32)
+    self.preorder[self.tin] = np.arange(n, dtype=np.int32)
+
+  def _child_positions(self, nodes):
+    """Positions in self.children of the children of every node in nodes."""
+    starts = self.child_offsets[nodes]
+    counts = self.child_offsets[nodes + 1] - starts
+    total = int(counts.sum())
+    if not total:
+      return np.zeros(0, dtype=np.int64)
+    block_starts = np.cumsum(counts) - counts
+    return np.repeat(starts - block_starts, counts) + np.arange(total)
+
+  def _set_names(self, names):
+    """Store names, given in the sorted order of the IDs, as one UTF-8 buffer with offsets."""
+    n = len(self.ids)
+    if names is None:
+      self.name_offsets = np.zeros(n + 1, dtype=np.int64)
+      self.name_data = np.zeros(0, dtype=np.uint8)
+      return
+    encoded = [name.encode() for name in names]
+    self.name_offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum([len(name) for name in encoded], out=self.name_offsets[1:])
+    self.name_data = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+
+  @classmethod
+  def from_ncbi_dump(cls, nodes_path, names_path=None):
+    """Build an index from NCBI taxdump nodes.dmp and optionally names.dmp.
+
+    Args:
+      nodes_path: path to nodes.dmp.
+      names_path: path to names.dmp, for scientific names.
+    """
+    taxon_ids, parent_ids = [], []
+    with open(nodes_path) as f:
+      for line in f:
+        fields = line.split('\t|\t', 2)
+        taxon_ids.append(int(fields[0]))
+        parent_ids.append(int(fields[1]))
+
+    names = None
+    if names_path is not None:
+      scientific_names = {}
+      with open(names_path) as f:
+        for line in f:
+          fields = line.rstrip('\t|\n').split('\t|\t')
+          if fields[3] == 'scientific name':
+            scientific_names[int(fields[0])] = fields[1]
+      names = [scientific_names.get(taxon_id, '') for taxon_id in taxon_ids]
+    return cls(taxon_ids, parent_ids, names)
+
+  @classmethod
+  def from_uniprot_tsv(cls, tsv_path):
+    """Build an index from a UniProt taxonomy TSV with "Taxon Id" and "Parent" columns.
+
+    A "Scientific name" column is kept as the taxon names. Taxa whose
+    parent is not in the file become roots.
+
+    Args:
+      tsv_path: path to the TSV file.
+    """
+    taxon_ids, parent_ids, names = [], [], []
+    with open(tsv_path, newline='') as f:
+      for row in csv.DictReader(f, delimiter='\t'):
+        taxon_ids.append(int(row['Taxon Id']))
+        parent_ids.append(int(row['Parent']) if row.get('Parent') else -1)
+        names.append(row.get('Scientific name') or '')
+    return cls(taxon_ids, parent_ids, names if any(names) else None)
+
+  def save(self, path):
+    """Write the index to one file that load() memory-maps."""
+    header = {}
+    offset = 0
+    for name in ARRAYS:
+      array = np.ascontiguousarray(getattr(self, name))
+      header[name] = {'offset': offset, 'dtype': array.dtype.str, 'shape': list(array.shape)}
+      offset += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+
+    header_bytes = json.dumps(header).encode()
+    data_start = -(-(len(MAGIC) + 8 + len(header_bytes)) // ALIGNMENT) * ALIGNMENT
+    with open(path, 'wb') as f:
+      f.write(MAGIC)
+      f.write(len(header_bytes).to_bytes(8, 'little'))
+      f.write(header_bytes)
+      for name in ARRAYS:
+        f.seek(data_start + header[name]['offset'])
+        f.write(np.ascontiguousarray(getattr(self, name)).tobytes())
+      f.truncate(data_start + offset)
+
+  @classmethod
+  def load(cls, path):
+    """Open an index written by save() without reading it into memory."""
+    with open(path, 'rb') as f:
+      if f.read(len(MAGIC)) != MAGIC:
+        raise ValueError(f'{path} is not a taxonomy index.')
+      header_length = int.from_bytes(f.read(8), 'little')
+      header = json.loads(f.read(header_length))
+    data_start = -(-(len(MAGIC) + 8 + header_length) // ALIGNMENT) * ALIGNMENT
+
+    arrays = {}
+    for name, spec in header.items():
+      shape = tuple(spec['shape'])
+      if 0 in shape:
+        arrays[name] = np.zeros(shape, dtype=spec['dtype'])
+      else:
+        arrays[name] = np.memmap(path, dtype=spec['dtype'], mode='r', offset=data_start + spec['offset'],
+                                 shape=shape)
+    return cls(None, None, _arrays=arrays)
+
+  def __len__(self):
+    return len(self.ids)
+
+  def __contains__(self, taxon_id):
+    i = np.searchsorted(self.ids, taxon_id)
+    return i < len(self.ids) and self.ids[i] == taxon_id
+
+  def _position(self, taxon_id):
+    i = int(np.searchsorted(self.ids, int(taxon_id)))
+    if i == len(self.ids) or self.ids[i] != int(taxon_id):
+      raise KeyError(taxon_id)
+    return i
+
+  def name(self, taxon_id):
+    """Scientific name of a taxon, '' when the index has no names."""
+    i = self._position(taxon_id)
+    return bytes(self.name_data[self.name_offsets[i]:self.name_offsets[i + 1]]).decode()
+
+  def parent_of(self, taxon_id):
+    """Parent taxon ID, None for a root."""
+    parent = self.parent[self._position(taxon_id)]
+    return int(self.ids[parent]) if parent >= 0 else None
+
+  def children_of(self, taxon_id):
+    """Taxon IDs of the direct children of a taxon."""
+    i = self._position(taxon_id)
+    return self.ids[self.children[self.child_offsets[i]:self.child_offsets[i + 1]]].tolist()
+
+  def descendants(self, taxon_id):
+    """Taxon IDs of every taxon below taxon_id, in preorder."""
+    i = self._position(taxon_id)
+    return self.ids[self.preorder[self.tin[i] + 1:self.tout[i]]].tolist()
+
+  def ancestors(self, taxon_id):
+    """Taxon IDs from the parent of taxon_id up to its root."""
+    i = self.parent[self._position(taxon_id)]
+    lineage = []
+    while i >= 0:
+      lineage.append(int(self.ids[i]))
+      i = self.parent[i]
+    return lineage
+
+  def is_descendant(self, taxon_id, ancestor_id):
+    """Whether taxon_id is somewhere below ancestor_id."""
+    i, j = self._position(taxon_id), self._position(ancestor_id)
+    return bool(self.tin[j] < self.tin[i] < self.tout[j])
+
+  def lca(self, taxon_a, taxon_b):
+    """Lowest common ancestor of two taxa, None if they are in different trees."""
+    i, j = self._position(taxon_a), self._position(taxon_b)
+    if self.tin[i] <= self.tin[j] < self.tout[i]:
+      return int(self.ids[i])
+    while i >= 0 and not (self.tin[i] <= self.tin[j] < self.tout[i]):
+      i = self.parent[i]
+    return int(self.ids[i]) if i >= 0 else None
+
+  def adjacency(self, taxon_id):
+    """{taxon_id: [child IDs]} for every taxon with children in the subtree of taxon_id."""
+    i = self._position(taxon_id)
+    nodes = self.preorder[self.tin[i]:self.tout[i]]
+    nodes = nodes[self.child_offsets[nodes + 1] > self.child_offsets[nodes]]
+    return {int(self.ids[node]): self.ids[self.children[self.child_offsets[node]:self.child_offsets[node + 1]]].tolist()
+            for node in nodes}
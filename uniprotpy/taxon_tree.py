@@ -1,8 +1,14 @@
 #!/usr/bin/env python3
 
-import requests
+import csv
+import json
 import pandas as pd
 import io
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+from uniprotpy import rest
 
 BASE_URL = 'https://rest.uniprot.org/taxonomy/stream'
 
@@ -10,7 +16,7 @@ BASE_URL = 'https://rest.uniprot.org/taxonomy/stream'
 def get_taxon_children(taxon_id):
   """Retrives all children taxa for a given taxon ID."""
   url = f'{BASE_URL}?fields=id%2Cscientific_name&format=tsv&query=%28parent%3A{taxon_id}%29'
-  response = requests.get(url)
+  response = rest.get(url)
 
   try:
     taxon_children_df = pd.read_csv(io.StringIO(response.text), sep='\t')
@@ -20,34 +26,145 @@ def get_taxon_children(taxon_id):
 
   return children
 
-def traverse_tree(taxon_id):
+def get_taxa_children(taxon_ids):
+  """
+  Retrieves the children of several taxa with one query.
+
+  Returns a dict mapping each parent taxon ID (as an int) to a list of
+  {'Taxon Id': ..., 'Scientific name': ...} records, in API order.
+  """
+  response = rest.get(taxa_children_url(taxon_ids, BASE_URL))
+  response.raise_for_status()
+  return parse_taxa_children(response.text)
+
+def taxa_children_url(taxon_ids, base_url=BASE_URL):
+  """URL of the taxonomy query for the children of every taxon in taxon_ids."""
+  query = ' OR '.join(f'(parent:{taxon_id})' for taxon_id in taxon_ids)
+  return f'{base_url}?fields=id%2Cscientific_name%2Cparent&format=tsv&query={quote(query)}'
+
+def parse_taxa_children(text):
+  """Group the rows of a taxonomy TSV with a Parent column by parent taxon ID."""
+  children = {}
+  for row in csv.DictReader(io.StringIO(text), delimiter='\t'):
+    child = {'Taxon Id': int(row['Taxon Id']), 'Scientific name': row['Scientific name']}
+    children.setdefault(int(row['Parent']), []).append(child)
+  return children
+
+def traverse_tree(taxon_id, max_workers=8, batch_size=25, as_adjacency=False, index=None,
+                  max_depth=None, max_nodes=None):
   """
-  Recursively traverse the taxonomy tree for a given taxon ID.
+  Traverse the taxonomy tree for a given taxon ID, one level at a time.
+
+  The children of a whole level are fetched concurrently with up to
+  max_workers requests, each asking for batch_size parents at once.
+  Nothing recurses, so arbitrarily deep trees are fine.
 
   It goes down to each leaf node and returns a dict of the form:
   {taxon_id: [child1, {child2: subchild1}, ...]}
   
   Taxon IDs that have no children are standalone integers; anything
   else is a list of dicts.
+
+  With as_adjacency, return {taxon_id: [child IDs]} for every taxon that
+  has children instead.
+
+  With index, a taxon_index.TaxonIndex, the tree is read from the index
+  and no requests are made.
+
+  max_depth keeps that many levels, taxon_id being the first, and
+  max_nodes keeps the first that many taxa in level order. Levels past
+  either limit are not requested.
   """
-  children = get_taxon_children(taxon_id)
+  if index is not None:
+    taxon_id = int(taxon_id)
+    adjacency = index.adjacency(taxon_id)
+  else:
+    adjacency = {}
+    frontier = [taxon_id]
+    depth, count = 1, 1
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+      while frontier and (max_depth is None or depth < max_depth) and (max_nodes is None or count < max_nodes):
+        batches = [frontier[i:i + batch_size] for i in range(0, len(frontier), batch_size)]
+        frontier = []
+        for parents, children in zip(batches, executor.map(get_taxa_children, batches)):
+          for parent in parents:
+            child_ids = [child['Taxon Id'] for child in children.get(int(parent), [])]
+            if child_ids:
+              adjacency[parent] = child_ids
+              frontier.extend(child_ids)
+        depth += 1
+        count += len(frontier)
 
-  if not children:
-    return taxon_id
+  if max_depth is not None or max_nodes is not None:
+    adjacency = limit_adjacency(taxon_id, adjacency, max_depth, max_nodes)
+  if as_adjacency:
+    return adjacency
+  return adjacency_to_tree(taxon_id, adjacency)
 
-  child_results = []
-  for child in children:
-    child_id = child['Taxon Id']
-    child_result = traverse_tree(child_id)
+def limit_adjacency(taxon_id, adjacency, max_depth=None, max_nodes=None):
+  """
+  Keep the part of {taxon_id: [child IDs]} within max_depth levels of
+  taxon_id, the first level, and the first max_nodes taxa in level order.
+  """
+  limited = {}
+  frontier = [taxon_id]
+  depth, count = 1, 1
+  while frontier and (max_depth is None or depth < max_depth):
+    next_frontier = []
+    for parent in frontier:
+      child_ids = adjacency.get(parent, [])
+      if max_nodes is not None:
+        child_ids = child_ids[:max(max_nodes - count, 0)]
+      if child_ids:
+        limited[parent] = child_ids
+        count += len(child_ids)
+        next_frontier.extend(child_ids)
+    frontier = next_frontier
+    depth += 1
+  return limited
 
-    if isinstance(child_result, int):
-      child_results.append(child_result)
-    else:
-      child_results.append(child_result)
+def adjacency_to_tree(taxon_id, adjacency):
+  """
+  Convert {taxon_id: [child IDs]} into the nested output of traverse_tree
+  without recursion.
+  """
+  # every taxon comes after its parent in order, so build subtrees in reverse
+  order = []
+  stack = [taxon_id]
+  while stack:
+    node = stack.pop()
+    order.append(node)
+    stack.extend(adjacency.get(node, []))
 
-  return {taxon_id: child_results}
+  subtrees = {}
+  for node in reversed(order):
+    child_ids = adjacency.get(node)
+    subtrees[node] = {node: [subtrees[child] for child in child_ids]} if child_ids else node
+  return subtrees[taxon_id]
 
-def create_taxon_tree(tree, prefix="", file=None):
+def _entries(tree):
+  """
+  Yield (taxon, is_last, subtree) for the top level of a traverse_tree
+  structure, in the order create_taxon_tree prints them.
+  """
+  if isinstance(tree, list):
+    last = len(tree) - 1
+    for i, item in enumerate(tree):
+      if isinstance(item, dict):
+        for k, v in item.items():
+          yield k, i == last, v
+      else:
+        yield item, i == last, None
+  elif isinstance(tree, dict):
+    last = len(tree) - 1
+    for i, (k, v) in enumerate(tree.items()):
+      yield k, i == last, v
+
+def _has_children(subtree):
+  return isinstance(subtree, (list, dict)) and len(subtree) > 0
+
+def create_taxon_tree(tree, prefix="", file=None, max_depth=None, max_nodes=None,
+                      buffer_size=4096):
   """
   Create a taxonomy tree structure from the output of traverse_tree. 
 
@@ -61,22 +178,129 @@ def create_taxon_tree(tree, prefix="", file=None):
       │   └──2665953
       └──2813598
           └──2813599
+
+  The tree is walked with an explicit stack, so depth is not limited by
+  the recursion limit, and lines are written buffer_size at a time.
+
+  Args:
+    tree: output of traverse_tree.
+    prefix: string put in front of every line.
+    file: where to write the tree, stdout by default.
+    max_depth: only print this many levels.
+    max_nodes: stop after printing this many taxa.
+    buffer_size: number of lines collected before each write.
   """
-  if isinstance(tree, list):
-    for i, item in enumerate(tree):
-      is_last = i == len(tree) - 1
-      if isinstance(item, dict):
-        for k, v in item.items():
-          print(f"{prefix}{'└──' if is_last else '├──'}{k}", file=file)
-          create_taxon_tree(v, f"{prefix}{'    ' if is_last else '│   '}", file)
-      else:
-        print(f"{prefix}{'└──' if is_last else '├──'}{item}", file=file)
-  
-  elif isinstance(tree, dict):
-    for i, (key, value) in enumerate(tree.items()):
-      is_last = i == len(tree) - 1
-      print(f"{prefix}{'└──' if is_last else '├──'}{key}", file=file)
-      create_taxon_tree(value, f"{prefix}{'    ' if is_last else '│   '}", file)
+  file = file or sys.stdout
+  lines = []
+  printed = 0
+  # each level keeps its entry iterator and the prefix shared by its lines
+  stack = [(_entries(tree), prefix, 1)]
+  while stack:
+    entries, level_prefix, depth = stack[-1]
+    entry = next(entries, None)
+    if entry is None:
+      stack.pop()
+      continue
+
+    taxon, is_last, subtree = entry
+    lines.append(f"{level_prefix}{'└──' if is_last else '├──'}{taxon}\n")
+    printed += 1
+    if max_nodes is not None and printed >= max_nodes:
+      break
+    if len(lines) >= buffer_size:
+      file.write(''.join(lines))
+      lines.clear()
+
+    if _has_children(subtree) and (max_depth is None or depth < max_depth):
+      stack.append((_entries(subtree), f"{level_prefix}{'    ' if is_last else '│   '}", depth + 1))
+
+  file.write(''.join(lines))
+
+def _walk(tree):
+  """
+  Yield ('open', taxon), ('leaf', taxon) and ('close', taxon) events for
+  a depth-first walk of a traverse_tree structure, without recursion.
+  """
+  stack = [(_entries(tree), None)]
+  while stack:
+    entries, parent = stack[-1]
+    entry = next(entries, None)
+    if entry is None:
+      stack.pop()
+      if stack:
+        yield 'close', parent
+      continue
+
+    taxon, _, subtree = entry
+    if _has_children(subtree):
+      yield 'open', taxon
+      stack.append((_entries(subtree), taxon))
+    else:
+      yield 'leaf', taxon
+
+def write_newick(tree, file=None):
+  """
+  Write the output of traverse_tree in Newick format, one line per root,
+  e.g. ((63221,741158)9606,1425170)9605;
+  """
+  file = file or sys.stdout
+  parts = []
+  first = [True]
+  for event, taxon in _walk(tree):
+    if event == 'close':
+      first.pop()
+      parts.append(f'){taxon}')
+      if len(first) == 1:
+        parts.append(';\n')
+      continue
+
+    if not first[-1]:
+      parts.append(',')
+    first[-1] = False
+    if event == 'open':
+      parts.append('(')
+      first.append(True)
+    elif len(first) == 1:
+      parts.append(f'{taxon};\n')
+    else:
+      parts.append(str(taxon))
+
+    if len(parts) >= 4096:
+      file.write(''.join(parts))
+      parts.clear()
+  file.write(''.join(parts))
+
+def _json_value(taxon):
+  return str(taxon) if isinstance(taxon, int) else json.dumps(taxon)
+
+def write_json(tree, file=None):
+  """
+  Write the output of traverse_tree as JSON: a list of root nodes, each
+  {"taxon_id": ..., "children": [...]} (leaves have no "children").
+  """
+  file = file or sys.stdout
+  parts = ['[']
+  first = [True]
+  for event, taxon in _walk(tree):
+    if event == 'close':
+      first.pop()
+      parts.append(']}')
+      continue
+
+    if not first[-1]:
+      parts.append(',')
+    first[-1] = False
+    if event == 'open':
+      parts.append(f'{{"taxon_id": {_json_value(taxon)}, "children": [')
+      first.append(True)
+    else:
+      parts.append(f'{{"taxon_id": {_json_value(taxon)}}}')
+
+    if len(parts) >= 4096:
+      file.write(''.join(parts))
+      parts.clear()
+  parts.append(']\n')
+  file.write(''.join(parts))
 
 def main():
   import argparse
@@ -85,11 +309,23 @@ def main():
   parser.add_argument('-t', '--taxon_id', required=True, type=int, help='Taxon ID')
   parser.add_argument('-p', '--pickle', action='store_true', help='Pickle tree output.')
   parser.add_argument('-o', '--output', action='store_true', help='Output tree file.')
+  parser.add_argument('-w', '--workers', type=int, default=8, help='Number of concurrent requests.')
+  parser.add_argument('-i', '--index', help='Offline taxonomy index built with taxon_index.TaxonIndex.')
+  parser.add_argument('-f', '--format', choices=('text', 'newick', 'json'), default='text',
+                      help='Format of the tree file.')
+  parser.add_argument('-d', '--max_depth', type=int, help='Only keep this many levels of the tree.')
+  parser.add_argument('-n', '--max_nodes', type=int, help='Only keep this many taxa, in level order.')
 
   args = parser.parse_args()
   taxon_id = args.taxon_id
 
-  taxonomy_tree = traverse_tree(taxon_id)
+  index = None
+  if args.index:
+    from uniprotpy.taxon_index import TaxonIndex
+    index = TaxonIndex.load(args.index)
+
+  taxonomy_tree = traverse_tree(taxon_id, max_workers=args.workers, index=index,
+                                max_depth=args.max_depth, max_nodes=args.max_nodes)
 
   if args.pickle:
     import pickle
@@ -97,8 +333,15 @@ def main():
       pickle.dump(taxonomy_tree, f)
   
   if args.output:
-    with open(f'{taxon_id}_taxonomy_tree.txt', 'w') as f:
-      create_taxon_tree(taxonomy_tree, file=f)
+    if args.format == 'newick':
+      with open(f'{taxon_id}_taxonomy_tree.nwk', 'w') as f:
+        write_newick(taxonomy_tree, file=f)
+    elif args.format == 'json':
+      with open(f'{taxon_id}_taxonomy_tree.json', 'w') as f:
+        write_json(taxonomy_tree, file=f)
+    else:
+      with open(f'{taxon_id}_taxonomy_tree.txt', 'w') as f:
+        create_taxon_tree(taxonomy_tree, file=f)
 
   print(f'Taxon tree for {taxon_id}:')
   create_taxon_tree(taxonomy_tree)